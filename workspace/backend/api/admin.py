@@ -1,10 +1,89 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 from .models import User, Resume, Section, Style
+from .ranking import place
 
 # Register custom User model with UserAdmin
 admin.site.register(User, UserAdmin)
 
+def performance_mode():
+    return getattr(settings, 'ADMIN_PERFORMANCE_MODE', False)
+
+def estimated_count(model, using):
+    """Row count from the planner's table statistics, or None where the backend has none"""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+                [table]
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for tables that were never analyzed
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs an unbounded COUNT(*).
+
+    Unfiltered changelists of big tables use the planner's row estimate;
+    everything else is counted up to ADMIN_COUNT_LIMIT rows, so later pages
+    of a huge filtered result are reached by narrowing the filter instead.
+    A default manager's own filter (e.g. Resume's soft delete) still counts
+    as unfiltered; the estimate then includes the rows it hides.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        # Past one page, so the changelist paginates instead of loading the whole queryset
+        limit = max(getattr(settings, 'ADMIN_COUNT_LIMIT', 10000), self.per_page + 1)
+        if queryset.query.where == queryset.model._default_manager.all().query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
+
+class PerformanceModeAdmin(admin.ModelAdmin):
+    """
+    Admin that switches to estimated counts and prefix searches when
+    ADMIN_PERFORMANCE_MODE is on. Prefix lookups can use the btree indexes
+    on the searched columns, where the default icontains scans the table.
+    """
+    indexed_search_fields = ()
+
+    @property
+    def show_full_result_count(self):
+        return not performance_mode()
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if performance_mode():
+            return EstimatedCountPaginator(queryset, per_page, orphans, allow_empty_first_page)
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+
+    def get_search_fields(self, request):
+        if performance_mode():
+            return self.indexed_search_fields
+        return super().get_search_fields(request)
+
+def save_section(section):
+    # New sections are ranked like the API ranks them, so moves never meet unranked rows
+    if section.rank:
+        section.save()
+    else:
+        place(section, section.order)
+
 class SectionInline(admin.TabularInline):
     model = Section
     extra = 1
@@ -14,19 +93,56 @@ class StyleInline(admin.TabularInline):
     extra = 1
 
 @admin.register(Resume)
-class ResumeAdmin(admin.ModelAdmin):
+class ResumeAdmin(PerformanceModeAdmin):
     list_display = ('title', 'user', 'template_name', 'created_at', 'updated_at')
     list_filter = ('template_name', 'created_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
     search_fields = ('title', 'user__username')
+    indexed_search_fields = ('title__startswith', 'user__username__startswith')
     inlines = [StyleInline, SectionInline]
 
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not Section:
+            return super().save_formset(request, form, formset, change)
+        sections = formset.save(commit=False)
+        for section in formset.deleted_objects:
+            section.delete()
+        for section in sections:
+            save_section(section)
+
+    def get_inlines(self, request, obj):
+        # Sections are reached through a link to their own paginated changelist instead
+        if performance_mode():
+            return [StyleInline]
+        return super().get_inlines(request, obj)
+
+    def get_readonly_fields(self, request, obj=None):
+        if performance_mode() and obj is not None:
+            return (*super().get_readonly_fields(request, obj), 'sections_link')
+        return super().get_readonly_fields(request, obj)
+
+    @admin.display(description='Sections')
+    def sections_link(self, obj):
+        url = reverse('admin:api_section_changelist')
+        return format_html('<a href="{}?resume__id__exact={}">View sections</a>', url, obj.pk)
+
 @admin.register(Section)
-class SectionAdmin(admin.ModelAdmin):
+class SectionAdmin(PerformanceModeAdmin):
     list_display = ('type', 'resume', 'order')
     list_filter = ('type',)
+    list_select_related = ('resume__user',)
+    raw_id_fields = ('resume',)
     search_fields = ('resume__title', 'resume__user__username')
+    indexed_search_fields = ('resume__title__startswith', 'resume__user__username__startswith')
+
+    def save_model(self, request, obj, form, change):
+        save_section(obj)
 
 @admin.register(Style)
-class StyleAdmin(admin.ModelAdmin):
+class StyleAdmin(PerformanceModeAdmin):
     list_display = ('resume', 'primary_color', 'font_family', 'font_size')
+    list_select_related = ('resume__user',)
+    raw_id_fields = ('resume',)
     search_fields = ('resume__title', 'resume__user__username')
+    indexed_search_fields = ('resume__title__startswith', 'resume__user__username__startswith')
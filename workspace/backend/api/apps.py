@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Connect the change feed and document write hooks and register background job handlers
+        from . import changes, documents, ranking, trash  # noqa: F401
@@ -0,0 +1,141 @@
+import json
+import zlib
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .changes import muted
+from .models import Resume, ResumeArchive, Section
+from .ranking import rebalance
+
+SECTION_FIELDS = ('id', 'type', 'content', 'order', 'rank')
+
+
+def encode_sections(rows):
+    """Compress a list of section dicts; returns (blob, uncompressed size)"""
+    raw = json.dumps(rows, separators=(',', ':')).encode()
+    return zlib.compress(raw, getattr(settings, 'ARCHIVE_COMPRESSION_LEVEL', 6)), len(raw)
+
+
+def decode_sections(data):
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+def idle_resumes(days=None):
+    """Resumes neither edited nor restored in the last ``days`` days"""
+    days = days or getattr(settings, 'ARCHIVE_IDLE_DAYS', 180)
+    cutoff = timezone.now() - timedelta(days=days)
+    return Resume.objects.filter(is_archived=False, updated_at__lt=cutoff).filter(
+        Q(restored_at__isnull=True) | Q(restored_at__lt=cutoff)
+    )
+
+
+def archive_resumes(resume_ids, days=None):
+    """
+    Move the sections of the given resumes into ResumeArchive rows.
+
+    Resumes that were edited or archived since they were selected are
+    skipped. Runs in one transaction with the change hooks muted, since
+    archiving doesn't change what the user sees. Returns (resumes, sections).
+    """
+    with transaction.atomic(), muted():
+        ids = list(
+            idle_resumes(days).select_for_update().filter(pk__in=resume_ids).order_by().values_list('pk', flat=True)
+        )
+        if not ids:
+            return 0, 0
+
+        grouped = defaultdict(list)
+        rows = Section.objects.filter(resume_id__in=ids).values('resume_id', *SECTION_FIELDS)
+        for row in rows:
+            grouped[row.pop('resume_id')].append(row)
+
+        archives = []
+        for resume_id in ids:
+            data, raw_size = encode_sections(grouped[resume_id])
+            archives.append(ResumeArchive(
+                resume_id=resume_id, data=data, section_count=len(grouped[resume_id]), raw_size=raw_size
+            ))
+        ResumeArchive.objects.bulk_create(archives)
+        Section.objects.filter(resume_id__in=ids).delete()
+        Resume.objects.filter(pk__in=ids).update(is_archived=True)
+        return len(ids), sum(len(sections) for sections in grouped.values())
+
+
+def archive_idle_resumes(days=None, batch_size=None, after_id=0, limit=None):
+    """
+    Archive idle resumes in primary key order, one transaction per batch.
+
+    Yields (last resume id, resumes archived, sections archived) after each
+    batch; pass the last id back as ``after_id`` to resume an interrupted run.
+    """
+    batch_size = batch_size or getattr(settings, 'ARCHIVE_BATCH_SIZE', 100)
+    seen = 0
+    while limit is None or seen < limit:
+        size = batch_size if limit is None else min(batch_size, limit - seen)
+        ids = list(idle_resumes(days).filter(pk__gt=after_id).order_by('pk').values_list('pk', flat=True)[:size])
+        if not ids:
+            return
+        resumes, sections = archive_resumes(ids, days)
+        seen += len(ids)
+        after_id = ids[-1]
+        yield after_id, resumes, sections
+
+
+def restore_resume(resume):
+    """
+    Move an archived resume's sections back into the Section table.
+
+    Section ids are kept, so links to them keep working. Ranks are kept
+    too unless one is missing (archived before ranks existed) or taken by a
+    section added since; then every section of the resume is re-ranked,
+    restored ones first. A no-op for resumes that aren't archived. A
+    ``sections`` prefetch on the instance is replaced with the restored rows.
+    """
+    if not resume.is_archived:
+        return
+    now = timezone.now()
+    with transaction.atomic(), muted():
+        archive = ResumeArchive.objects.select_for_update().filter(resume_id=resume.pk).first()
+        # Another request may have restored it in the meantime
+        if archive is not None:
+            rows = decode_sections(archive.data)
+            ranks = [row.get('rank', '') for row in rows]
+            taken = set(Section.objects.filter(resume_id=resume.pk).values_list('rank', flat=True))
+            clash = '' in ranks or len(set(ranks)) < len(ranks) or not taken.isdisjoint(ranks)
+            Section.objects.bulk_create([
+                Section(resume_id=resume.pk, **{**row, 'rank': '' if clash else row.get('rank', '')})
+                for row in rows
+            ])
+            if clash:
+                # Blank ranks sort first, so the restored sections keep their order ahead of the others
+                rebalance(resume.pk)
+            archive.delete()
+        Resume.objects.filter(pk=resume.pk).update(is_archived=False, restored_at=now)
+    resume.is_archived = False
+    resume.restored_at = now
+
+    prefetched = getattr(resume, '_prefetched_objects_cache', None)
+    if prefetched is not None and 'sections' in prefetched:
+        prefetched['sections'] = list(Section.objects.filter(resume_id=resume.pk))
+
+
+def archived_sections(resumes, exclude_types=()):
+    """Yield (section id, resume id, content) for archived resumes in the queryset without restoring them"""
+    archives = ResumeArchive.objects.filter(resume__in=resumes.filter(is_archived=True)).values_list('resume_id', 'data')
+    for resume_id, data in archives.iterator(chunk_size=100):
+        for row in decode_sections(data):
+            if row['type'] not in exclude_types:
+                yield row['id'], resume_id, row['content']
+
+
+def archived_resume_of(resumes, section_id):
+    """Return the archived resume in the queryset holding section ``section_id``, or None"""
+    for archived_id, resume_id, _ in archived_sections(resumes):
+        if archived_id == section_id:
+            return resumes.get(pk=resume_id)
+    return None
@@ -0,0 +1,21 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+class QueryParamJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that also accepts ``?access_token=``.
+
+    Browsers' EventSource cannot send an Authorization header, so streaming
+    endpoints opt into this class. Use it only where needed: tokens in URLs
+    can end up in access logs.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            return result
+        raw_token = request.query_params.get('access_token')
+        if not raw_token:
+            return None
+        validated_token = self.get_validated_token(raw_token.encode())
+        return self.get_user(validated_token), validated_token
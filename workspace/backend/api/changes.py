@@ -0,0 +1,183 @@
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Resume, ResumeChange, Section, Style
+
+
+_state = threading.local()
+
+
+@contextmanager
+def muted():
+    """Skip the write hooks, for bookkeeping writes that don't change what users see"""
+    previous = getattr(_state, 'muted', False)
+    _state.muted = True
+    try:
+        yield
+    finally:
+        _state.muted = previous
+
+
+def is_muted():
+    return getattr(_state, 'muted', False)
+
+
+def record_change(resume_id, kind, action, section_id=None, user_id=None, version=None):
+    """
+    Insert a change notification once the current transaction commits.
+
+    Rolled back writes are never announced. When user_id/version are not
+    known they are read at commit time, so the event carries the resume's
+    latest version.
+    """
+    def insert():
+        nonlocal user_id, version
+        if user_id is None or version is None:
+            row = Resume.objects.filter(pk=resume_id).values_list('user_id', 'version').first()
+            if row is None:
+                return
+            user_id, version = row
+        ResumeChange.objects.create(
+            user_id=user_id, resume_id=resume_id, section_id=section_id,
+            kind=kind, action=action, version=version,
+        )
+    transaction.on_commit(insert)
+
+
+def bump_version(resume_id):
+    """Increment the resume's version and mark it edited in the current transaction"""
+    Resume.objects.filter(pk=resume_id).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def deleted_directly(origin, model):
+    """True unless the row was removed by a cascade from another model's delete"""
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
+
+
+@receiver(pre_save, sender=Resume, dispatch_uid='resume_change_version')
+def bump_resume_version(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Incremented in the UPDATE itself so a stale copy never overwrites a newer version
+    if not raw and not is_muted() and not instance._state.adding and update_fields is None:
+        instance.version = F('version') + 1
+
+
+@receiver(post_save, sender=Resume, dispatch_uid='resume_change_saved')
+def resume_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or is_muted():
+        return
+    if not created and update_fields is None:
+        instance.refresh_from_db(fields=['version'])
+    action = ResumeChange.ACTION_CREATED if created else ResumeChange.ACTION_UPDATED
+    record_change(instance.pk, ResumeChange.KIND_RESUME, action, user_id=instance.user_id, version=instance.version)
+
+
+@receiver(post_delete, sender=Resume, dispatch_uid='resume_change_deleted')
+def resume_deleted(sender, instance, origin=None, **kwargs):
+    if deleted_directly(origin, Resume) and not is_muted():
+        record_change(
+            instance.pk, ResumeChange.KIND_RESUME, ResumeChange.ACTION_DELETED,
+            user_id=instance.user_id, version=instance.version,
+        )
+
+
+@receiver(post_save, sender=Section, dispatch_uid='section_change_saved')
+def section_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or is_muted():
+        return
+    bump_version(instance.resume_id)
+    action = ResumeChange.ACTION_CREATED if created else ResumeChange.ACTION_UPDATED
+    record_change(instance.resume_id, ResumeChange.KIND_SECTION, action, section_id=instance.pk)
+
+
+@receiver(post_delete, sender=Section, dispatch_uid='section_change_deleted')
+def section_deleted(sender, instance, origin=None, **kwargs):
+    if deleted_directly(origin, Section) and not is_muted():
+        bump_version(instance.resume_id)
+        record_change(
+            instance.resume_id, ResumeChange.KIND_SECTION, ResumeChange.ACTION_DELETED, section_id=instance.pk
+        )
+
+
+@receiver(post_save, sender=Style, dispatch_uid='style_change_saved')
+def style_saved(sender, instance, created, raw=False, **kwargs):
+    # A style is only ever created together with its resume, which is announced already
+    if raw or created or is_muted():
+        return
+    bump_version(instance.resume_id)
+    record_change(instance.resume_id, ResumeChange.KIND_STYLE, ResumeChange.ACTION_UPDATED)
+
+
+def prune_changes(retention=None):
+    """Delete notifications older than CHANGE_FEED_RETENTION seconds; return how many"""
+    retention = retention or getattr(settings, 'CHANGE_FEED_RETENTION', 86400)
+    cutoff = timezone.now() - timedelta(seconds=retention)
+    deleted, _ = ResumeChange.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def format_event(change):
+    payload = {
+        'kind': change['kind'],
+        'action': change['action'],
+        'resume_id': change['resume_id'],
+        'section_id': change['section_id'],
+        'version': change['version'],
+    }
+    return f"id: {change['id']}\nevent: change\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+async def change_stream(user_id, last_event_id=None, clock=time.monotonic, sleep=asyncio.sleep):
+    """
+    Yield Server-Sent Events for the user's resume changes.
+
+    An async generator polling with the async ORM, so under ASGI each event
+    is sent as soon as it's read and an open stream doesn't hold a thread
+    while it waits. Without ``last_event_id`` the stream starts at the newest change. When the
+    client resumes from an id that has been pruned (or never existed) a
+    ``reset`` event tells it to refetch instead of trusting the gap. At most
+    CHANGE_FEED_BATCH_SIZE rows are held at a time, and the stream ends after
+    CHANGE_FEED_MAX_DURATION seconds so EventSource reconnects with its
+    Last-Event-ID.
+    """
+    poll_interval = getattr(settings, 'CHANGE_FEED_POLL_INTERVAL', 1.0)
+    heartbeat = getattr(settings, 'CHANGE_FEED_HEARTBEAT', 15)
+    batch_size = getattr(settings, 'CHANGE_FEED_BATCH_SIZE', 100)
+    changes = ResumeChange.objects.filter(user_id=user_id)
+
+    yield f"retry: {getattr(settings, 'CHANGE_FEED_RETRY_MS', 3000)}\n\n"
+    if last_event_id is None or not await changes.filter(id=last_event_id).aexists():
+        if last_event_id is not None:
+            yield 'event: reset\ndata: {}\n\n'
+        last_event_id = await changes.order_by('-id').values_list('id', flat=True).afirst() or 0
+
+    now = clock()
+    deadline = now + getattr(settings, 'CHANGE_FEED_MAX_DURATION', 300)
+    next_heartbeat = now + heartbeat
+    fields = ('id', 'kind', 'action', 'resume_id', 'section_id', 'version')
+    while True:
+        pending = changes.filter(id__gt=last_event_id).order_by('id').values(*fields)[:batch_size]
+        batch = [change async for change in pending]
+        for change in batch:
+            yield format_event(change)
+            last_event_id = change['id']
+        if len(batch) == batch_size:
+            continue
+
+        now = clock()
+        if now >= deadline:
+            return
+        if now >= next_heartbeat:
+            yield ': heartbeat\n\n'
+            next_heartbeat = now + heartbeat
+        await sleep(min(poll_interval, deadline - now))
@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .archive import restore_resume
+from .documents import deferred
+from .models import Resume, Section, set_positions
+from .serializers import SectionSerializer, section_index
+
+
+class OpError(Exception):
+    """Raised when one operation in a batch is invalid; the whole batch is rolled back"""
+
+    def __init__(self, index, errors):
+        super().__init__(f"Operation {index} failed: {errors}")
+        self.index = index
+        self.errors = errors
+
+
+def section_id_of(op):
+    """The op's ``section_id`` as a row id, or None when it isn't one (ints and digit strings are)"""
+    value = op.get('section_id')
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        return None
+    return value if 0 < value < 2 ** 63 else None
+
+
+def apply_section_ops(resume_id, user, ops):
+    """
+    Apply a batch of section operations to one resume atomically.
+
+    Supported ops are ``create`` (type, content, order), ``update``
+    (section_id plus any of type/content/order) and ``delete`` (section_id).
+    ``order`` is a 0-based index; created sections go last without one.
+    The resume row is locked for the duration so batches from every process
+    are applied one at a time, and an archived resume is restored first.
+    Every applied op bumps ``Resume.version`` through the change hooks in
+    api.changes, and the resume's document is rebuilt once for the whole
+    batch. Sections in the applied ops report their positions after the
+    whole batch. Returns (version, applied ops).
+    """
+    with transaction.atomic(), deferred():
+        resume = Resume.objects.select_for_update().get(pk=resume_id, user=user)
+        # New sections must be ranked against the archived ones
+        restore_resume(resume)
+        section_ids = [section_id_of(op) for op in ops if isinstance(op, dict) and section_id_of(op) is not None]
+        sections = {section.id: section for section in Section.objects.filter(resume=resume, id__in=section_ids)}
+        for section in sections.values():
+            # Filled in once the batch is done
+            section.position = None
+
+        applied, serialized = [], []
+        for index, op in enumerate(ops):
+            if not isinstance(op, dict):
+                raise OpError(index, 'Operation must be an object')
+            kind = op.get('op')
+            data = {key: op[key] for key in ('type', 'content', 'order') if key in op}
+
+            if kind == 'create':
+                data.setdefault('content', {})
+                serializer = SectionSerializer(data=data)
+                if not serializer.is_valid():
+                    raise OpError(index, serializer.errors)
+                section = serializer.save(resume=resume)
+                sections[section.id] = section
+                applied.append({'op': 'create', 'client_id': op.get('client_id'), 'section': serializer.data})
+                serialized.append(section)
+            elif kind in ('update', 'delete'):
+                section_id = section_id_of(op)
+                if section_id is None:
+                    raise OpError(index, 'section_id must be a section id')
+                section = sections.get(section_id)
+                if section is None:
+                    raise OpError(index, 'Section not found')
+                if kind == 'delete':
+                    applied.append({'op': 'delete', 'section_id': section.id})
+                    section.delete()
+                    del sections[section_id]
+                    continue
+                serializer = SectionSerializer(section, data=data, partial=True)
+                if not serializer.is_valid():
+                    raise OpError(index, serializer.errors)
+                serializer.save()
+                applied.append({'op': 'update', 'section': serializer.data})
+                serialized.append(section)
+            else:
+                raise OpError(index, f"Unknown op '{kind}'")
+
+        # Earlier ops may have moved the sections later ops report
+        set_positions(serialized)
+        for entry, section in zip((entry for entry in applied if 'section' in entry), serialized):
+            entry['section']['order'] = section_index(section)
+
+        Resume.objects.filter(pk=resume.pk).update(updated_at=timezone.now())
+        resume.refresh_from_db(fields=['version'])
+        return resume.version, applied
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+import weakref
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from .archive import restore_resume
+from .collab import OpError, apply_section_ops
+from .models import Resume
+
+logger = logging.getLogger(__name__)
+
+CLOSE_UNAUTHENTICATED = 4401
+CLOSE_FORBIDDEN = 4403
+
+# One lock per resume so batches from this process are applied and broadcast in order
+_resume_locks = weakref.WeakValueDictionary()
+
+
+def resume_lock(resume_id):
+    lock = _resume_locks.get(resume_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _resume_locks[resume_id] = lock
+    return lock
+
+
+@database_sync_to_async
+def authenticate_token(raw_token):
+    """Return (user, expiry timestamp) for a JWT access token, or (None, None) if it is invalid"""
+    authentication = JWTAuthentication()
+    try:
+        token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(token), token['exp']
+    except (InvalidToken, AuthenticationFailed, TokenError, KeyError):
+        return None, None
+
+
+@database_sync_to_async
+def get_resume_version(resume_id, user):
+    """Return the resume's version if the user owns it, else None; archived resumes are restored for editing"""
+    resume = Resume.objects.filter(pk=resume_id, user=user).only('version', 'is_archived').first()
+    if resume is None:
+        return None
+    restore_resume(resume)
+    return resume.version
+
+
+class ResumeEditConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Collaborative editing channel for one resume.
+
+    The first message must be ``{"type": "auth", "token": "<access JWT>"}``.
+    The socket is closed when that token expires unless the client sends
+    another ``auth`` message with a fresh token for the same user. Clients send
+    ``{"type": "ops", "client_seq": n, "ops": [...]}`` batches, get an ``ack``
+    with the new resume version, and other sessions on the resume receive the
+    applied ops.
+    """
+
+    async def connect(self):
+        self.resume_id = int(self.scope['url_route']['kwargs']['resume_id'])
+        self.group_name = f'resume_{self.resume_id}'
+        self.user = None
+        self.expiry_timer = None
+        await self.accept()
+        self.auth_timer = asyncio.get_running_loop().call_later(
+            getattr(settings, 'COLLAB_AUTH_TIMEOUT', 10),
+            lambda: asyncio.ensure_future(self.close(code=CLOSE_UNAUTHENTICATED)) if self.user is None else None,
+        )
+
+    async def disconnect(self, code):
+        self.auth_timer.cancel()
+        if self.expiry_timer is not None:
+            self.expiry_timer.cancel()
+        if self.user is not None:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if self.user is None:
+            await self.authenticate(content)
+        elif content.get('type') == 'auth':
+            await self.reauthenticate(content)
+        elif content.get('type') == 'ops':
+            await self.apply_ops(content)
+        else:
+            await self.send_json({'type': 'error', 'detail': f"Unknown message type '{content.get('type')}'"})
+
+    async def authenticate(self, content):
+        if content.get('type') != 'auth' or not content.get('token'):
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+        user, expires_at = await authenticate_token(content['token'])
+        if user is None:
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+        version = await get_resume_version(self.resume_id, user)
+        if version is None:
+            await self.close(code=CLOSE_FORBIDDEN)
+            return
+
+        self.user = user
+        self.auth_timer.cancel()
+        self.expire_at(expires_at)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.send_json({'type': 'ready', 'resume_id': self.resume_id, 'version': version})
+
+    async def reauthenticate(self, content):
+        """Extend the session with a fresh token for the same user"""
+        user, expires_at = await authenticate_token(content.get('token') or '')
+        if user is None or user.pk != self.user.pk:
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+        self.expire_at(expires_at)
+        await self.send_json({'type': 'authenticated', 'expires_at': expires_at})
+
+    def expire_at(self, timestamp):
+        """Close the socket once the token it was authenticated with expires"""
+        if self.expiry_timer is not None:
+            self.expiry_timer.cancel()
+        self.expiry_timer = asyncio.get_running_loop().call_later(
+            max(timestamp - time.time(), 0),
+            lambda: asyncio.ensure_future(self.close(code=CLOSE_UNAUTHENTICATED)),
+        )
+
+    async def apply_ops(self, content):
+        ops = content.get('ops')
+        max_ops = getattr(settings, 'COLLAB_MAX_OPS_PER_BATCH', 100)
+        if not isinstance(ops, list) or not ops or len(ops) > max_ops:
+            await self.send_json({
+                'type': 'error',
+                'client_seq': content.get('client_seq'),
+                'detail': f'ops must be a list of 1 to {max_ops} operations',
+            })
+            return
+
+        async with resume_lock(self.resume_id):
+            try:
+                version, applied = await database_sync_to_async(apply_section_ops)(self.resume_id, self.user, ops)
+            except OpError as exc:
+                await self.send_json({
+                    'type': 'error',
+                    'client_seq': content.get('client_seq'),
+                    'index': exc.index,
+                    'errors': exc.errors,
+                })
+                return
+            except Resume.DoesNotExist:
+                await self.close(code=CLOSE_FORBIDDEN)
+                return
+            # Broadcast while holding the lock so every session sees batches in version order
+            await self.channel_layer.group_send(self.group_name, {
+                'type': 'resume.ops',
+                'version': version,
+                'ops': applied,
+                'origin': self.channel_name,
+            })
+
+        await self.send_json({'type': 'ack', 'client_seq': content.get('client_seq'), 'version': version, 'ops': applied})
+
+    async def resume_ops(self, event):
+        """Forward a batch applied by another session"""
+        if event['origin'] != self.channel_name:
+            await self.send_json({'type': 'ops', 'version': event['version'], 'ops': event['ops']})
@@ -0,0 +1,214 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+from functools import partial
+
+import jwt
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Routing state of the request being handled; None outside requests
+_request_state = contextvars.ContextVar('db_routing_state', default=None)
+
+# Replica alias -> monotonic time until which it is skipped after a failed connect or query
+_unavailable = {}
+_unavailable_lock = threading.Lock()
+
+
+class RoutingState:
+    """Per-request routing decision: pinned requests read from the primary"""
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+        # Replica aliases a query failed on
+        self.failed = set()
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def mark_unavailable(alias):
+    retry = getattr(settings, 'DB_REPLICA_RETRY_SECONDS', 30)
+    with _unavailable_lock:
+        _unavailable[alias] = time.monotonic() + retry
+    logger.warning(f"Replica {alias} is unavailable, reading from the primary for {retry}s")
+
+
+def reset_unavailable():
+    with _unavailable_lock:
+        _unavailable.clear()
+
+
+def is_available(alias):
+    """Connect to a replica if needed; False (and skipped for a while) if that fails"""
+    retry_at = _unavailable.get(alias)
+    if retry_at is not None:
+        if time.monotonic() < retry_at:
+            return False
+        with _unavailable_lock:
+            _unavailable.pop(alias, None)
+
+    connection = connections[alias]
+    if connection.connection is None:
+        try:
+            connection.ensure_connection()
+        except DatabaseError:
+            mark_unavailable(alias)
+            return False
+    return True
+
+
+def read_from_primary(alias, state, execute, sql, params, many, context):
+    """
+    Execute wrapper running a replica query that fails on the primary instead.
+
+    The rows are then fetched through the replica's cursor wrapper from the
+    primary's cursor, so only the failed query runs again and the rest of the
+    request (throttles, view counters, ...) isn't repeated.
+    """
+    try:
+        return execute(sql, params, many, context)
+    except DatabaseError:
+        if many:
+            raise
+        state.failed.add(alias)
+        mark_unavailable(alias)
+        primary = connections['default'].cursor()
+        result = primary.execute(sql, params)
+        context['cursor'].cursor = primary.cursor
+        return result
+
+
+def choose_replica():
+    """Return a random available replica alias, or None"""
+    replicas = list(get_replicas())
+    random.shuffle(replicas)
+    for alias in replicas:
+        if is_available(alias):
+            return alias
+    return None
+
+
+class ReplicaRouter:
+    """
+    Send reads to a replica and writes to the primary ('default').
+
+    Only reads made while handling a request go to replicas, and only when
+    ReplicaRoutingMiddleware has not pinned the request to the primary.
+    Reads inside a transaction on the primary, and reads of objects related
+    to an instance loaded from the primary, stay on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or state.pinned or state.wrote or not get_replicas():
+            return 'default'
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db == 'default':
+            return 'default'
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return choose_replica() or 'default'
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db not in get_replicas()
+
+
+def sticky_key(request):
+    """
+    Identify the client for read-your-writes stickiness without touching the
+    database: the JWT's user id claim (signature is not checked, this is only
+    a routing hint), else the session cookie, else the client IP.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header.startswith('Bearer '):
+        try:
+            claims = jwt.decode(header[7:], options={'verify_signature': False})
+            user_id = claims.get(jwt_settings.USER_ID_CLAIM)
+            if user_id is not None:
+                return f'user:{user_id}'
+        except jwt.InvalidTokenError:
+            pass
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session_key:
+        return f'session:{session_key}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def pin_cache():
+    return caches[getattr(settings, 'DB_REPLICA_STICKY_CACHE_ALIAS', 'default')]
+
+
+def pin_to_primary(request):
+    """
+    Pin the client's reads to the primary for DB_REPLICA_STICKY_SECONDS from
+    now. For writes made after the middleware has returned, e.g. while a
+    streaming response is sent.
+    """
+    if get_replicas():
+        pin_cache().set(f'db-pin:{sticky_key(request)}', 1, getattr(settings, 'DB_REPLICA_STICKY_SECONDS', 5))
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Pin a client's reads to the primary for DB_REPLICA_STICKY_SECONDS after it
+    writes, so it never reads its own changes from a lagging replica.
+
+    Unsafe requests and requests that wrote anything are pinned. The pin is
+    kept in the DB_REPLICA_STICKY_CACHE_ALIAS cache, which must be shared by
+    all workers for stickiness to hold across them.
+
+    A replica query that fails (the replica went away after connecting, or
+    fell over mid-query) is run again on the primary, see ``read_from_primary``,
+    and the replica is skipped for DB_REPLICA_RETRY_SECONDS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_replicas():
+            return self.get_response(request)
+
+        pinned = request.method not in SAFE_METHODS or pin_cache().get(f'db-pin:{sticky_key(request)}') is not None
+        state = RoutingState(pinned)
+        token = _request_state.set(state)
+        try:
+            with ExitStack() as stack:
+                if not pinned:
+                    for alias in get_replicas():
+                        stack.enter_context(connections[alias].execute_wrapper(partial(read_from_primary, alias, state)))
+                response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        # Reconnect once the replica is tried again
+        for alias in state.failed:
+            connections[alias].close()
+
+        if state.wrote or request.method not in SAFE_METHODS:
+            pin_to_primary(request)
+        return response
@@ -0,0 +1,154 @@
+from bisect import bisect_left
+from collections import defaultdict
+
+# Fields that identify an item inside a section's content['items'], per section type
+ITEM_KEY_FIELDS = {
+    'experience': ('title', 'company'),
+    'education': ('degree', 'institution'),
+    'projects': ('title',),
+    'skills': ('name',),
+    'custom': ('title',),
+}
+
+RESUME_FIELDS = ('title', 'template_name')
+STYLE_FIELDS = ('primary_color', 'font_family', 'font_size')
+
+
+def item_key(item, fields):
+    """Return a hashable identity for a content item"""
+    if isinstance(item, dict):
+        if item.get('id') is not None:
+            return ('id', str(item['id']))
+        return tuple(str(item.get(field, '')).strip().lower() for field in fields)
+    if isinstance(item, str):
+        return ('value', item.strip().lower())
+    return ('repr', repr(item))
+
+
+def keyed(items, fields):
+    """Key every item, numbering repeats so duplicate keys still pair up in order"""
+    seen = defaultdict(int)
+    keys = []
+    for item in items:
+        key = item_key(item, fields)
+        keys.append((key, seen[key]))
+        seen[key] += 1
+    return keys
+
+
+def longest_increasing_subsequence(values):
+    """Return the set of positions in values forming a longest increasing run (O(n log n))"""
+    tails, tail_positions = [], []
+    previous = [None] * len(values)
+    for position, value in enumerate(values):
+        index = bisect_left(tails, value)
+        if index == len(tails):
+            tails.append(value)
+            tail_positions.append(position)
+        else:
+            tails[index] = value
+            tail_positions[index] = position
+        previous[position] = tail_positions[index - 1] if index else None
+    keep = set()
+    position = tail_positions[-1] if tail_positions else None
+    while position is not None:
+        keep.add(position)
+        position = previous[position]
+    return keep
+
+
+def diff_fields(old, new, path, ops, fields=None):
+    """Append replace/add/remove ops for top-level keys of two dicts"""
+    keys = fields if fields is not None else list(dict.fromkeys([*old, *new]))
+    for key in keys:
+        if key in old and key not in new:
+            ops.append({'op': 'remove', 'path': f'{path}/{key}'})
+        elif key not in old and key in new:
+            ops.append({'op': 'add', 'path': f'{path}/{key}', 'value': new[key]})
+        elif old.get(key) != new.get(key):
+            ops.append({'op': 'replace', 'path': f'{path}/{key}', 'from': old.get(key), 'value': new.get(key)})
+
+
+def diff_items(old_items, new_items, path, fields, ops):
+    """
+    Keyed list diff in linear time (plus O(n log n) for move detection).
+
+    Items are matched by key through a dict instead of comparing every pair.
+    Matched items that fall outside the longest increasing subsequence of new
+    positions are reported as moves, so reordering one item is one op.
+    Removals use old indexes; adds, moves and replaces use new indexes.
+    """
+    old_keys, new_keys = keyed(old_items, fields), keyed(new_items, fields)
+    new_positions = {key: index for index, key in enumerate(new_keys)}
+
+    matched = []
+    for old_index, key in enumerate(old_keys):
+        new_index = new_positions.get(key)
+        if new_index is None:
+            ops.append({'op': 'remove', 'path': f'{path}/{old_index}'})
+        else:
+            matched.append((old_index, new_index))
+
+    stable = longest_increasing_subsequence([new_index for _, new_index in matched])
+    matched_new = set()
+    for position, (old_index, new_index) in enumerate(matched):
+        matched_new.add(new_index)
+        if position not in stable:
+            ops.append({'op': 'move', 'from': f'{path}/{old_index}', 'path': f'{path}/{new_index}'})
+        old_item, new_item = old_items[old_index], new_items[new_index]
+        if old_item != new_item:
+            if isinstance(old_item, dict) and isinstance(new_item, dict):
+                diff_fields(old_item, new_item, f'{path}/{new_index}', ops)
+            else:
+                ops.append({'op': 'replace', 'path': f'{path}/{new_index}', 'from': old_item, 'value': new_item})
+
+    for new_index, item in enumerate(new_items):
+        if new_index not in matched_new:
+            ops.append({'op': 'add', 'path': f'{path}/{new_index}', 'value': item})
+
+
+def diff_content(section_type, old, new, path, ops):
+    """Diff two section contents, using a keyed diff for content['items']"""
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        if old != new:
+            ops.append({'op': 'replace', 'path': path, 'from': old, 'value': new})
+        return
+    old_items, new_items = old.get('items'), new.get('items')
+    if isinstance(old_items, list) and isinstance(new_items, list):
+        diff_items(old_items, new_items, f'{path}/items', ITEM_KEY_FIELDS.get(section_type, ('title',)), ops)
+        old = {k: v for k, v in old.items() if k != 'items'}
+        new = {k: v for k, v in new.items() if k != 'items'}
+    diff_fields(old, new, path, ops)
+
+
+def group_sections(sections):
+    """Group serialized sections by type, each group in display order"""
+    groups = defaultdict(list)
+    for section in sorted(sections, key=lambda s: s.get('order', 0)):
+        groups[section['type']].append(section)
+    return groups
+
+
+def diff_resumes(old, new):
+    """
+    Structural diff between two serialized resumes (ResumeSerializer output).
+
+    Sections are matched by type and by position among sections of that type,
+    and paths look like ``sections/experience/0/items/3/company``.
+    """
+    ops = []
+    diff_fields(old, new, 'resume', ops, fields=RESUME_FIELDS)
+    diff_fields(old.get('style') or {}, new.get('style') or {}, 'style', ops, fields=STYLE_FIELDS)
+
+    old_groups, new_groups = group_sections(old.get('sections', [])), group_sections(new.get('sections', []))
+    for section_type in dict.fromkeys([*old_groups, *new_groups]):
+        old_sections, new_sections = old_groups.get(section_type, []), new_groups.get(section_type, [])
+        for index in range(max(len(old_sections), len(new_sections))):
+            path = f'sections/{section_type}/{index}'
+            if index >= len(new_sections):
+                ops.append({'op': 'remove', 'path': path})
+            elif index >= len(old_sections):
+                ops.append({'op': 'add', 'path': path, 'value': new_sections[index]['content']})
+            else:
+                diff_content(section_type, old_sections[index]['content'], new_sections[index]['content'], path, ops)
+    return ops
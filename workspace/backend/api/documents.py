@@ -0,0 +1,153 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .archive import decode_sections
+from .changes import deleted_directly, is_muted
+from .models import Resume, ResumeArchive, ResumeDocument, Section, Style
+from .serializers import ResumeSerializer
+
+_state = threading.local()
+
+
+def enabled():
+    return getattr(settings, 'RESUME_DOCUMENTS_ENABLED', False)
+
+
+def build_documents(resume_ids):
+    """
+    Serialize the given resumes the way ResumeSerializer does for a detail
+    read; returns {resume id: (version, data)}.
+
+    Archived resumes are read from their archive without restoring them.
+    Trashed resumes are included.
+    """
+    resumes = list(Resume.all_objects.filter(pk__in=resume_ids).select_related('style'))
+    sections = defaultdict(list)
+    live = [resume.pk for resume in resumes if not resume.is_archived]
+    for section in Section.objects.filter(resume_id__in=live).order_by('resume_id', 'rank', 'order', 'id'):
+        sections[section.resume_id].append(section)
+    archived = [resume.pk for resume in resumes if resume.is_archived]
+    for resume_id, data in ResumeArchive.objects.filter(resume_id__in=archived).values_list('resume_id', 'data'):
+        rows = sorted(decode_sections(data), key=lambda row: (row['rank'], row['order'], row['id']))
+        sections[resume_id] = [Section(resume_id=resume_id, **row) for row in rows]
+
+    documents = {}
+    for resume in resumes:
+        for position, section in enumerate(sections[resume.pk], 1):
+            section.position = position
+        resume._prefetched_objects_cache = {'sections': sections[resume.pk]}
+        documents[resume.pk] = (resume.version, ResumeSerializer(resume).data)
+    return documents
+
+
+def refresh_documents(resume_ids):
+    """Rebuild and store the documents of the given resumes in the current transaction"""
+    documents = build_documents(resume_ids)
+    ResumeDocument.objects.bulk_create(
+        [ResumeDocument(resume_id=resume_id, version=version, data=data)
+         for resume_id, (version, data) in documents.items()],
+        update_conflicts=True, unique_fields=['resume'], update_fields=['data', 'version', 'built_at'],
+    )
+    return len(documents)
+
+
+def refresh_document(resume_id):
+    """Rebuild one resume's document now, or when the enclosing ``deferred()`` block ends"""
+    if not enabled():
+        return
+    pending = getattr(_state, 'pending', None)
+    if pending is not None:
+        pending.add(resume_id)
+    else:
+        refresh_documents([resume_id])
+
+
+@contextmanager
+def deferred():
+    """
+    Rebuild each touched document once when the block ends, for writes that
+    change a resume several times. Use it inside the write's transaction so
+    the rebuild is part of it.
+    """
+    if getattr(_state, 'pending', None) is not None:
+        # The outer block rebuilds them
+        yield
+        return
+    _state.pending = set()
+    try:
+        yield
+        pending = _state.pending
+    finally:
+        _state.pending = None
+    if pending:
+        refresh_documents(pending)
+
+
+def stored_document(**filters):
+    """
+    Return (resume id, data) of the one resume document matching ``filters``
+    (lookups on ResumeDocument, e.g. ``resume__user=user``), or None when it
+    is missing, stale or documents are disabled. Trashed resumes never match.
+    """
+    if not enabled():
+        return None
+    try:
+        row = ResumeDocument.objects.filter(resume__deleted_at__isnull=True, **filters).values_list(
+            'resume_id', 'version', 'resume__version', 'data'
+        ).first()
+    except (TypeError, ValueError, ValidationError):
+        # A malformed lookup value; the regular path reports it
+        return None
+    if row is None or row[1] != row[2]:
+        return None
+    return row[0], row[3]
+
+
+def verify_documents(resume_ids):
+    """Yield (resume id, problem) for each of the given resumes whose document is missing, stale or different"""
+    stored = {
+        resume_id: (version, data)
+        for resume_id, version, data in ResumeDocument.objects.filter(resume_id__in=resume_ids).values_list(
+            'resume_id', 'version', 'data'
+        )
+    }
+    for resume_id, (version, data) in build_documents(resume_ids).items():
+        if resume_id not in stored:
+            yield resume_id, 'missing'
+        elif stored[resume_id][0] != version:
+            yield resume_id, 'stale'
+        elif stored[resume_id][1] != data:
+            yield resume_id, 'different'
+
+
+# The version bumps in api.changes are connected first, so documents are built at the new version
+
+@receiver(post_save, sender=Resume, dispatch_uid='resume_document_saved')
+def resume_saved(sender, instance, raw=False, **kwargs):
+    if not raw and not is_muted():
+        refresh_document(instance.pk)
+
+
+@receiver(post_save, sender=Section, dispatch_uid='section_document_saved')
+def section_saved(sender, instance, raw=False, **kwargs):
+    if not raw and not is_muted():
+        refresh_document(instance.resume_id)
+
+
+@receiver(post_delete, sender=Section, dispatch_uid='section_document_deleted')
+def section_deleted(sender, instance, origin=None, **kwargs):
+    if deleted_directly(origin, Section) and not is_muted():
+        refresh_document(instance.resume_id)
+
+
+@receiver(post_save, sender=Style, dispatch_uid='style_document_saved')
+def style_saved(sender, instance, raw=False, **kwargs):
+    # Unlike the change feed this includes creation, which follows the resume's own save
+    if not raw and not is_muted():
+        refresh_document(instance.resume_id)
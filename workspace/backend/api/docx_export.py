@@ -0,0 +1,280 @@
+import hashlib
+import json
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Section, Style
+
+CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+# Part of the content hash: bump when the generated markup changes so cached files are rebuilt
+FORMAT_VERSION = 1
+
+# Characters XML 1.0 can't contain, which pasted text sometimes does
+INVALID_XML_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+COLOR_RE = re.compile(r'^#?([0-9A-Fa-f]{6})$')
+
+HEADINGS = {
+    'summary': 'Summary',
+    'experience': 'Experience',
+    'education': 'Education',
+    'skills': 'Skills',
+    'languages': 'Languages',
+    'projects': 'Projects',
+}
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+PACKAGE_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="word/document.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>'
+)
+DOCUMENT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="styles.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+    '</Relationships>'
+)
+DOCUMENT_HEAD = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document xmlns:w="{W_NS}"><w:body>'
+# US Letter with 0.75in margins
+DOCUMENT_TAIL = (
+    '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1080" w:right="1080" w:bottom="1080" w:left="1080" w:header="720" w:footer="720" w:gutter="0"/>'
+    '</w:sectPr></w:body></w:document>'
+)
+
+
+def export_inputs(resume):
+    """Everything the document is built from, as plain JSON-serializable data"""
+    try:
+        style = resume.style
+    except Style.DoesNotExist:
+        style = Style()
+    sections = Section.objects.filter(resume_id=resume.pk).order_by('rank', 'order', 'id')
+    return {
+        'title': resume.title,
+        'style': {'color': style.primary_color, 'font': style.font_family, 'size': style.font_size},
+        'sections': [[section_type, content] for section_type, content in sections.values_list('type', 'content')],
+    }
+
+
+def content_hash(inputs):
+    payload = json.dumps([FORMAT_VERSION, inputs], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def text(value):
+    return escape(INVALID_XML_RE.sub('', str(value)))
+
+
+def run(value, italic=False):
+    """A run of text; newlines become line breaks"""
+    props = '<w:rPr><w:i/></w:rPr>' if italic else ''
+    lines = str(value).split('\n')
+    body = '<w:br/>'.join(f'<w:t xml:space="preserve">{text(line)}</w:t>' for line in lines)
+    return f'<w:r>{props}{body}</w:r>'
+
+
+def paragraph(*runs, style=None):
+    props = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ''
+    return f'<w:p>{props}{"".join(runs)}</w:p>'
+
+
+def items_of(content):
+    """Section items, accepting the older single-object shape like the frontend templates do"""
+    items = content.get('items')
+    if isinstance(items, list):
+        return items
+    if any(content.get(key) for key in ('title', 'degree', 'name', 'jobTitle')):
+        return [content]
+    return []
+
+
+def records(content):
+    return [item for item in items_of(content) if isinstance(item, dict)]
+
+
+def item_name(item):
+    if isinstance(item, dict):
+        return item.get('name') or item.get('language') or item.get('title') or ''
+    return str(item)
+
+
+def joined(*values, separator=' · '):
+    return separator.join(str(value) for value in values if value)
+
+
+def dates(item):
+    return joined(item.get('start_date'), item.get('end_date'), separator=' – ')
+
+
+def section_paragraphs(section_type, content):
+    """Yield the paragraphs of one section"""
+    if not isinstance(content, dict):
+        return
+    if section_type == 'contact':
+        if content.get('name'):
+            yield paragraph(run(content['name']), style='Title')
+        if content.get('title'):
+            yield paragraph(run(content['title'], italic=True))
+        details = joined(*(content.get(key) for key in ('email', 'phone', 'location', 'website', 'linkedin')),
+                         separator=' | ')
+        if details:
+            yield paragraph(run(details))
+        return
+
+    heading = HEADINGS.get(section_type) or content.get('title') or section_type.title()
+    yield paragraph(run(heading), style='Heading1')
+    if section_type == 'summary':
+        if content.get('text'):
+            yield paragraph(run(content['text']))
+    elif section_type == 'experience':
+        for item in records(content):
+            yield paragraph(run(joined(item.get('title') or item.get('jobTitle'), item.get('company'),
+                                       separator=', ')), style='Heading2')
+            meta = joined(item.get('location'), dates(item))
+            if meta:
+                yield paragraph(run(meta, italic=True))
+            if item.get('description'):
+                yield paragraph(run(item['description']))
+    elif section_type == 'education':
+        for item in records(content):
+            yield paragraph(run(joined(item.get('degree'), item.get('field'), separator=', ')), style='Heading2')
+            meta = joined(item.get('institution'), item.get('location'), dates(item))
+            if meta:
+                yield paragraph(run(meta, italic=True))
+            if item.get('gpa'):
+                yield paragraph(run(f"GPA {item['gpa']}"))
+    elif section_type in ('skills', 'languages'):
+        names = joined(*(item_name(item) for item in items_of(content)), separator=', ')
+        if names:
+            yield paragraph(run(names))
+    elif section_type == 'projects':
+        for item in records(content):
+            yield paragraph(run(item.get('title') or item.get('name') or ''), style='Heading2')
+            technologies = item.get('technologies')
+            if isinstance(technologies, list):
+                technologies = ', '.join(str(technology) for technology in technologies)
+            meta = joined(technologies, item.get('link'))
+            if meta:
+                yield paragraph(run(meta, italic=True))
+            if item.get('description'):
+                yield paragraph(run(item['description']))
+    else:
+        body = content.get('content') or content.get('text')
+        if body:
+            yield paragraph(run(body))
+
+
+def styles_xml(style):
+    color = COLOR_RE.match(style['color'] or '')
+    color = color.group(1).upper() if color else '000000'
+    font = text(style['font'] or 'Calibri').replace('"', '&quot;')
+    # Word sizes are in half points
+    size = max(1, int(style['size'] or 10)) * 2
+    return (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:styles xmlns:w="{W_NS}">'
+        f'<w:docDefaults><w:rPrDefault><w:rPr><w:rFonts w:ascii="{font}" w:hAnsi="{font}" w:cs="{font}"/>'
+        f'<w:sz w:val="{size}"/><w:szCs w:val="{size}"/></w:rPr></w:rPrDefault>'
+        '<w:pPrDefault><w:pPr><w:spacing w:after="80"/></w:pPr></w:pPrDefault></w:docDefaults>'
+        '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+        '<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/>'
+        f'<w:rPr><w:b/><w:color w:val="{color}"/><w:sz w:val="{size * 2}"/></w:rPr></w:style>'
+        '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/>'
+        '<w:pPr><w:keepNext/><w:spacing w:before="240"/>'
+        f'<w:pBdr><w:bottom w:val="single" w:sz="6" w:space="1" w:color="{color}"/></w:pBdr></w:pPr>'
+        f'<w:rPr><w:b/><w:color w:val="{color}"/><w:sz w:val="{size + 6}"/></w:rPr></w:style>'
+        '<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/><w:basedOn w:val="Normal"/>'
+        '<w:pPr><w:keepNext/><w:spacing w:before="120" w:after="0"/></w:pPr>'
+        f'<w:rPr><w:b/><w:sz w:val="{size + 2}"/></w:rPr></w:style>'
+        '</w:styles>'
+    )
+
+
+class ChunkWriter:
+    """Write-only file that hands written bytes back in chunks; zipfile streams into it"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        if self.chunks:
+            yield b''.join(self.chunks)
+            self.chunks, self.size = [], 0
+
+
+def stream_docx(inputs, chunk_size=64 * 1024):
+    """
+    Yield the .docx package for ``inputs`` in chunks of about ``chunk_size``.
+
+    The zip is written to a non-seekable writer, so zipfile puts each entry's
+    sizes in a trailing data descriptor and nothing is ever rewritten;
+    document.xml is compressed and handed on section by section.
+    """
+    out = ChunkWriter()
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', CONTENT_TYPES_XML)
+        package.writestr('_rels/.rels', PACKAGE_RELS_XML)
+        package.writestr('word/_rels/document.xml.rels', DOCUMENT_RELS_XML)
+        package.writestr('word/styles.xml', styles_xml(inputs['style']))
+        with package.open('word/document.xml', 'w') as document:
+            document.write(DOCUMENT_HEAD.encode())
+            for section_type, content in inputs['sections']:
+                for xml in section_paragraphs(section_type, content):
+                    document.write(xml.encode())
+                if out.size >= chunk_size:
+                    yield from out.drain()
+            document.write(DOCUMENT_TAIL.encode())
+    yield from out.drain()
+
+
+def cache_key(digest):
+    return f'docx:{digest}'
+
+
+def get_cached(digest):
+    return caches[getattr(settings, 'DOCX_CACHE_ALIAS', 'default')].get(cache_key(digest))
+
+
+def caching_stream(chunks, digest):
+    """Pass chunks through and cache the whole file once it's complete, unless it's too big"""
+    max_bytes = getattr(settings, 'DOCX_CACHE_MAX_BYTES', 5 * 1024 * 1024)
+    kept, size = [], 0
+    for chunk in chunks:
+        if kept is not None:
+            size += len(chunk)
+            if size <= max_bytes:
+                kept.append(chunk)
+            else:
+                kept = None
+        yield chunk
+    if kept is not None:
+        caches[getattr(settings, 'DOCX_CACHE_ALIAS', 'default')].set(
+            cache_key(digest), b''.join(kept), getattr(settings, 'DOCX_CACHE_TIMEOUT', 86400)
+        )
@@ -4,6 +4,7 @@ from rest_framework import status
 from django.http import Http404
 from django.core.exceptions import PermissionDenied
 from django.db import IntegrityError
+from .metrics import record_exception
 
 def custom_exception_handler(exc, context):
     """
@@ -11,6 +12,7 @@ def custom_exception_handler(exc, context):
     """
     # Call REST framework's default exception handler first
     response = exception_handler(exc, context)
+    record_exception(exc)
 
     # Log the exception for debugging
     import logging
@@ -0,0 +1,100 @@
+import re
+
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+
+from .models import Section
+
+# "sections[type=contact,summary]" or a bare "style"; commas inside brackets belong to the filter
+INCLUDE_RE = re.compile(r'\s*(\w+)(?:\[(\w+)=([^\]]*)\])?\s*(?:,|$)')
+
+RELATIONS = ('sections', 'style')
+# Resume columns always loaded: the pk, plus what get_object needs for archived resumes
+ALWAYS_LOADED = ('id', 'is_archived')
+STYLE_COLUMNS = ('id', 'primary_color', 'font_family', 'font_size')
+
+
+class Fieldset:
+    """Top-level fields to return, plus an optional section type filter"""
+
+    def __init__(self, fields, section_types=None):
+        self.fields = fields
+        self.section_types = section_types
+
+    def __repr__(self):
+        return f'Fieldset({sorted(self.fields)}, section_types={self.section_types})'
+
+
+def parse_include(value):
+    """Parse ?include= into {relation: (filter key, [values]) or None}"""
+    includes, position = {}, 0
+    while position < len(value):
+        match = INCLUDE_RE.match(value, position)
+        if match is None or match.end() == position:
+            raise ValidationError({'include': f"Could not parse '{value[position:]}'"})
+        name, key, values = match.groups()
+        if name not in RELATIONS:
+            raise ValidationError({'include': f"Unknown relation '{name}'. Options are: {', '.join(RELATIONS)}"})
+        if key is not None:
+            if (name, key) != ('sections', 'type'):
+                raise ValidationError({'include': f"'{name}' can't be filtered by '{key}'"})
+            includes[name] = (key, [v.strip() for v in values.split(',') if v.strip()])
+        else:
+            includes.setdefault(name, None)
+        position = match.end()
+    return includes
+
+
+def parse_fieldset(query_params, allowed, default):
+    """
+    Build a Fieldset from ``?fields=`` and ``?include=``, or return None when
+    neither is given so callers keep their default behavior.
+
+    ``fields`` picks top-level fields from ``allowed`` (``default`` when
+    omitted); ``include`` adds relations, optionally filtered, e.g.
+    ``include=sections[type=contact,summary]``.
+    """
+    fields_param, include_param = query_params.get('fields'), query_params.get('include')
+    if fields_param is None and include_param is None:
+        return None
+
+    if fields_param is not None:
+        fields = {name.strip() for name in fields_param.split(',') if name.strip()}
+        unknown = fields - set(allowed)
+        if unknown:
+            raise ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}"})
+    else:
+        fields = set(default)
+
+    section_types = None
+    includes = parse_include(include_param or '')
+    for name, condition in includes.items():
+        if name not in allowed:
+            raise ValidationError({'include': f"'{name}' is not available here"})
+        fields.add(name)
+        if condition is not None:
+            section_types = condition[1]
+            valid = dict(Section.SECTION_TYPES)
+            invalid = [t for t in section_types if t not in valid]
+            if invalid:
+                raise ValidationError({'include': f"Invalid section types: {', '.join(invalid)}"})
+    return Fieldset(fields, section_types)
+
+
+def apply_fieldset(queryset, fieldset, columns):
+    """
+    Load only what the fieldset serializes: ``.only()`` on the resume columns
+    in ``columns``, the style join only when asked for, and sections through
+    a prefetch filtered by type.
+    """
+    loaded = [*ALWAYS_LOADED, *(name for name in columns if name in fieldset.fields)]
+    if 'style' in fieldset.fields:
+        queryset = queryset.select_related('style')
+        loaded += [f'style__{column}' for column in STYLE_COLUMNS]
+    if 'sections' in fieldset.fields:
+        sections = Section.objects.all()
+        if fieldset.section_types is not None:
+            # Positions still count the sections filtered out
+            sections = sections.filter(type__in=fieldset.section_types).with_positions()
+        queryset = queryset.prefetch_related(Prefetch('sections', queryset=sections))
+    return queryset.only(*loaded)
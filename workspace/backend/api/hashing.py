@@ -0,0 +1,72 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+_executor = None
+_executor_size = 0
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_hashing_executor():
+    """
+    Return the bounded pool used for password hashing, or None when disabled.
+
+    The pool size comes from PASSWORD_HASHING_POOL_SIZE; 0 hashes inline.
+    """
+    global _executor, _executor_size
+    size = getattr(settings, 'PASSWORD_HASHING_POOL_SIZE', 0)
+    if size <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None or _executor_size != size:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='password-hashing')
+            _executor_size = size
+        return _executor
+
+
+def _run_marked(func, args):
+    _local.in_pool = True
+    try:
+        return func(*args)
+    finally:
+        _local.in_pool = False
+
+
+def run_in_hashing_pool(func, *args):
+    """Run a hashing call in the bounded pool and wait for the result"""
+    executor = get_hashing_executor()
+    # Hashers call encode() from verify(), so nested calls stay on the pool thread
+    if executor is None or getattr(_local, 'in_pool', False):
+        return func(*args)
+    return executor.submit(_run_marked, func, args).result()
+
+
+class PooledHasherMixin:
+    """Run encode/verify in the hashing pool; the algorithm name is unchanged"""
+
+    def encode(self, password, salt, *args, **kwargs):
+        return run_in_hashing_pool(lambda: super(PooledHasherMixin, self).encode(password, salt, *args, **kwargs))
+
+    def verify(self, password, encoded):
+        return run_in_hashing_pool(lambda: super(PooledHasherMixin, self).verify(password, encoded))
+
+
+class PooledPBKDF2PasswordHasher(PooledHasherMixin, PBKDF2PasswordHasher):
+    pass
+
+
+class PooledScryptPasswordHasher(PooledHasherMixin, ScryptPasswordHasher):
+    pass
+
+
+class PooledArgon2PasswordHasher(PooledHasherMixin, Argon2PasswordHasher):
+    pass
@@ -0,0 +1,193 @@
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+# Seconds each startup phase took in this process, in the order they ran
+timings = {}
+_state = {'ready': False, 'started': False, 'errors': {}}
+_warmup_lock = threading.Lock()
+
+
+def record_timing(name, seconds):
+    timings[name] = round(seconds, 4)
+
+
+def warm_urls():
+    """Import every view and build the URL resolver's reverse lookup tables"""
+    from django.urls import get_resolver
+    get_resolver().reverse_dict
+
+
+def warm_drf():
+    """Import DRF's and simplejwt's lazily loaded setting classes"""
+    from rest_framework.settings import api_settings
+    from rest_framework_simplejwt.settings import api_settings as jwt_settings
+    for name in ('DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_RENDERER_CLASSES',
+                 'DEFAULT_PARSER_CLASSES', 'DEFAULT_THROTTLE_CLASSES', 'DEFAULT_PAGINATION_CLASS',
+                 'EXCEPTION_HANDLER'):
+        getattr(api_settings, name)
+    for name in ('AUTH_TOKEN_CLASSES', 'TOKEN_USER_CLASS', 'USER_AUTHENTICATION_RULE'):
+        getattr(jwt_settings, name)
+
+
+def warm_serializers():
+    """Build every API serializer's fields, which fills the model field metadata caches"""
+    from rest_framework import serializers as drf_serializers
+    from . import serializers
+    for value in vars(serializers).values():
+        if (isinstance(value, type) and issubclass(value, drf_serializers.Serializer)
+                and value.__module__ == serializers.__name__):
+            value(context={}).fields
+
+
+def warm_databases():
+    """Open and validate a connection to the primary; replicas connect on first use and the router skips failed ones"""
+    from django.db import DEFAULT_DB_ALIAS, connections
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def warm_caches():
+    """Connect to every cache backend and start building the skill index in the background"""
+    from django.core.cache import caches
+    from .skills import warm_skill_index
+    for alias in settings.CACHES:
+        caches[alias].get('warmup')
+    # It reads every skills section, which can outlast the worker's boot timeout
+    warm_skill_index()
+
+
+STEPS = (
+    ('urls', warm_urls),
+    ('drf', warm_drf),
+    ('serializers', warm_serializers),
+    ('databases', warm_databases),
+    ('caches', warm_caches),
+)
+
+
+def warmup():
+    """
+    Run every warmup step once per process and mark it ready.
+
+    A failing step is logged but doesn't stop the others; the readiness check
+    keeps failing and retries it until it passes. The readiness check also
+    validates the databases itself on every probe. Returns the step timings.
+    """
+    with _warmup_lock:
+        if _state['ready']:
+            return timings
+        _state['started'] = True
+        start = time.perf_counter()
+        for name, step in STEPS:
+            step_start = time.perf_counter()
+            try:
+                step()
+            except Exception as exc:
+                logger.exception(f"Warmup step {name} failed")
+                _state['errors'][name] = f'{type(exc).__name__}: {exc}'
+            record_timing(name, time.perf_counter() - step_start)
+        record_timing('warmup', time.perf_counter() - start)
+        _state['ready'] = True
+    logger.info(f"Worker {os.getpid()} ready: " + ', '.join(f'{name} {seconds:.3f}s' for name, seconds in timings.items()))
+    return timings
+
+
+def retry_failed_steps():
+    """Run the warmup steps that failed again, forgetting the ones that pass now"""
+    if not _state['errors']:
+        return
+    with _warmup_lock:
+        for name, step in STEPS:
+            if name not in _state['errors']:
+                continue
+            try:
+                step()
+            except Exception as exc:
+                _state['errors'][name] = f'{type(exc).__name__}: {exc}'
+            else:
+                del _state['errors'][name]
+                logger.info(f"Warmup step {name} passed on retry")
+
+
+def _warmup_in_background():
+    from django.db import connections
+    try:
+        warmup()
+    finally:
+        # Request threads open their own connections
+        connections.close_all()
+
+
+def start_warmup():
+    """Warm up in a background thread, for servers without a pre-serving hook"""
+    with _warmup_lock:
+        if _state['started']:
+            return
+        _state['started'] = True
+    threading.Thread(target=_warmup_in_background, name='warmup', daemon=True).start()
+
+
+def is_ready():
+    return _state['ready']
+
+
+def check_databases(aliases):
+    """Return {alias: error} for each of the databases that can't run a query"""
+    from django.db import connections
+    errors = {}
+    for alias in aliases:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception as exc:
+            errors[alias] = f'{type(exc).__name__}: {exc}'
+    return errors
+
+
+class HealthCheckMiddleware:
+    """
+    Answers liveness and readiness probes before any other middleware.
+
+    HEALTH_LIVENESS_PATH only says the process serves requests.
+    HEALTH_READINESS_PATH is 503 until this worker has warmed up (see
+    ``warmup``), while a warmup step keeps failing and while the primary
+    database can't be queried. A replica that can't be queried only marks
+    the worker degraded, since the router sends its reads to the primary;
+    failing every worker for it would take the whole service down. Probes
+    skip host validation, sessions and auth, so they work against a pod IP.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.liveness_path = getattr(settings, 'HEALTH_LIVENESS_PATH', '/healthz')
+        self.readiness_path = getattr(settings, 'HEALTH_READINESS_PATH', '/readyz')
+
+    def __call__(self, request):
+        if request.path == self.liveness_path:
+            return JsonResponse({'status': 'ok'})
+        if request.path == self.readiness_path:
+            return self.readiness()
+        return self.get_response(request)
+
+    def readiness(self):
+        if not is_ready():
+            start_warmup()
+            return JsonResponse({'status': 'warming up', 'timings': timings}, status=503)
+        from django.db import DEFAULT_DB_ALIAS
+        retry_failed_steps()
+        errors = {**_state['errors'], **check_databases([DEFAULT_DB_ALIAS])}
+        degraded = check_databases(getattr(settings, 'DATABASE_REPLICAS', []))
+        body = {'status': 'unavailable' if errors else 'degraded' if degraded else 'ready', 'timings': timings}
+        if errors:
+            body['errors'] = errors
+        if degraded:
+            body['degraded'] = degraded
+        return JsonResponse(body, status=503 if errors else 200)
@@ -0,0 +1,175 @@
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def job(kind):
+    """Register a function as the handler for jobs of the given kind"""
+    def decorator(func):
+        _registry[kind] = func
+        return func
+    return decorator
+
+
+def get_handler(kind):
+    return _registry.get(kind)
+
+
+def enqueue(kind, payload=None, user=None, max_attempts=None, run_at=None):
+    """Queue a job and return it; the handler receives (payload, job)"""
+    if kind not in _registry:
+        raise ValueError(f"No job handler registered for '{kind}'")
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        user=user,
+        max_attempts=max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 3),
+        run_at=run_at or timezone.now(),
+    )
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_jobs(limit=1, worker=None):
+    """
+    Atomically move up to ``limit`` due jobs to running and return them.
+
+    Backends with SKIP LOCKED (PostgreSQL, MySQL 8) lock candidate rows so
+    concurrent workers never block on each other. Elsewhere (SQLite) each
+    candidate is claimed with a conditional UPDATE and skipped if another
+    worker got there first.
+    """
+    worker = worker or worker_id()
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.STATUS_QUEUED, run_at__lte=now).order_by('run_at', 'id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            if ids:
+                Job.objects.filter(id__in=ids).update(
+                    status=Job.STATUS_RUNNING, locked_by=worker, started_at=now, heartbeat_at=now
+                )
+    else:
+        ids = []
+        for job_id in due.values_list('id', flat=True)[:limit]:
+            claimed = Job.objects.filter(id=job_id, status=Job.STATUS_QUEUED).update(
+                status=Job.STATUS_RUNNING, locked_by=worker, started_at=now, heartbeat_at=now
+            )
+            if claimed:
+                ids.append(job_id)
+
+    return list(Job.objects.filter(id__in=ids).order_by('run_at', 'id'))
+
+
+def backoff_delay(attempts):
+    """Exponential backoff with jitter for the given number of failed attempts"""
+    base = getattr(settings, 'JOB_RETRY_BACKOFF', 5)
+    cap = getattr(settings, 'JOB_RETRY_BACKOFF_MAX', 3600)
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+@contextmanager
+def heartbeat(job):
+    """Refresh the claimed job's ``heartbeat_at`` every JOB_HEARTBEAT_INTERVAL seconds while the block runs"""
+    interval = getattr(settings, 'JOB_HEARTBEAT_INTERVAL', 30)
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                # Stops counting once the job was requeued and claimed elsewhere
+                Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING, locked_by=job.locked_by).update(
+                    heartbeat_at=timezone.now()
+                )
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, name=f'job-heartbeat-{job.pk}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    """Run a claimed job and record success, a scheduled retry or failure"""
+    handler = get_handler(job.kind)
+    job.attempts += 1
+    try:
+        if handler is None:
+            raise LookupError(f"No job handler registered for '{job.kind}'")
+        with heartbeat(job):
+            result = handler(job.payload, job)
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts and handler is not None:
+            job.status = Job.STATUS_QUEUED
+            job.run_at = timezone.now() + timedelta(seconds=backoff_delay(job.attempts))
+            logger.warning(f"Job {job.id} ({job.kind}) failed, retry {job.attempts}/{job.max_attempts}")
+        else:
+            job.status = Job.STATUS_FAILED
+            job.finished_at = timezone.now()
+            logger.error(f"Job {job.id} ({job.kind}) failed permanently")
+    else:
+        job.status = Job.STATUS_SUCCEEDED
+        job.result = result
+        job.error = ''
+        job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.save(update_fields=['status', 'result', 'error', 'attempts', 'run_at', 'locked_by', 'finished_at'])
+    return job
+
+
+def requeue_stale(timeout=None):
+    """
+    Requeue running jobs whose worker sent no heartbeat for ``timeout`` seconds.
+
+    The lost run counts as an attempt, so a job that keeps killing its worker
+    is marked failed at ``max_attempts`` instead of being requeued forever.
+    Returns how many jobs were requeued.
+    """
+    timeout = timeout or getattr(settings, 'JOB_STALE_TIMEOUT', 900)
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=timeout)
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    with transaction.atomic():
+        failed = stale.filter(attempts__gte=F('max_attempts') - 1).update(
+            status=Job.STATUS_FAILED, attempts=F('attempts') + 1, locked_by='', finished_at=now,
+            error=f'The worker stopped sending heartbeats for {timeout} seconds',
+        )
+        requeued = stale.update(status=Job.STATUS_QUEUED, attempts=F('attempts') + 1, locked_by='', run_at=now)
+    if failed:
+        logger.error(f"Failed {failed} stale jobs that ran out of attempts")
+    return requeued
+
+
+def run_pending(limit=10, worker=None):
+    """Claim and run up to ``limit`` due jobs in this thread; return how many ran"""
+    jobs = claim_jobs(limit, worker)
+    for claimed in jobs:
+        run_job(claimed)
+    return len(jobs)
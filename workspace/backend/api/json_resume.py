@@ -0,0 +1,340 @@
+import json
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .archive import decode_sections
+from .documents import enabled as documents_enabled, refresh_documents
+from .docx_export import item_name, items_of
+from .models import Resume, ResumeArchive, ResumeChange, Section, Style
+from .ranking import spread_keys
+
+# https://jsonresume.org/schema
+SCHEMA_URL = 'https://raw.githubusercontent.com/jsonresume/resume-schema/v1.0.0/schema.json'
+TITLE_LENGTH = Resume._meta.get_field('title').max_length
+
+# JSON Resume lists without a section type of their own: custom sections with these
+# titles, one line per entry made of the listed fields
+EXTRA_SECTIONS = {
+    'volunteer': ('Volunteering', ('position', 'organization', 'startDate', 'endDate', 'summary')),
+    'awards': ('Awards', ('title', 'awarder', 'date', 'summary')),
+    'certificates': ('Certificates', ('name', 'issuer', 'date', 'url')),
+    'publications': ('Publications', ('name', 'publisher', 'releaseDate', 'url')),
+    'languages': ('Languages', ('language', 'fluency')),
+    'interests': ('Interests', ('name', 'keywords')),
+    'references': ('References', ('name', 'reference')),
+}
+
+
+class ConversionError(ValueError):
+    """A document that can't be converted; the message names the offending field"""
+
+
+def _object(value, path):
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ConversionError(f'{path}: expected an object')
+    return value
+
+
+def _objects(value, path):
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise ConversionError(f'{path}: expected a list')
+    return [_object(item, f'{path}[{i}]') for i, item in enumerate(value)]
+
+
+def _text(value, path):
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise ConversionError(f'{path}: expected a string')
+
+
+def _strings(value, path):
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise ConversionError(f'{path}: expected a list')
+    return [_text(item, f'{path}[{i}]') for i, item in enumerate(value)]
+
+
+def _with_highlights(summary, highlights):
+    return '\n'.join([summary] * bool(summary) + [f'• {highlight}' for highlight in highlights])
+
+
+def _entry_line(item, fields, path):
+    values = []
+    for field in fields:
+        value = item.get(field)
+        values.append(', '.join(_strings(value, f'{path}.{field}')) if isinstance(value, list)
+                      else _text(value, f'{path}.{field}'))
+    return ' — '.join(value for value in values if value)
+
+
+def from_json_resume(document, title=None):
+    """
+    Convert a JSON Resume document to (title, [(section type, content)]).
+
+    Content uses the shapes the editor and templates read. Lists without a
+    section type of their own become custom sections. Raises ConversionError.
+    """
+    if not isinstance(document, dict):
+        raise ConversionError('document: expected an object')
+    basics = _object(document.get('basics'), 'basics')
+    location = _object(basics.get('location'), 'basics.location')
+    profiles = _objects(basics.get('profiles'), 'basics.profiles')
+    sections = []
+
+    contact = {
+        'name': _text(basics.get('name'), 'basics.name'),
+        'title': _text(basics.get('label'), 'basics.label'),
+        'email': _text(basics.get('email'), 'basics.email'),
+        'phone': _text(basics.get('phone'), 'basics.phone'),
+        'website': _text(basics.get('url'), 'basics.url'),
+        'address': _text(location.get('address'), 'basics.location.address'),
+        'location': ', '.join(filter(None, (
+            _text(location.get(field), f'basics.location.{field}') for field in ('city', 'region', 'countryCode')
+        ))),
+        'linkedin': '',
+    }
+    for i, profile in enumerate(profiles):
+        if _text(profile.get('network'), f'basics.profiles[{i}].network').lower() == 'linkedin':
+            contact['linkedin'] = _text(profile.get('url'), f'basics.profiles[{i}].url')
+    if any(contact.values()):
+        sections.append(('contact', contact))
+    summary = _text(basics.get('summary'), 'basics.summary')
+    if summary:
+        sections.append(('summary', {'text': summary}))
+
+    work = []
+    for i, item in enumerate(_objects(document.get('work'), 'work')):
+        path = f'work[{i}]'
+        start = _text(item.get('startDate'), f'{path}.startDate')
+        work.append({
+            'title': _text(item.get('position'), f'{path}.position'),
+            # Schemas before 1.0 called it company
+            'company': _text(item.get('name') or item.get('company'), f'{path}.name'),
+            'location': _text(item.get('location'), f'{path}.location'),
+            'start_date': start,
+            'end_date': _text(item.get('endDate'), f'{path}.endDate') or ('Present' if start else ''),
+            'description': _with_highlights(
+                _text(item.get('summary'), f'{path}.summary'), _strings(item.get('highlights'), f'{path}.highlights')
+            ),
+        })
+    if work:
+        sections.append(('experience', {'items': work}))
+
+    education = [
+        {
+            'degree': _text(item.get('studyType'), f'education[{i}].studyType'),
+            'field': _text(item.get('area'), f'education[{i}].area'),
+            'institution': _text(item.get('institution'), f'education[{i}].institution'),
+            'location': '',
+            'start_date': _text(item.get('startDate'), f'education[{i}].startDate'),
+            'end_date': _text(item.get('endDate'), f'education[{i}].endDate'),
+            'gpa': _text(item.get('score'), f'education[{i}].score'),
+        }
+        for i, item in enumerate(_objects(document.get('education'), 'education'))
+    ]
+    if education:
+        sections.append(('education', {'items': education}))
+
+    skills = []
+    for i, item in enumerate(_objects(document.get('skills'), 'skills')):
+        name = _text(item.get('name'), f'skills[{i}].name')
+        skills.extend([name] if name else _strings(item.get('keywords'), f'skills[{i}].keywords'))
+    if skills:
+        sections.append(('skills', {'items': skills}))
+
+    projects = [
+        {
+            'title': _text(item.get('name'), f'projects[{i}].name'),
+            'description': _with_highlights(
+                _text(item.get('description'), f'projects[{i}].description'),
+                _strings(item.get('highlights'), f'projects[{i}].highlights')
+            ),
+            'technologies': _strings(item.get('keywords'), f'projects[{i}].keywords'),
+            'link': _text(item.get('url'), f'projects[{i}].url'),
+        }
+        for i, item in enumerate(_objects(document.get('projects'), 'projects'))
+    ]
+    if projects:
+        sections.append(('projects', {'items': projects}))
+
+    for key, (heading, fields) in EXTRA_SECTIONS.items():
+        lines = [_entry_line(item, fields, f'{key}[{i}]') for i, item in enumerate(_objects(document.get(key), key))]
+        lines = [line for line in lines if line]
+        if lines:
+            sections.append(('custom', {'title': heading, 'content': '\n'.join(lines), 'text': ''}))
+
+    meta = _object(document.get('meta'), 'meta')
+    for i, item in enumerate(_objects(meta.get('customSections'), 'meta.customSections')):
+        sections.append(('custom', {
+            'title': _text(item.get('title'), f'meta.customSections[{i}].title'),
+            'content': _text(item.get('content'), f'meta.customSections[{i}].content'),
+            'text': '',
+        }))
+
+    title = (title or _text(meta.get('title'), 'meta.title') or contact['title'] or
+             (f"{contact['name']} Resume" if contact['name'] else 'Imported Resume'))
+    return title[:TITLE_LENGTH], sections
+
+
+def _dict(value):
+    return value if isinstance(value, dict) else {}
+
+
+def to_json_resume(title, sections, last_modified=None):
+    """Convert a resume's title and ordered (type, content) pairs to a JSON Resume document"""
+    basics, work, education, skills, projects, custom = {}, [], [], [], [], []
+    for section_type, content in sections:
+        content = _dict(content)
+        if section_type == 'contact':
+            basics.update({
+                'name': content.get('name'), 'label': content.get('title'), 'email': content.get('email'),
+                'phone': content.get('phone'), 'url': content.get('website'),
+                'location': {'address': content.get('address'), 'city': content.get('location')},
+            })
+            if content.get('linkedin'):
+                basics['profiles'] = [{'network': 'LinkedIn', 'url': content['linkedin']}]
+        elif section_type == 'summary':
+            basics['summary'] = content.get('text')
+        elif section_type == 'experience':
+            work.extend({
+                'name': item.get('company'), 'position': item.get('title') or item.get('jobTitle'),
+                'location': item.get('location'), 'startDate': item.get('start_date'),
+                'endDate': None if item.get('end_date') == 'Present' else item.get('end_date'),
+                'summary': item.get('description'),
+            } for item in map(_dict, items_of(content)))
+        elif section_type == 'education':
+            education.extend({
+                'institution': item.get('institution'), 'area': item.get('field'), 'studyType': item.get('degree'),
+                'startDate': item.get('start_date'), 'endDate': item.get('end_date'), 'score': item.get('gpa'),
+            } for item in map(_dict, items_of(content)))
+        elif section_type == 'skills':
+            skills.extend({'name': item_name(item)} for item in items_of(content))
+        elif section_type == 'projects':
+            projects.extend({
+                'name': item.get('title') or item.get('name'), 'description': item.get('description'),
+                'keywords': item.get('technologies'), 'url': item.get('link'),
+            } for item in map(_dict, items_of(content)))
+        else:
+            custom.append({'title': content.get('title'), 'content': content.get('content') or content.get('text')})
+
+    meta = {'title': title, 'lastModified': last_modified.isoformat() if last_modified else None,
+            'customSections': custom}
+    document = {'$schema': SCHEMA_URL, 'basics': basics, 'work': work, 'education': education,
+                'skills': skills, 'projects': projects, 'meta': meta}
+    return _prune(document)
+
+
+def _prune(value):
+    """Drop empty strings, lists, objects and nulls, which the schema treats as absent"""
+    if isinstance(value, dict):
+        pruned = {key: _prune(item) for key, item in value.items()}
+        return {key: item for key, item in pruned.items() if item not in (None, '', [], {})}
+    if isinstance(value, list):
+        return [item for item in map(_prune, value) if item not in (None, '', [], {})]
+    return value
+
+
+def create_resumes(user, documents):
+    """
+    Insert converted (title, sections) pairs for ``user`` with one bulk insert
+    per table in a single transaction, announcing them in the change feed
+    once it commits. Returns the new resumes.
+    """
+    with transaction.atomic():
+        resumes = Resume.objects.bulk_create([Resume(user=user, title=title) for title, _ in documents])
+        Style.objects.bulk_create([Style(resume=resume) for resume in resumes])
+        Section.objects.bulk_create([
+            Section(resume=resume, type=section_type, content=content, order=position, rank=rank)
+            for resume, (_, sections) in zip(resumes, documents)
+            for position, ((section_type, content), rank) in enumerate(zip(sections, spread_keys(len(sections))), 1)
+        ], batch_size=500)
+        if documents_enabled():
+            refresh_documents([resume.pk for resume in resumes])
+        transaction.on_commit(lambda: ResumeChange.objects.bulk_create([
+            ResumeChange(user_id=user.pk, resume_id=resume.pk, kind=ResumeChange.KIND_RESUME,
+                         action=ResumeChange.ACTION_CREATED, version=resume.version)
+            for resume in resumes
+        ]))
+    return resumes
+
+
+def _write_batch(user, batch):
+    try:
+        resumes = create_resumes(user, [(title, sections) for _, title, sections in batch])
+    except DatabaseError as exc:
+        return [{'line': number, 'error': f'Could not save: {exc}'} for number, _, _ in batch]
+    return [{'line': number, 'id': resume.pk} for (number, _, _), resume in zip(batch, resumes)]
+
+
+def import_lines(user, lines, batch_size=None, max_records=None):
+    """
+    Import NDJSON JSON Resume documents for ``user``, yielding one result per record.
+
+    Results are {'line': n, 'id': resume id} or {'line': n, 'error': message};
+    a bad record never stops the rest. Records are written in batches of
+    ``batch_size``, so results come in batch order rather than line order.
+    """
+    batch_size = batch_size or getattr(settings, 'JSON_RESUME_BATCH_SIZE', 500)
+    max_records = max_records or getattr(settings, 'JSON_RESUME_MAX_RECORDS', 10000)
+    batch, records = [], 0
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        records += 1
+        if records > max_records:
+            yield {'line': number, 'error': f'Only {max_records} records can be imported at once'}
+            break
+        try:
+            title, sections = from_json_resume(json.loads(line))
+        except ValueError as exc:
+            # Covers invalid JSON as well as ConversionError
+            yield {'line': number, 'error': str(exc)}
+            continue
+        batch.append((number, title, sections))
+        if len(batch) >= batch_size:
+            yield from _write_batch(user, batch)
+            batch = []
+    if batch:
+        yield from _write_batch(user, batch)
+
+
+def resume_sections(resumes):
+    """Return {resume id: [(type, content)]} in display order, reading archived resumes from their archive"""
+    ids = [resume.pk for resume in resumes]
+    rows = {resume_id: [] for resume_id in ids}
+    live = Section.objects.filter(resume_id__in=ids).order_by('resume_id', 'rank', 'order', 'id')
+    for resume_id, section_type, content in live.values_list('resume_id', 'type', 'content'):
+        rows[resume_id].append((section_type, content))
+    archived = [resume.pk for resume in resumes if resume.is_archived]
+    if archived:
+        for resume_id, data in ResumeArchive.objects.filter(resume_id__in=archived).values_list('resume_id', 'data'):
+            stored = decode_sections(data)
+            stored.sort(key=lambda row: (row.get('rank', ''), row['order'], row['id']))
+            rows[resume_id] = [(row['type'], row['content']) for row in stored]
+    return rows
+
+
+def export_lines(queryset, batch_size=None):
+    """Yield one NDJSON line per resume in ``queryset``, reading sections a batch of resumes at a time"""
+    batch_size = batch_size or getattr(settings, 'JSON_RESUME_BATCH_SIZE', 500)
+    queryset = queryset.order_by('pk')
+    last = 0
+    while True:
+        resumes = list(queryset.filter(pk__gt=last)[:batch_size])
+        if not resumes:
+            return
+        sections = resume_sections(resumes)
+        for resume in resumes:
+            document = to_json_resume(resume.title, sections[resume.pk], resume.updated_at)
+            yield json.dumps(document, separators=(',', ':')) + '\n'
+        last = resumes[-1].pk
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.archive import archive_idle_resumes, idle_resumes
+
+
+class Command(BaseCommand):
+    help = 'Move the sections of idle resumes into compressed archive rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'ARCHIVE_IDLE_DAYS', 180),
+                            help='Archive resumes not edited or restored for this many days')
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'ARCHIVE_BATCH_SIZE', 100),
+                            help='Resumes archived per transaction')
+        parser.add_argument('--after-id', type=int, default=0,
+                            help='Resume an interrupted run after this resume id')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after considering this many resumes')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the resumes that would be archived')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = idle_resumes(options['days']).filter(pk__gt=options['after_id']).count()
+            self.stdout.write(f'{count} resumes idle for {options["days"]} days')
+            return
+
+        total_resumes = total_sections = 0
+        for last_id, resumes, sections in archive_idle_resumes(
+            days=options['days'],
+            batch_size=options['batch_size'],
+            after_id=options['after_id'],
+            limit=options['limit'],
+        ):
+            total_resumes += resumes
+            total_sections += sections
+            self.stdout.write(f'Archived {resumes} resumes ({sections} sections) up to id {last_id}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {total_resumes} resumes ({total_sections} sections)'
+        ))
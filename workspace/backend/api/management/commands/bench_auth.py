@@ -0,0 +1,76 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark login requests/sec through the token endpoint for each password hasher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasher', action='append', choices=sorted(settings.PASSWORD_HASHER_CLASSES),
+                            help='Hasher to benchmark (repeatable, default: all)')
+        parser.add_argument('--requests', type=int, default=50, help='Login requests per hasher')
+        parser.add_argument('--threads', type=int, default=1,
+                            help='Concurrent client threads, to simulate one threaded worker')
+        parser.add_argument('--pool-size', type=int, default=None,
+                            help='Override PASSWORD_HASHING_POOL_SIZE for the run')
+
+    def handle(self, *args, **options):
+        hashers = options['hasher'] or list(settings.PASSWORD_HASHER_CLASSES)
+        pool_size = options['pool_size']
+        if pool_size is None:
+            pool_size = settings.PASSWORD_HASHING_POOL_SIZE
+
+        self.stdout.write(f"{'hasher':<10} {'requests':>8} {'threads':>7} {'req/s':>9} {'ms/login':>9}")
+        for name in hashers:
+            try:
+                rate, per_login = self.run_hasher(name, options['requests'], options['threads'], pool_size)
+            except (ImportError, ValueError) as exc:
+                self.stdout.write(f'{name:<10} skipped: {exc}')
+                continue
+            self.stdout.write(
+                f"{name:<10} {options['requests']:>8} {options['threads']:>7} {rate:>9.1f} {per_login * 1000:>9.1f}"
+            )
+
+    def run_hasher(self, name, requests, threads, pool_size):
+        """Measure login throughput with one hasher preferred; return (req/s, s/login)"""
+        overrides = {
+            'PASSWORD_HASHERS': [settings.PASSWORD_HASHER_CLASSES[name]],
+            'PASSWORD_HASHING_POOL_SIZE': pool_size,
+            'ALLOWED_HOSTS': ['testserver'],
+            # Throttles would otherwise cut the benchmark short
+            'REST_FRAMEWORK': {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}},
+        }
+        url = reverse('token_obtain_pair')
+        username = f'bench-auth-{name}'
+        credentials = {'username': username, 'password': 'bench-password-123'}
+
+        with override_settings(**overrides):
+            # Committed rather than rolled back so client threads on other connections see it
+            User.objects.filter(username=username).delete()
+            try:
+                User.objects.create_user(**credentials)
+
+                def login(_):
+                    response = Client().post(url, credentials, content_type='application/json')
+                    if response.status_code != 200:
+                        raise CommandError(f'Login failed with status {response.status_code}')
+
+                start = time.perf_counter()
+                if threads > 1:
+                    with ThreadPoolExecutor(max_workers=threads) as executor:
+                        list(executor.map(login, range(requests)))
+                else:
+                    for i in range(requests):
+                        login(i)
+                elapsed = time.perf_counter() - start
+            finally:
+                User.objects.filter(username=username).delete()
+        return requests / elapsed, elapsed / requests
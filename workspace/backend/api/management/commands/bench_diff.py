@@ -0,0 +1,64 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.diff import diff_resumes
+
+
+def make_resume(items, rng, shuffle=0, edits=0, drops=0, adds=0):
+    """Build a serialized resume with large experience and projects arrays"""
+    experience = [
+        {'title': f'Engineer {i}', 'company': f'Company {i}', 'description': f'Shipped feature {i}'}
+        for i in range(items)
+    ]
+    projects = [
+        {'title': f'Project {i}', 'description': f'Built thing {i}', 'technologies': ['Python', 'React']}
+        for i in range(items)
+    ]
+    for entries in (experience, projects):
+        for _ in range(shuffle):
+            a, b = rng.randrange(len(entries)), rng.randrange(len(entries))
+            entries.insert(b, entries.pop(a))
+        for _ in range(edits):
+            entries[rng.randrange(len(entries))]['description'] += ' (edited)'
+        for _ in range(drops):
+            entries.pop(rng.randrange(len(entries)))
+        for i in range(adds):
+            entries.insert(rng.randrange(len(entries) + 1), {'title': f'New {i}', 'company': 'New', 'description': ''})
+    return {
+        'title': 'Benchmark', 'template_name': 'classic', 'style': None,
+        'sections': [
+            {'type': 'experience', 'order': 1, 'content': {'items': experience}},
+            {'type': 'projects', 'order': 2, 'content': {'items': projects}},
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the structural resume diff on large experience/projects arrays'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, action='append',
+                            help='Items per array (repeatable, default: 100, 1000, 10000, 50000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per size, best time is reported')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        sizes = options['items'] or [100, 1000, 10000, 50000]
+        self.stdout.write(f"{'items':>8} {'ops':>8} {'best ms':>9} {'us/item':>8}")
+        for size in sizes:
+            rng = random.Random(options['seed'])
+            old = make_resume(size, rng)
+            changes = max(1, size // 100)
+            new = make_resume(size, rng, shuffle=changes, edits=changes, drops=changes, adds=changes)
+
+            best, ops = None, []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                ops = diff_resumes(old, new)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            # Two arrays of `size` items each
+            per_item = best / (2 * size) * 1e6
+            self.stdout.write(f'{size:>8} {len(ops):>8} {best * 1000:>9.1f} {per_item:>8.2f}')
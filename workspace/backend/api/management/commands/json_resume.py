@@ -0,0 +1,65 @@
+import json
+import sys
+import time
+from contextlib import nullcontext
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.json_resume import export_lines, import_lines
+from api.models import Resume
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Import or export a user\'s resumes as NDJSON JSON Resume documents, one per line'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=('import', 'export'))
+        parser.add_argument('--user', required=True, help='Username owning the resumes')
+        parser.add_argument('--file', default='-', help="NDJSON file to read or write; '-' for stdin/stdout")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Documents per transaction or query (default: JSON_RESUME_BATCH_SIZE)')
+        parser.add_argument('--max-records', type=int, default=sys.maxsize, help='Stop importing after this many')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named '{options['user']}'")
+        started = time.perf_counter()
+        if options['action'] == 'export':
+            count = self.export(user, options)
+            self.stderr.write(f'Exported {count} resumes in {time.perf_counter() - started:.1f}s')
+            return
+
+        imported = failed = 0
+        with self.open(options['file'], 'r') as lines:
+            for result in import_lines(user, lines, options['batch_size'], options['max_records']):
+                if 'error' in result:
+                    failed += 1
+                    self.stderr.write(json.dumps(result))
+                else:
+                    imported += 1
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} resumes, {failed} failed, in {elapsed:.1f}s '
+            f'({(imported + failed) / max(elapsed, 1e-9):.0f} documents/s)'
+        ))
+
+    def export(self, user, options):
+        count = 0
+        with self.open(options['file'], 'w') as out:
+            for line in export_lines(Resume.objects.filter(user=user), options['batch_size']):
+                out.write(line)
+                count += 1
+        return count
+
+    def open(self, path, mode):
+        if path != '-':
+            return open(path, mode, encoding='utf-8')
+        # Don't close the process's own streams
+        stream = self.stdout if mode == 'w' else sys.stdin
+        return nullcontext(stream)
+
@@ -0,0 +1,86 @@
+import os
+import pstats
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.request_profiler import make_token, parse_filename, profile_dir
+
+SORT_KEYS = {'cumulative': 3, 'tottime': 2, 'calls': 1}
+
+
+def load_samples(directory, route=None, method=None, since=None, min_duration=0):
+    """Return [(path, tags)] of the profiles in ``directory`` matching the filters, oldest first"""
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        tags = parse_filename(name)
+        if tags is None:
+            continue
+        if route and tags['route'] != route:
+            continue
+        if method and tags['method'] != method.upper():
+            continue
+        if since and tags['timestamp'] < since:
+            continue
+        if tags['duration'] < min_duration:
+            continue
+        samples.append((os.path.join(directory, name), tags))
+    return samples
+
+
+def hottest(paths, sort='cumulative', limit=25):
+    """Merge profiles and return the top functions as (location, calls, tottime, cumtime)"""
+    stats = pstats.Stats(paths[0])
+    for path in paths[1:]:
+        stats.add(path)
+    rows = [
+        (pstats.func_std_string(func), calls, tottime, cumtime)
+        for func, (_, calls, tottime, cumtime, _) in stats.stats.items()
+    ]
+    rows.sort(key=lambda row: row[SORT_KEYS[sort]], reverse=True)
+    return rows[:limit]
+
+
+class Command(BaseCommand):
+    help = 'Aggregate sampled request profiles and list the hottest functions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None, help='Profile directory (default: REQUEST_PROFILER_DIR)')
+        parser.add_argument('--route', help="Only this URL name, e.g. 'section-detail'")
+        parser.add_argument('--method', help='Only this HTTP method')
+        parser.add_argument('--since', type=float, help='Only profiles from the last this many minutes')
+        parser.add_argument('--min-ms', type=float, default=0, help='Only requests slower than this')
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='cumulative')
+        parser.add_argument('--limit', type=int, default=25, help='Number of functions to list')
+        parser.add_argument('--token', action='store_true',
+                            help='Print a signed X-Profile header value that forces profiling, and exit')
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(make_token())
+            return
+
+        directory = options['dir'] or profile_dir()
+        if not os.path.isdir(directory):
+            raise CommandError(f'No profiles in {directory}')
+        since = time.time() - options['since'] * 60 if options['since'] else None
+        samples = load_samples(directory, options['route'], options['method'], since, options['min_ms'] / 1000)
+        if not samples:
+            self.stdout.write('No matching profiles')
+            return
+
+        durations = defaultdict(list)
+        for _, tags in samples:
+            durations[f"{tags['method']} {tags['route']}"].append(tags['duration'] * 1000)
+        self.stdout.write(f"{len(samples)} samples from {directory}\n")
+        self.stdout.write(f"{'samples':>8} {'avg ms':>9} {'max ms':>9}  route")
+        for key, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+            self.stdout.write(f'{len(values):>8} {sum(values) / len(values):>9.1f} {max(values):>9.1f}  {key}')
+
+        count = len(samples)
+        self.stdout.write(f"\n{'calls':>10} {'tottime/req':>12} {'cumtime/req':>12}  function")
+        for location, calls, tottime, cumtime in hottest([path for path, _ in samples], options['sort'], options['limit']):
+            self.stdout.write(
+                f'{calls:>10} {tottime / count * 1000:>10.2f}ms {cumtime / count * 1000:>10.2f}ms  {location}'
+            )
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.documents import refresh_documents, verify_documents
+from api.models import Resume
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify the materialized resume documents'
+
+    def add_arguments(self, parser):
+        mode = parser.add_mutually_exclusive_group(required=True)
+        mode.add_argument('--rebuild', action='store_true',
+                          help='Rebuild the documents, e.g. after turning RESUME_DOCUMENTS_ENABLED on')
+        mode.add_argument('--verify', action='store_true',
+                          help='Report missing, stale or different documents; exits with an error if there are any')
+        parser.add_argument('--resume', type=int, action='append', dest='resume_ids',
+                            help='Only this resume (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'RESUME_DOCUMENTS_BATCH_SIZE', 200),
+                            help='Resumes handled per transaction')
+        parser.add_argument('--after-id', type=int, default=0,
+                            help='Resume an interrupted run after this resume id')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        resumes = Resume.all_objects.order_by('pk')
+        if options['resume_ids']:
+            resumes = resumes.filter(pk__in=options['resume_ids'])
+
+        total = problems = 0
+        after_id = options['after_id']
+        while True:
+            ids = list(resumes.filter(pk__gt=after_id).values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            after_id = ids[-1]
+            total += len(ids)
+            if options['rebuild']:
+                with transaction.atomic():
+                    refresh_documents(ids)
+                self.stdout.write(f'Rebuilt {len(ids)} documents up to id {after_id}')
+                continue
+            for resume_id, problem in verify_documents(ids):
+                problems += 1
+                self.stdout.write(f'Resume {resume_id}: {problem}')
+
+        if options['rebuild']:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} documents'))
+        elif problems:
+            raise CommandError(f'{problems} of {total} documents need a rebuild')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'All {total} documents are up to date'))
@@ -0,0 +1,107 @@
+import logging
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.changes import prune_changes
+from api.jobs import claim_jobs, requeue_stale, run_job, worker_id
+
+logger = logging.getLogger(__name__)
+
+
+def worker_loop(stop, poll_interval, name):
+    """Claim and run jobs one at a time until stop is set"""
+    try:
+        while not stop.is_set():
+            jobs = claim_jobs(1, worker=name)
+            if not jobs:
+                stop.wait(poll_interval)
+                continue
+            run_job(jobs[0])
+    finally:
+        connections.close_all()
+
+
+def run_process(threads, poll_interval, stop=None):
+    """Run a pool of worker threads in this process until SIGTERM/SIGINT or stop"""
+    stop = stop or threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *args: stop.set())
+
+    pool = [
+        threading.Thread(
+            target=worker_loop,
+            args=(stop, poll_interval, f'{worker_id()}:{index}'),
+            name=f'job-worker-{index}',
+        )
+        for index in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+
+    # The main thread periodically rescues jobs left running by crashed workers
+    # and prunes old change feed notifications
+    stale_timeout = getattr(settings, 'JOB_STALE_TIMEOUT', 900)
+    while not stop.wait(min(stale_timeout, 60)):
+        requeued = requeue_stale(stale_timeout)
+        if requeued:
+            logger.warning(f"Requeued {requeued} stale jobs")
+        prune_changes()
+    for thread in pool:
+        thread.join()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers from the database job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=getattr(settings, 'JOB_WORKER_PROCESSES', 1),
+                            help='Number of worker processes')
+        parser.add_argument('--threads', type=int, default=getattr(settings, 'JOB_WORKER_THREADS', 2),
+                            help='Worker threads per process')
+        parser.add_argument('--poll-interval', type=float, default=getattr(settings, 'JOB_POLL_INTERVAL', 1.0),
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Run due jobs in this process until none are left, then exit')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed = 0
+            while True:
+                jobs = claim_jobs(1)
+                if not jobs:
+                    break
+                run_job(jobs[0])
+                processed += 1
+            self.stdout.write(f'Processed {processed} jobs')
+            return
+
+        processes, threads = options['processes'], options['threads']
+        self.stdout.write(f'Starting {processes} worker process(es) with {threads} thread(s) each')
+        if processes <= 1:
+            run_process(threads, options['poll_interval'])
+            return
+
+        # Children must not share the parent's database connections
+        connections.close_all()
+        children = [
+            multiprocessing.Process(target=run_process, args=(threads, options['poll_interval']))
+            for _ in range(processes)
+        ]
+        for child in children:
+            child.start()
+
+        def forward(signum, frame):
+            for child in children:
+                child.terminate()
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+
+        for child in children:
+            child.join()
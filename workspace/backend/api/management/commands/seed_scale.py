@@ -0,0 +1,231 @@
+import multiprocessing
+import os
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from api.models import Resume, Section, Style
+from api.ranking import spread_keys
+
+User = get_user_model()
+
+WORDS = (
+    'built designed led migrated scaled shipped automated reduced improved launched maintained '
+    'optimized refactored mentored owned integrated delivered monitored api service platform pipeline '
+    'dashboard backend frontend database cache queue cluster latency throughput reliability checkout '
+    'billing search onboarding analytics reporting payments infrastructure deployment testing release '
+    'customers engineers product team stakeholders requirements roadmap incidents costs revenue users '
+    'python django react typescript postgres redis kafka docker kubernetes aws terraform graphql'
+).split()
+TITLES = ('Software Engineer', 'Senior Software Engineer', 'Backend Developer', 'Frontend Developer',
+          'Data Engineer', 'Engineering Manager', 'DevOps Engineer', 'Product Engineer', 'Tech Lead')
+COMPANIES = ('Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries', 'Wayne Enterprises',
+             'Soylent', 'Cyberdyne', 'Vandelay Industries', 'Pied Piper', 'Massive Dynamic')
+CITIES = ('Berlin', 'London', 'New York', 'San Francisco', 'Toronto', 'Bangalore', 'Remote', 'Austin')
+DEGREES = ('BSc', 'MSc', 'BEng', 'PhD', 'BA', 'MBA')
+FIELDS = ('Computer Science', 'Mathematics', 'Physics', 'Electrical Engineering', 'Economics')
+SKILLS = ('Python', 'Django', 'React', 'TypeScript', 'PostgreSQL', 'Redis', 'Docker', 'Kubernetes', 'AWS',
+          'Go', 'Rust', 'Java', 'GraphQL', 'Terraform', 'Kafka', 'Celery', 'Node.js', 'CSS', 'SQL', 'Linux')
+TEMPLATES = ('classic', 'modern', 'minimalist', 'creative', 'executive', 'professional')
+COLORS = ('#000000', '#1f2937', '#1d4ed8', '#047857', '#b91c1c', '#7c3aed')
+FONTS = ('Inter', 'Georgia', 'Roboto', 'Lato', 'Merriweather')
+
+
+def sentences(rng, low, high):
+    return ' '.join(
+        ' '.join(rng.choices(WORDS, k=rng.randint(8, 20))).capitalize() + '.'
+        for _ in range(rng.randint(low, high))
+    )
+
+
+def month(rng, start_year=2005):
+    return f'{rng.randint(start_year, 2025)}-{rng.randint(1, 12):02d}'
+
+
+def long_tail(rng, median, cap):
+    """Skewed count: most values near ``median``, a few far above it, at most ``cap``"""
+    return max(1, min(cap, round(rng.lognormvariate(0, 0.8) * median)))
+
+
+def make_content(section_type, rng, name):
+    """Section content in the shape the editor and export templates use"""
+    if section_type == 'contact':
+        slug = name.lower().replace(' ', '.')
+        return {
+            'name': name, 'email': f'{slug}@example.com', 'phone': f'+1 555 {rng.randint(1000000, 9999999)}',
+            'location': rng.choice(CITIES), 'address': '', 'title': rng.choice(TITLES),
+            'linkedin': f'https://linkedin.com/in/{slug}', 'website': f'https://{slug}.dev',
+        }
+    if section_type == 'summary':
+        return {'text': sentences(rng, 2, 6)}
+    if section_type == 'experience':
+        return {'items': [
+            {
+                'title': rng.choice(TITLES), 'company': rng.choice(COMPANIES), 'location': rng.choice(CITIES),
+                'start_date': month(rng), 'end_date': month(rng) if rng.random() < 0.8 else 'Present',
+                'description': sentences(rng, 2, 8),
+            }
+            for _ in range(long_tail(rng, 4, 60))
+        ]}
+    if section_type == 'education':
+        return {'items': [
+            {
+                'degree': rng.choice(DEGREES), 'field': rng.choice(FIELDS),
+                'institution': f'University of {rng.choice(CITIES)}', 'location': rng.choice(CITIES),
+                'start_date': month(rng, 1995), 'end_date': month(rng, 1999),
+                'gpa': f'{rng.uniform(2.5, 4.0):.1f}' if rng.random() < 0.4 else '',
+            }
+            for _ in range(rng.randint(1, 3))
+        ]}
+    if section_type == 'skills':
+        return {'items': rng.sample(SKILLS, rng.randint(4, len(SKILLS)))}
+    if section_type == 'projects':
+        return {'items': [
+            {
+                'title': ' '.join(rng.choices(WORDS, k=2)).title(), 'description': sentences(rng, 1, 4),
+                'technologies': rng.sample(SKILLS, rng.randint(1, 5)),
+                'link': f'https://github.com/example/{rng.randint(1, 10**6)}',
+            }
+            for _ in range(long_tail(rng, 3, 30))
+        ]}
+    return {'title': ' '.join(rng.choices(WORDS, k=2)).title(), 'content': sentences(rng, 1, 5), 'text': ''}
+
+
+def section_types(rng):
+    """Most resumes have the core sections; a few have many extra ones"""
+    types = ['contact', 'summary', 'experience', 'education', 'skills']
+    if rng.random() < 0.2:
+        types.remove('summary')
+    if rng.random() < 0.6:
+        types.append('projects')
+    types += ['custom'] * (long_tail(rng, 1, 40) - 1)
+    return types
+
+
+def build_chunk(seed, chunk, users, prefix):
+    """
+    Generate one chunk of users with their resumes as plain data.
+
+    Content depends only on (seed, chunk), so the dataset is the same
+    whatever the number of processes or the order chunks finish in.
+    Returns (chunk, [(username, first name, last name, resumes)]) where each
+    resume is (title, template, (color, font, size), [(type, content)]).
+    """
+    rng = random.Random(seed * 1_000_003 + chunk)
+    people = []
+    for i in range(users):
+        first = rng.choice(('Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Riley', 'Casey'))
+        last = rng.choice(('Smith', 'Garcia', 'Chen', 'Patel', 'Miller', 'Okafor', 'Silva'))
+        resumes = [
+            (
+                f'{rng.choice(TITLES)} Resume', rng.choice(TEMPLATES),
+                (rng.choice(COLORS), rng.choice(FONTS), rng.choice((9, 10, 10, 11, 12))),
+                [(section_type, make_content(section_type, rng, f'{first} {last}')) for section_type in section_types(rng)],
+            )
+            # Most users keep one resume, some tailor a handful
+            for _ in range(long_tail(rng, 1, 8))
+        ]
+        people.append((f'{prefix}{chunk}_{i}', first, last, resumes))
+    return chunk, people
+
+
+def write_chunk(chunk, people, password):
+    """Insert a built chunk with one bulk_create per table in a single transaction"""
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(username=username, email=f'{username}@example.com', password=password,
+                 first_name=first, last_name=last)
+            for username, first, last, _ in people
+        ], batch_size=1000)
+        specs = [resume for (*_, resumes) in people for resume in resumes]
+        resumes = Resume.objects.bulk_create([
+            Resume(user=user, title=title, template_name=template)
+            for user, (*_, user_resumes) in zip(users, people)
+            for title, template, _, _ in user_resumes
+        ], batch_size=1000)
+        Style.objects.bulk_create([
+            Style(resume=resume, primary_color=color, font_family=font, font_size=size)
+            for resume, (_, _, (color, font, size), _) in zip(resumes, specs)
+        ], batch_size=1000)
+        sections = Section.objects.bulk_create([
+            Section(resume=resume, type=section_type, content=content, order=position, rank=rank)
+            for resume, (*_, contents) in zip(resumes, specs)
+            for position, ((section_type, content), rank) in enumerate(zip(contents, spread_keys(len(contents))), 1)
+        ], batch_size=500)
+    return chunk, len(users), len(resumes), len(sections)
+
+
+def build_chunk_task(args):
+    return build_chunk(*args)
+
+
+def seed_chunk_task(args):
+    """Build and write a chunk in a worker process with its own connection"""
+    seed, chunk, users, prefix, password = args
+    try:
+        return write_chunk(*build_chunk(seed, chunk, users, prefix), password)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Generate users, resumes, styles and sections at production-like scale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to create')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Users per chunk; each chunk is one transaction')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Chunks built in parallel; on SQLite one process writes them all')
+        parser.add_argument('--prefix', default='seed',
+                            help='Username prefix; must not match existing users')
+        parser.add_argument('--password', default='testpassword123', help='Password for every seeded user')
+
+    def handle(self, *args, **options):
+        prefix, chunk_size = options['prefix'], max(1, options['chunk_size'])
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f"Users starting with '{prefix}' already exist; pick another --prefix")
+
+        # Hash once: hashing per user would dominate the run
+        password = make_password(options['password'])
+        total = options['users']
+        tasks = [
+            (options['seed'], chunk, min(chunk_size, total - start), prefix, password)
+            for chunk, start in enumerate(range(0, total, chunk_size))
+        ]
+        processes = min(options['processes'], len(tasks))
+
+        started = time.perf_counter()
+        counts = [0, 0, 0]
+        if processes <= 1:
+            results = (write_chunk(*build_chunk(*task[:4]), password) for task in tasks)
+            self.report(results, counts, len(tasks))
+        elif connection.vendor == 'sqlite':
+            # SQLite allows one writer at a time: build chunks in parallel, write them from here
+            with multiprocessing.Pool(processes) as pool:
+                built = pool.imap(build_chunk_task, [task[:4] for task in tasks])
+                self.report((write_chunk(*chunk, password) for chunk in built), counts, len(tasks))
+        else:
+            # Children must not share the parent's database connections
+            connections.close_all()
+            with multiprocessing.Pool(processes) as pool:
+                self.report(pool.imap_unordered(seed_chunk_task, tasks), counts, len(tasks))
+
+        elapsed = time.perf_counter() - started
+        users, resumes, sections = counts
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {users} users, {resumes} resumes and {sections} sections in {elapsed:.1f}s '
+            f'({sections / max(elapsed, 1e-9):.0f} sections/s)'
+        ))
+
+    def report(self, results, counts, chunks):
+        for done, (chunk, users, resumes, sections) in enumerate(results, 1):
+            counts[0] += users
+            counts[1] += resumes
+            counts[2] += sections
+            self.stdout.write(f'Chunk {chunk} ({done}/{chunks}): {users} users, {resumes} resumes, {sections} sections')
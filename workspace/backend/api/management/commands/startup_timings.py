@@ -0,0 +1,52 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Loads the app the way a fresh worker does, then warms it up
+SCRIPT = (
+    'import json, os, time\n'
+    'start = time.perf_counter()\n'
+    'from config.asgi import application\n'
+    'from api.health import timings, warmup\n'
+    'warmup()\n'
+    "timings['total'] = round(time.perf_counter() - start, 4)\n"
+    'print(json.dumps(timings))\n'
+)
+
+
+def run_once():
+    """Start a fresh interpreter and return its startup and warmup timings"""
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')}
+    result = subprocess.run(
+        [sys.executable, '-c', SCRIPT], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise CommandError(f'Worker startup failed:\n{result.stderr}')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = 'Measure cold worker import and warmup time in fresh processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Fresh processes to start; medians are reported')
+        parser.add_argument('--max-seconds', type=float, default=None,
+                            help='Fail when the median total exceeds this, e.g. in CI')
+
+    def handle(self, *args, **options):
+        runs = [run_once() for _ in range(max(1, options['repeat']))]
+        self.stdout.write(f"{'phase':<12} {'median ms':>10} {'max ms':>9}")
+        medians = {}
+        for phase in runs[0]:
+            values = [run.get(phase, 0.0) * 1000 for run in runs]
+            medians[phase] = statistics.median(values)
+            self.stdout.write(f'{phase:<12} {medians[phase]:>10.1f} {max(values):>9.1f}')
+
+        limit = options['max_seconds']
+        if limit is not None and medians['total'] > limit * 1000:
+            raise CommandError(f"Startup took {medians['total']:.0f}ms, over the {limit * 1000:.0f}ms limit")
@@ -0,0 +1,160 @@
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+TOKEN_RE = re.compile(r'[a-z0-9][a-z0-9+#.]*')
+
+# Keys whose values are layout, contact details or dates rather than matchable text
+SKIPPED_KEYS = {
+    'formatting', 'id', 'start_date', 'end_date', 'email', 'phone', 'url',
+    'linkedin', 'website', 'github', 'proficiency',
+}
+
+STOPWORDS = frozenset('''
+    a about above after again against all am an and any are as at be because been before being below between
+    both but by can could did do does doing down during each etc few for from further had has have having he
+    her here hers him his how i if in into is it its itself just me more most my no nor not of off on once
+    only or other our ours out over own same she should so some such than that the their theirs them then
+    there these they this those through to too under until up very was we were what when where which while
+    who whom why will with would you your yours able across also including within using use used per well
+    work working job role team teams candidate candidates experience years year strong ability must plus
+    preferred required requirements responsibilities looking join new
+'''.split())
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords dropped; keeps c++, c# and node.js intact"""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        token = token.rstrip('.')
+        if (len(token) > 1 and token not in STOPWORDS) or token in ('c', 'r'):
+            tokens.append(token)
+    return tokens
+
+
+def iter_text(value):
+    """Yield every string inside a section's content, skipping non-textual keys"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if key not in SKIPPED_KEYS:
+                yield from iter_text(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_text(item)
+
+
+class TermCache:
+    """
+    LRU cache of per-section term counts.
+
+    Entries are keyed by section id and validated against the resume id and
+    ``Resume.version``, which every section write bumps, so a section is only
+    re-tokenized after its resume changes and a hit is a dict lookup.
+    """
+
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def terms(self, section_id, resume_id, version, content):
+        with self._lock:
+            cached = self._entries.get(section_id)
+            if cached is not None and cached[0] == (resume_id, version):
+                self._entries.move_to_end(section_id)
+                return cached[1]
+
+        terms = Counter(tokenize(' '.join(iter_text(content))))
+        with self._lock:
+            self._entries[section_id] = ((resume_id, version), terms)
+            self._entries.move_to_end(section_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return terms
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+term_cache = TermCache()
+
+
+def score_documents(query_terms, documents, k1=1.5, b=0.75):
+    """
+    BM25 scores of each document against the query.
+
+    ``query_terms`` is a Counter of job description terms and ``documents`` a
+    list of term Counters. Only query terms matter, so documents are projected
+    into an (n_documents x n_query_terms) matrix and scored in one pass.
+    Returns (scores, term_frequency_matrix, vocabulary).
+    """
+    vocabulary = list(query_terms)
+    column = {term: j for j, term in enumerate(vocabulary)}
+    tf = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+    lengths = np.empty(len(documents), dtype=np.float32)
+    for i, terms in enumerate(documents):
+        lengths[i] = sum(terms.values())
+        shared = terms.keys() & column.keys()
+        if shared:
+            tf[i, [column[t] for t in shared]] = [terms[t] for t in shared]
+
+    if not len(documents) or not vocabulary:
+        return np.zeros(len(documents), dtype=np.float32), tf, vocabulary
+
+    n = len(documents)
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    average_length = max(float(lengths.mean()), 1.0)
+    norm = k1 * (1 - b + b * lengths / average_length)
+    weights = np.array([query_terms[t] for t in vocabulary], dtype=np.float32)
+    scores = ((tf * (k1 + 1)) / (tf + norm[:, None]) * idf * weights).sum(axis=1)
+    return scores, tf, vocabulary
+
+
+def match_resumes(job_description, sections, resumes, limit=10, missing_limit=15):
+    """
+    Rank resumes against a job description.
+
+    ``sections`` is an iterable of (section_id, resume_id, content) and
+    ``resumes`` maps resume ids to (title, version). Each result carries a BM25 score,
+    the share of the job description's keyword weight the resume covers and
+    the most important keywords it is missing.
+    """
+    query_terms = Counter(tokenize(job_description))
+    max_terms = getattr(settings, 'MATCH_MAX_QUERY_TERMS', 200)
+    query_terms = Counter(dict(query_terms.most_common(max_terms)))
+
+    resume_terms = {resume_id: Counter() for resume_id in resumes}
+    for section_id, resume_id, content in sections:
+        if resume_id in resume_terms:
+            resume_terms[resume_id].update(term_cache.terms(section_id, resume_id, resumes[resume_id][1], content))
+
+    resume_ids = list(resume_terms)
+    scores, tf, vocabulary = score_documents(query_terms, [resume_terms[r] for r in resume_ids])
+    if not vocabulary:
+        return []
+
+    weights = np.array([query_terms[t] for t in vocabulary], dtype=np.float32)
+    present = tf > 0
+    coverage = (present * weights).sum(axis=1) / weights.sum()
+    # Missing keywords are listed most frequent in the job description first
+    by_weight = np.argsort(-weights, kind='stable')
+
+    order = np.argsort(-scores, kind='stable')[:limit]
+    results = []
+    for i in order:
+        missing = [vocabulary[j] for j in by_weight if not present[i, j]][:missing_limit]
+        results.append({
+            'resume_id': resume_ids[i],
+            'title': resumes[resume_ids[i]][0],
+            'score': round(float(scores[i]), 4),
+            'coverage': round(float(coverage[i]) * 100, 1),
+            'missing_keywords': missing,
+        })
+    return results
@@ -0,0 +1,423 @@
+import contextvars
+import hmac
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not on Windows
+    fcntl = None
+
+_request_metrics = contextvars.ContextVar('request_metrics', default=None)
+
+REQUESTS = 'http_requests_total'
+DURATION = 'http_request_duration_seconds'
+DB_QUERIES = 'http_request_db_queries_total'
+DB_SECONDS = 'http_request_db_seconds_total'
+SERIALIZER_SECONDS = 'http_request_serializer_seconds_total'
+CACHE_LOOKUPS = 'http_request_cache_lookups_total'
+EXCEPTIONS = 'http_exceptions_total'
+
+# name: (type, help, label names); histogram keys carry 'le' as their last label
+METRICS = {
+    REQUESTS: ('counter', 'Requests by route, method and status', ('route', 'method', 'status')),
+    DURATION: ('histogram', 'Request latency', ('route', 'method')),
+    DB_QUERIES: ('counter', 'SQL queries run by requests', ('route', 'method')),
+    DB_SECONDS: ('counter', 'Time spent in SQL queries', ('route', 'method')),
+    SERIALIZER_SECONDS: ('counter', 'Time spent in DRF serializers', ('route', 'method')),
+    CACHE_LOOKUPS: ('counter', 'Cache keys looked up by requests', ('route', 'method', 'result')),
+    EXCEPTIONS: ('counter', 'Exceptions raised by requests, by class', ('route', 'method', 'exception')),
+}
+# Latency histogram bounds in seconds, overridden by METRICS_BUCKETS
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# metrics_<pid>.db per live worker, plus metrics_archive.db holding exited workers' totals
+FILE_RE = re.compile(r'^metrics_(\d+|archive)\.db$')
+LOCK_NAME = '.lock'
+INITIAL_SIZE = 64 * 1024
+
+# File layout: an 8 byte count of bytes used, then entries of
+# <u32 key length><json key, padded to 8 bytes><f64 value>
+USED = struct.Struct('<Q')
+LENGTH = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None) or os.path.join(tempfile.gettempdir(), 'resume-metrics')
+
+
+def _entries(data, used):
+    """Yield (key, value offset, value) for every entry in a metrics file's bytes"""
+    pos = USED.size
+    while pos < used:
+        length = LENGTH.unpack_from(data, pos)[0]
+        start = pos + LENGTH.size
+        value_pos = (start + length + 7) & ~7
+        yield bytes(data[start:start + length]).decode(), value_pos, VALUE.unpack_from(data, value_pos)[0]
+        pos = value_pos + VALUE.size
+
+
+class MetricFile:
+    """
+    Counters of one process in a memory mapped file.
+
+    Only the owning process writes; others read the file to aggregate. A new
+    key's entry is written before the used count in the header is advanced,
+    so readers never see a partial entry.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._capacity = os.fstat(self._fd).st_size
+        if self._capacity < INITIAL_SIZE:
+            os.ftruncate(self._fd, INITIAL_SIZE)
+            self._capacity = INITIAL_SIZE
+        self._map = mmap.mmap(self._fd, self._capacity)
+        self._used = USED.unpack_from(self._map, 0)[0] or USED.size
+        self._positions = {
+            tuple(json.loads(key)): pos for key, pos, _ in _entries(self._map, self._used)
+        }
+
+    def _add(self, key):
+        encoded = json.dumps(key).encode()
+        value_pos = (self._used + LENGTH.size + len(encoded) + 7) & ~7
+        end = value_pos + VALUE.size
+        if end > self._capacity:
+            capacity = self._capacity
+            while end > capacity:
+                capacity *= 2
+            os.ftruncate(self._fd, capacity)
+            self._map.close()
+            self._map = mmap.mmap(self._fd, capacity)
+            self._capacity = capacity
+        LENGTH.pack_into(self._map, self._used, len(encoded))
+        self._map[self._used + LENGTH.size:self._used + LENGTH.size + len(encoded)] = encoded
+        VALUE.pack_into(self._map, value_pos, 0.0)
+        self._used = end
+        USED.pack_into(self._map, 0, end)
+        self._positions[key] = value_pos
+        return value_pos
+
+    def inc(self, items):
+        """Add every (key, amount) in ``items``; keys are tuples of strings"""
+        with self._lock:
+            for key, amount in items:
+                pos = self._positions.get(key)
+                if pos is None:
+                    pos = self._add(key)
+                VALUE.pack_into(self._map, pos, VALUE.unpack_from(self._map, pos)[0] + amount)
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+def read_file(path):
+    """Return {key: value} of a metrics file written by any process"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < USED.size:
+        return {}
+    used = min(USED.unpack_from(data, 0)[0], len(data))
+    return {tuple(json.loads(key)): value for key, _, value in _entries(data, used)}
+
+
+_files = {}
+_files_lock = threading.Lock()
+
+
+def _forget_files():
+    # A forked child must not write to its parent's file
+    _files.clear()
+
+
+if hasattr(os, 'register_at_fork'):  # POSIX only; there's no fork to guard against elsewhere
+    os.register_at_fork(after_in_child=_forget_files)
+
+
+def local_file(directory):
+    """This process's MetricFile in ``directory``"""
+    metric_file = _files.get(directory)
+    if metric_file is None:
+        with _files_lock:
+            metric_file = _files.get(directory)
+            if metric_file is None:
+                os.makedirs(directory, exist_ok=True)
+                metric_file = _files[directory] = MetricFile(os.path.join(directory, f'metrics_{os.getpid()}.db'))
+    return metric_file
+
+
+@contextmanager
+def _directory_lock(directory, exclusive=False):
+    if fcntl is None:
+        # Without flock there are no forked workers sharing the directory either
+        yield
+        return
+    with open(os.path.join(directory, LOCK_NAME), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def collect(directory):
+    """Sum the counters of every worker, live or exited, that wrote to ``directory``"""
+    totals = defaultdict(float)
+    if not os.path.isdir(directory):
+        return totals
+    with _directory_lock(directory):
+        for name in os.listdir(directory):
+            if FILE_RE.match(name):
+                for key, value in read_file(os.path.join(directory, name)).items():
+                    totals[key] += value
+    return totals
+
+
+def archive_worker(directory, pid):
+    """
+    Fold an exited worker's counters into the archive file and delete its file,
+    so counters stay monotonic while worker files don't pile up. Runs in the
+    gunicorn master, under the lock collect() takes.
+    """
+    path = os.path.join(directory, f'metrics_{pid}.db')
+    if not os.path.exists(path):
+        return
+    with _directory_lock(directory, exclusive=True):
+        archive = MetricFile(os.path.join(directory, 'metrics_archive.db'))
+        try:
+            archive.inc(read_file(path).items())
+        finally:
+            archive.close()
+        os.remove(path)
+
+
+def reset(directory):
+    """Remove every metrics file, when the server starts"""
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if FILE_RE.match(name):
+            os.remove(os.path.join(directory, name))
+
+
+def _format_value(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _format_labels(names, values):
+    labels = ','.join(
+        '{}="{}"'.format(name, value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in zip(names, values)
+    )
+    return f'{{{labels}}}' if labels else ''
+
+
+def render(totals, buckets):
+    """Prometheus text exposition of collected totals"""
+    samples = defaultdict(dict)
+    for key, value in totals.items():
+        samples[key[0]][key[1:]] = value
+    bounds = [_format_value(float(bound)) for bound in buckets] + ['+Inf']
+
+    lines = []
+    for name, (kind, help_text, label_names) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        values = samples.get(name, {})
+        if kind != 'histogram':
+            for labels, value in sorted(values.items()):
+                lines.append(f'{name}{_format_labels(label_names, labels)} {_format_value(value)}')
+            continue
+        counts = defaultdict(dict)
+        for labels, value in values.items():
+            counts[labels[:-1]][labels[-1]] = value
+        sums = samples.get(f'{name}_sum', {})
+        bucket_names = (*label_names, 'le')
+        for labels in sorted(counts):
+            total = 0.0
+            for bound in bounds:
+                total += counts[labels].get(bound, 0.0)
+                lines.append(f'{name}_bucket{_format_labels(bucket_names, (*labels, bound))} {_format_value(total)}')
+            lines.append(f'{name}_count{_format_labels(label_names, labels)} {_format_value(total)}')
+            lines.append(f'{name}_sum{_format_labels(label_names, labels)} {_format_value(sums.get(labels, 0.0))}')
+    return '\n'.join(lines) + '\n'
+
+
+class RequestMetrics:
+    """Numbers collected while one request runs, written to the metrics file when it ends"""
+    __slots__ = ('queries', 'db_time', 'serializer_time', '_serializer_depth', 'cache_hits', 'cache_misses',
+                 'exception')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self._serializer_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.exception = None
+
+
+def _time_query(execute, sql, params, many, context):
+    # Installed once per connection, a no-op outside measured requests
+    metrics = _request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - start
+        metrics.queries += 1
+
+
+def _install_query_timer(connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+_MISSING = object()
+
+
+def _counted_get(get):
+    def counted(self, key, default=None, version=None):
+        value = get(self, key, _MISSING, version)
+        metrics = _request_metrics.get()
+        if value is _MISSING:
+            if metrics is not None:
+                metrics.cache_misses += 1
+            return default
+        if metrics is not None:
+            metrics.cache_hits += 1
+        return value
+    counted._metrics_counted = True
+    return counted
+
+
+def _counted_get_many(get_many):
+    def counted(self, keys, version=None):
+        keys = list(keys)
+        found = get_many(self, keys, version)
+        metrics = _request_metrics.get()
+        if metrics is not None:
+            metrics.cache_hits += len(found)
+            metrics.cache_misses += len(keys) - len(found)
+        return found
+    counted._metrics_counted = True
+    return counted
+
+
+def install_cache_counters():
+    """Count hits and misses of the configured cache backends' get() and get_many()"""
+    from django.core.cache import caches
+    from django.core.cache.backends.base import BaseCache
+
+    with _files_lock:
+        for alias in settings.CACHES:
+            backend = type(caches[alias])
+            if not getattr(backend.get, '_metrics_counted', False):
+                backend.get = _counted_get(backend.get)
+            # The base get_many() calls get() per key, which is counted already
+            if backend.get_many is not BaseCache.get_many and not getattr(backend.get_many, '_metrics_counted', False):
+                backend.get_many = _counted_get_many(backend.get_many)
+
+
+def record_exception(exc):
+    """Note the class of an exception raised while handling the current request"""
+    metrics = _request_metrics.get()
+    if metrics is not None:
+        metrics.exception = type(exc).__name__
+
+
+class MetricsMiddleware:
+    """
+    Opt-in per-route request metrics, exposed at /metrics.
+
+    Enabled with METRICS_ENABLED. Each request adds its count, latency,
+    SQL and serializer time, cache lookups and exception class to this
+    process's memory mapped file in METRICS_DIR with a few struct writes;
+    the /metrics view sums the files of every gunicorn worker.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+        from .query_profiler import install_serializer_timer
+
+        self.get_response = get_response
+        self.directory = metrics_dir()
+        self.buckets = tuple(getattr(settings, 'METRICS_BUCKETS', DEFAULT_BUCKETS))
+        self.bounds = [_format_value(float(bound)) for bound in self.buckets] + ['+Inf']
+        install_serializer_timer(_request_metrics)
+        install_cache_counters()
+        connection_created.connect(_install_query_timer, dispatch_uid='api.metrics')
+        for connection in connections.all(initialized_only=True):
+            _install_query_timer(connection)
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _request_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        route = (match.url_name if match else None) or 'unresolved'
+        method = request.method if request.method in METHODS else 'other'
+        items = [
+            ((REQUESTS, route, method, str(response.status_code)), 1),
+            ((DURATION, route, method, self.bounds[bisect_left(self.buckets, duration)]), 1),
+            ((f'{DURATION}_sum', route, method), duration),
+        ]
+        if metrics.queries:
+            items.append(((DB_QUERIES, route, method), metrics.queries))
+            items.append(((DB_SECONDS, route, method), metrics.db_time))
+        if metrics.serializer_time:
+            items.append(((SERIALIZER_SECONDS, route, method), metrics.serializer_time))
+        if metrics.cache_hits:
+            items.append(((CACHE_LOOKUPS, route, method, 'hit'), metrics.cache_hits))
+        if metrics.cache_misses:
+            items.append(((CACHE_LOOKUPS, route, method, 'miss'), metrics.cache_misses))
+        if metrics.exception:
+            items.append(((EXCEPTIONS, route, method, metrics.exception), 1))
+        local_file(self.directory).inc(items)
+        return response
+
+    def process_exception(self, request, exception):
+        # Exceptions outside DRF views; DRF ones go through custom_exception_handler
+        record_exception(exception)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, summing every worker's counters"""
+    if not getattr(settings, 'METRICS_ENABLED', False):
+        raise Http404
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and not hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    buckets = getattr(settings, 'METRICS_BUCKETS', DEFAULT_BUCKETS)
+    return HttpResponse(render(collect(metrics_dir()), buckets), content_type=CONTENT_TYPE)
@@ -0,0 +1,238 @@
+import hashlib
+import logging
+import re
+import zlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Zip containers such as .docx are compressed already
+PRECOMPRESSED_TYPES = ('application/zip', 'application/vnd.openxmlformats-officedocument.')
+ACCEPT_ENCODING_RE = re.compile(r'\s*([a-z0-9*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*', re.I)
+
+
+class GzipCodec:
+    """gzip codec backed by the standard library"""
+    name = 'gzip'
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compressobj(self):
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        compressor = self.compressobj()
+        return compressor.compress(data) + compressor.flush()
+
+
+class BrotliCodec:
+    """Brotli codec, available when the brotli package is installed"""
+    name = 'br'
+
+    class _Stream:
+        def __init__(self, quality):
+            self._compressor = brotli.Compressor(quality=quality)
+
+        def compress(self, data):
+            return self._compressor.process(data)
+
+        def flush(self):
+            return self._compressor.finish()
+
+    def __init__(self, level=5):
+        self.level = level
+
+    def compressobj(self):
+        return self._Stream(self.level)
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.level)
+
+
+class ZstdCodec:
+    """Zstandard codec, available when the zstandard package is installed"""
+    name = 'zstd'
+
+    def __init__(self, level=3):
+        self._compressor = zstandard.ZstdCompressor(level=level)
+
+    def compressobj(self):
+        return self._compressor.compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+
+def available_codecs():
+    """Return the installed codecs keyed by content-coding, in preference order"""
+    codecs = {}
+    for name in getattr(settings, 'COMPRESSION_ENCODINGS', ['br', 'zstd', 'gzip']):
+        if name == 'br' and brotli is not None:
+            codecs[name] = BrotliCodec()
+        elif name == 'zstd' and zstandard is not None:
+            codecs[name] = ZstdCodec()
+        elif name == 'gzip':
+            codecs[name] = GzipCodec()
+    return codecs
+
+
+def parse_accept_encoding(header):
+    """Parse an Accept-Encoding header into a {coding: qvalue} dict"""
+    accepted = {}
+    for part in header.split(','):
+        match = ACCEPT_ENCODING_RE.fullmatch(part)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) is not None else 1.0
+        except ValueError:
+            continue
+        accepted[match.group(1).lower()] = quality
+    return accepted
+
+
+def negotiate_encoding(header, codecs):
+    """Pick the best codec for an Accept-Encoding header, or None"""
+    accepted = parse_accept_encoding(header or '')
+    best, best_quality = None, 0.0
+    # codecs is ordered by server preference, so ties keep the earlier codec
+    for name in codecs:
+        quality = accepted.get(name, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def compress_chunks(chunks, codec):
+    """Compress an iterable of byte chunks incrementally"""
+    compressor = codec.compressobj()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def compress_chunks_async(chunks, codec):
+    """Compress an async iterable of byte chunks incrementally"""
+    compressor = codec.compressobj()
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def slice_body(content, size):
+    """Yield a response body in fixed-size slices"""
+    for start in range(0, len(content), size):
+        yield content[start:start + size]
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli, zstd or gzip based on Accept-Encoding.
+
+    Small bodies are left alone, bodies above COMPRESSION_STREAM_THRESHOLD are
+    streamed through an incremental compressor, and responses with an ETag
+    have their compressed bytes cached by content hash so a hot payload is
+    only compressed once per encoding.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.codecs = available_codecs()
+        self.min_length = getattr(settings, 'COMPRESSION_MIN_LENGTH', 200)
+        self.stream_threshold = getattr(settings, 'COMPRESSION_STREAM_THRESHOLD', 1024 * 1024)
+        self.chunk_size = getattr(settings, 'COMPRESSION_CHUNK_SIZE', 64 * 1024)
+        self.cache_alias = getattr(settings, 'COMPRESSION_CACHE_ALIAS', 'default')
+        self.cache_timeout = getattr(settings, 'COMPRESSION_CACHE_TIMEOUT', 300)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not self.codecs:
+            return response
+        # A compressor buffers its input, which would hold back server-sent events
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        if response.get('Content-Type', '').startswith(PRECOMPRESSED_TYPES):
+            return response
+
+        # The representation depends on Accept-Encoding even when we skip it
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.codecs)
+        if encoding is None:
+            return response
+        codec = self.codecs[encoding]
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = compress_chunks_async(response.streaming_content, codec)
+            else:
+                response.streaming_content = compress_chunks(response.streaming_content, codec)
+            del response.headers['Content-Length']
+        else:
+            if len(response.content) < self.min_length:
+                return response
+            if len(response.content) > self.stream_threshold:
+                response = self._stream_response(response, codec)
+            else:
+                compressed = self._compress_body(response, codec)
+                if len(compressed) >= len(response.content):
+                    return response
+                response.content = compressed
+                response.headers['Content-Length'] = str(len(compressed))
+
+        self._weaken_etag(response)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _compress_body(self, response, codec):
+        """Compress a buffered body, reusing cached bytes for responses with an ETag"""
+        if not response.has_header('ETag'):
+            return codec.compress(response.content)
+
+        cache = caches[self.cache_alias]
+        digest = hashlib.blake2b(response.content, digest_size=20).hexdigest()
+        key = f'compressed:{codec.name}:{digest}'
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = codec.compress(response.content)
+            cache.set(key, compressed, self.cache_timeout)
+        return compressed
+
+    def _stream_response(self, response, codec):
+        """Replace a large buffered response with an incrementally compressed stream"""
+        streamed = StreamingHttpResponse(
+            compress_chunks(slice_body(response.content, self.chunk_size), codec),
+            status=response.status_code,
+        )
+        for header, value in response.items():
+            if header.lower() != 'content-length':
+                streamed[header] = value
+        streamed.cookies = response.cookies
+        return streamed
+
+    def _weaken_etag(self, response):
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_resume_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumeChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resume_id', models.BigIntegerField()),
+                ('section_id', models.BigIntegerField(blank=True, null=True)),
+                ('kind', models.CharField(choices=[('resume', 'Resume'), ('section', 'Section'), ('style', 'Style')], max_length=10)),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resume_changes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['user', 'id'], name='api_change_feed_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_resume_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:41
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def spread_keys(count):
+    # Same keys as api.ranking.spread_keys at the time of this migration
+    width = 1
+    while len(DIGITS) ** width < count * len(DIGITS):
+        width += 1
+    step = len(DIGITS) ** width // (count + 1)
+    keys = []
+    for i in range(1, count + 1):
+        value, digits = step * i, []
+        for _ in range(width):
+            value, digit = divmod(value, len(DIGITS))
+            digits.append(DIGITS[digit])
+        keys.append(''.join(reversed(digits)).rstrip('0'))
+    return keys
+
+
+def rank_sections(apps, schema_editor):
+    """Rank existing sections in their current order"""
+    Section = apps.get_model('api', 'Section')
+    sections = Section.objects.order_by('resume_id', 'order', 'id').only('id', 'resume_id', 'rank').iterator(chunk_size=2000)
+    for _, group in groupby(sections, key=lambda section: section.resume_id):
+        group = list(group)
+        for section, rank in zip(group, spread_keys(len(group))):
+            section.rank = rank
+        Section.objects.bulk_update(group, ['rank'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_resume_trash'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='section',
+            options={'ordering': ['rank', 'order', 'id']},
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='rank',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.RunPython(rank_sections, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='section',
+            constraint=models.UniqueConstraint(condition=models.Q(('rank', ''), _negated=True), fields=('resume', 'rank'), name='api_section_unique_rank'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_section_rank'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resume',
+            index=models.Index(fields=['title'], name='api_resume_title_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def clear_documents(apps, schema_editor):
+    # Stored documents report 1-based section orders; drop them so reads fall back
+    # to the serializer until `resume_documents --rebuild` or the next write
+    apps.get_model('api', 'ResumeDocument').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_documents, migrations.RunPython.noop),
+    ]
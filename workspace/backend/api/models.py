@@ -1,5 +1,10 @@
+from collections import defaultdict
+
 from django.db import models
+from django.db.models import Q
+from django.db.models.query import ModelIterable
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 import uuid
 
 class User(AbstractUser):
@@ -7,20 +12,39 @@ class User(AbstractUser):
     # Add any additional fields here if needed
     pass
 
+class ResumeManager(models.Manager):
+    """Default manager that hides resumes in the trash"""
+    
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 class Resume(models.Model):
     """Resume model to store user's resume information"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='resumes')
     title = models.CharField(max_length=255)
     template_name = models.CharField(max_length=50, default='classic')
     share_slug = models.UUIDField(unique=True, null=True, blank=True, default=uuid.uuid4)
+    version = models.PositiveIntegerField(default=0)
+    # Sections of archived resumes live compressed in ResumeArchive (see api.archive)
+    is_archived = models.BooleanField(default=False)
+    restored_at = models.DateTimeField(null=True, blank=True)
+    # Set when the resume is moved to the trash (see api.trash)
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ResumeManager()
+    all_objects = models.Manager()
+    
     def __str__(self):
         return f"{self.title} - {self.user.username}"
     
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            # Pattern ops so admin prefix searches (LIKE 'x%') can use it on PostgreSQL
+            models.Index(fields=['title'], name='api_resume_title_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
 class Style(models.Model):
     """Style model for resume styling options"""
@@ -32,6 +56,39 @@ class Style(models.Model):
     def __str__(self):
         return f"Style for {self.resume.title}"
 
+def set_positions(sections):
+    """
+    Set ``position``, the 1-based place in its resume, on each of ``sections``
+    with one query over the section keys of their resumes, so any subset
+    (filtered, paginated, a single row) gets the same numbers as the whole list.
+    """
+    resume_ids = {section.resume_id for section in sections}
+    if not resume_ids:
+        return
+    positions, counts = {}, defaultdict(int)
+    keys = Section.objects.filter(resume_id__in=resume_ids).order_by('resume_id', 'rank', 'order', 'id')
+    for resume_id, pk in keys.values_list('resume_id', 'id'):
+        counts[resume_id] += 1
+        positions[pk] = counts[resume_id]
+    for section in sections:
+        section.position = positions.get(section.pk)
+
+class PositionedSectionIterable(ModelIterable):
+    """Yields sections with ``position`` set, see ``set_positions``"""
+    
+    def __iter__(self):
+        sections = list(super().__iter__())
+        set_positions(sections)
+        yield from sections
+
+class SectionQuerySet(models.QuerySet):
+    
+    def with_positions(self):
+        """Set each fetched section's ``position``, for serializing part of a resume's sections"""
+        clone = self._chain()
+        clone._iterable_class = PositionedSectionIterable
+        return clone
+
 class Section(models.Model):
     """Section model for different resume sections"""
     SECTION_TYPES = (
@@ -47,10 +104,139 @@ class Section(models.Model):
     resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='sections')
     type = models.CharField(max_length=20, choices=SECTION_TYPES)
     content = models.JSONField()
+    # Position the section was last placed at; the rank decides the order (see api.ranking)
     order = models.PositiveIntegerField()
+    # Lexicographic sort key, so a move or insert only rewrites the moved row
+    rank = models.CharField(max_length=64, blank=True, default='')
+    
+    objects = SectionQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.type} section - {self.resume.title}"
     
     class Meta:
-        ordering = ['order']
+        ordering = ['rank', 'order', 'id']
+        constraints = [
+            # Blank ranks come from rows created without going through api.ranking
+            models.UniqueConstraint(
+                fields=['resume', 'rank'], condition=~Q(rank=''), name='api_section_unique_rank'
+            ),
+        ]
+
+class ResumeArchive(models.Model):
+    """Sections of an idle resume compressed into a single row"""
+    resume = models.OneToOneField(Resume, on_delete=models.CASCADE, primary_key=True, related_name='archive')
+    data = models.BinaryField()
+    section_count = models.PositiveIntegerField(default=0)
+    raw_size = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.section_count} archived sections - {self.resume_id}"
+
+class ResumeDocument(models.Model):
+    """The resume's serialized payload, rebuilt on every write so reads are one row (see api.documents)"""
+    resume = models.OneToOneField(Resume, on_delete=models.CASCADE, primary_key=True, related_name='document')
+    data = models.JSONField()
+    # Resume.version the payload was built at; a mismatch means it's stale
+    version = models.PositiveIntegerField(default=0)
+    built_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Document v{self.version} - {self.resume_id}"
+
+class ResumeViewCount(models.Model):
+    """Total public views of a shared resume, flushed in batches from worker buffers"""
+    resume = models.OneToOneField(Resume, on_delete=models.CASCADE, primary_key=True, related_name='view_count')
+    views = models.PositiveBigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.views} views - {self.resume_id}"
+
+class ResumeDailyViews(models.Model):
+    """Optional per-day rollup of public resume views"""
+    resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='daily_views')
+    date = models.DateField()
+    views = models.PositiveBigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.views} views on {self.date} - {self.resume_id}"
+    
+    class Meta:
+        ordering = ['-date']
+        unique_together = ('resume', 'date')
+
+class Job(models.Model):
+    """Background job stored in the database and run by `manage.py run_workers`"""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUSES = (
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default=STATUS_QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker while the job runs; a job without recent ones is stale
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='api_job_claim_idx'),
+        ]
+
+class ResumeChange(models.Model):
+    """Change notification for a user's resume, written by the hooks in api.changes and streamed over SSE"""
+    KIND_RESUME = 'resume'
+    KIND_SECTION = 'section'
+    KIND_STYLE = 'style'
+    KINDS = (
+        (KIND_RESUME, 'Resume'),
+        (KIND_SECTION, 'Section'),
+        (KIND_STYLE, 'Style'),
+    )
+    ACTION_CREATED = 'created'
+    ACTION_UPDATED = 'updated'
+    ACTION_DELETED = 'deleted'
+    ACTIONS = (
+        (ACTION_CREATED, 'Created'),
+        (ACTION_UPDATED, 'Updated'),
+        (ACTION_DELETED, 'Deleted'),
+    )
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='resume_changes')
+    # Plain ids rather than foreign keys so deletions can still be announced
+    resume_id = models.BigIntegerField()
+    section_id = models.BigIntegerField(null=True, blank=True)
+    kind = models.CharField(max_length=10, choices=KINDS)
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    version = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f"{self.kind} {self.action} - resume {self.resume_id} v{self.version}"
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['user', 'id'], name='api_change_feed_idx'),
+        ]
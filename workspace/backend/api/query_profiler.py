@@ -0,0 +1,180 @@
+import contextvars
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+_active_profile = contextvars.ContextVar('query_profile', default=None)
+
+IN_CLAUSE_RE = re.compile(r'\bIN \((?:%s, )*%s\)')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Normalize parameterized SQL so repeated lookups share one fingerprint"""
+    sql = IN_CLAUSE_RE.sub('IN (...)', sql)
+    return WHITESPACE_RE.sub(' ', sql).strip()
+
+
+class QueryProfile:
+    """SQL and serializer timings collected for one request or block"""
+
+    def __init__(self):
+        self.url_name = None
+        self.queries = []
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self._serializer_depth = 0
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    def duplicates(self):
+        """Return {fingerprint: count} for statements executed more than once"""
+        counts = Counter(self.queries)
+        return {sql: count for sql, count in counts.items() if count > 1}
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries.append(fingerprint(sql))
+
+    def budget_violations(self, budget):
+        """Return human readable messages for every limit in budget that was exceeded"""
+        violations = []
+        if 'queries' in budget and self.query_count > budget['queries']:
+            violations.append(f"{self.query_count} queries (budget {budget['queries']})")
+        duplicates = self.duplicates()
+        if 'duplicates' in budget and len(duplicates) > budget['duplicates']:
+            listed = '; '.join(f'{count}x {sql}' for sql, count in duplicates.items())
+            violations.append(f"{len(duplicates)} duplicated queries (budget {budget['duplicates']}): {listed}")
+        if 'db_ms' in budget and self.db_time * 1000 > budget['db_ms']:
+            violations.append(f"{self.db_time * 1000:.1f}ms DB time (budget {budget['db_ms']}ms)")
+        if 'serializer_ms' in budget and self.serializer_time * 1000 > budget['serializer_ms']:
+            violations.append(
+                f"{self.serializer_time * 1000:.1f}ms serializer time (budget {budget['serializer_ms']}ms)"
+            )
+        return violations
+
+
+_timer_lock = threading.Lock()
+_timed_contexts = set()
+
+
+def _timed_data(prop, active):
+    def data(self):
+        profile = active.get()
+        if profile is None:
+            return prop.fget(self)
+        # Only the outermost serializer is timed, nested .data calls are included in it
+        profile._serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return prop.fget(self)
+        finally:
+            profile._serializer_depth -= 1
+            if profile._serializer_depth == 0:
+                profile.serializer_time += time.perf_counter() - start
+    return property(data)
+
+
+def install_serializer_timer(active=_active_profile):
+    """
+    Wrap DRF's Serializer.data and ListSerializer.data so the object set in
+    the ``active`` context var (anything with serializer_time and
+    _serializer_depth) times them. This patches DRF for the whole process,
+    so it's only called once profiling or metrics are switched on.
+    """
+    with _timer_lock:
+        if active in _timed_contexts:
+            return
+        serializers.Serializer.data = _timed_data(serializers.Serializer.data, active)
+        serializers.ListSerializer.data = _timed_data(serializers.ListSerializer.data, active)
+        _timed_contexts.add(active)
+
+
+@contextmanager
+def profile():
+    """
+    Collect a QueryProfile for every query run inside the block, and the
+    serializer time once ``install_serializer_timer`` has been called
+    """
+    query_profile = QueryProfile()
+    token = _active_profile.set(query_profile)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(query_profile))
+            yield query_profile
+    finally:
+        _active_profile.reset(token)
+
+
+def get_budget(url_name):
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(url_name)
+
+
+class QueryProfilerMiddleware:
+    """
+    Opt-in per-request SQL profiler.
+
+    Enabled with QUERY_PROFILER_ENABLED. Requests over their QUERY_BUDGETS
+    entry are logged, and with QUERY_PROFILER_HEADERS the numbers are added to
+    the response as X-Query-* headers for local profiling.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed
+        install_serializer_timer()
+        self.get_response = get_response
+        self.headers = getattr(settings, 'QUERY_PROFILER_HEADERS', False)
+
+    def __call__(self, request):
+        with profile() as query_profile:
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        query_profile.url_name = match.url_name if match else None
+
+        budget = get_budget(query_profile.url_name)
+        if budget:
+            for violation in query_profile.budget_violations(budget):
+                logger.warning(f"Query budget exceeded for {query_profile.url_name}: {violation}")
+
+        if self.headers:
+            response['X-Query-Count'] = str(query_profile.query_count)
+            response['X-Query-Duplicates'] = str(len(query_profile.duplicates()))
+            response['X-Query-DB-Time-Ms'] = f'{query_profile.db_time * 1000:.2f}'
+            response['X-Query-Serializer-Time-Ms'] = f'{query_profile.serializer_time * 1000:.2f}'
+        return response
+
+
+class QueryBudgetTestMixin:
+    """TestCase mixin that fails when a request exceeds its endpoint's QUERY_BUDGETS entry"""
+
+    @contextmanager
+    def assertQueryBudget(self, url_name):
+        budget = get_budget(url_name)
+        if budget is None:
+            self.fail(f"No query budget declared for {url_name}")
+        install_serializer_timer()
+        with profile() as query_profile:
+            yield query_profile
+        violations = query_profile.budget_violations(budget)
+        if violations:
+            self.fail(f"Query budget exceeded for {url_name}: " + ', '.join(violations))
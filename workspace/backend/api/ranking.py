@@ -0,0 +1,151 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .jobs import enqueue, job
+from .models import Section
+
+logger = logging.getLogger(__name__)
+
+REBALANCE_JOB = 'sections.rebalance_ranks'
+
+# Ranks are base-36 fractions (digits after the point) compared as plain strings,
+# lowercase only so every collation sorts them the same way
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+MAX_LENGTH = Section._meta.get_field('rank').max_length
+PLACE_ATTEMPTS = 5
+
+
+def midpoint(before, after):
+    """
+    Return a key strictly between ``before`` and ``after``.
+
+    ``before`` may be '' (the start) and ``after`` None (the end). Keys never
+    end in '0', which leaves room to insert in front of any key.
+    """
+    if after is not None:
+        # Keep the common prefix and split the rest
+        n = 0
+        while n < len(after) and (before[n] if n < len(before) else '0') == after[n]:
+            n += 1
+        if n:
+            return after[:n] + midpoint(before[n:], after[n:])
+    low = DIGITS.index(before[0]) if before else 0
+    high = DIGITS.index(after[0]) if after is not None else len(DIGITS)
+    if high - low > 1:
+        return DIGITS[(low + high + 1) // 2]
+    if after is not None and len(after) > 1:
+        return after[:1]
+    return DIGITS[low] + midpoint(before[1:], None)
+
+
+def key_between(before, after):
+    if after is not None and before >= after:
+        raise ValueError(f"Can't place a key between '{before}' and '{after}'")
+    return midpoint(before or '', after)
+
+
+def spread_keys(count):
+    """``count`` increasing keys, evenly spaced with room for inserts between them"""
+    width = 1
+    while len(DIGITS) ** width < count * len(DIGITS):
+        width += 1
+    step = len(DIGITS) ** width // (count + 1)
+    keys = []
+    for i in range(1, count + 1):
+        value, digits = step * i, []
+        for _ in range(width):
+            value, digit = divmod(value, len(DIGITS))
+            digits.append(DIGITS[digit])
+        keys.append(''.join(reversed(digits)).rstrip('0'))
+    return keys
+
+
+def sibling_ranks(resume_id, exclude=None):
+    siblings = Section.objects.filter(resume_id=resume_id)
+    if exclude is not None:
+        siblings = siblings.exclude(pk=exclude)
+    return list(siblings.values_list('rank', flat=True))
+
+
+def rank_for_position(ranks, position=None):
+    """
+    Return (rank, position) for a section placed at the 1-based ``position``
+    among siblings with the given ordered ranks; at the end when None.
+    """
+    count = len(ranks)
+    position = count + 1 if position is None else max(1, min(position, count + 1))
+    before = ranks[position - 2] if position > 1 else ''
+    after = ranks[position - 1] if position <= count else None
+    return key_between(before, after), position
+
+
+def place(section, position=None):
+    """
+    Save ``section`` at the 1-based ``position`` in its resume, or at the end.
+
+    Only this row is written. Two concurrent writers can pick the same key;
+    the unique constraint rejects the second, which re-reads its neighbours
+    and tries again. Sets ``section.position`` for serializing.
+
+    Siblings created without a rank sort first and can't be placed between;
+    the section goes after them and a background rebalance ranks them.
+    """
+    exclude = None if section._state.adding else section.pk
+    for attempt in range(PLACE_ATTEMPTS):
+        ranks = sibling_ranks(section.resume_id, exclude)
+        unranked = ranks.count('')
+        if unranked:
+            schedule_rebalance(section.resume_id)
+            if position is not None:
+                position = max(position, unranked + 1)
+        section.rank, section.position = rank_for_position(ranks, position)
+        if len(section.rank) > MAX_LENGTH:
+            rebalance(section.resume_id)
+            continue
+        section.order = section.position
+        try:
+            with transaction.atomic():
+                section.save()
+        except IntegrityError:
+            if attempt == PLACE_ATTEMPTS - 1:
+                raise
+            continue
+        if len(section.rank) > getattr(settings, 'SECTION_RANK_REBALANCE_LENGTH', 12):
+            schedule_rebalance(section.resume_id)
+        return section
+    raise IntegrityError(f"Could not find a free rank in resume {section.resume_id}")
+
+
+def schedule_rebalance(resume_id):
+    """Queue one rebalance job per resume at a time"""
+    if cache.add(f'rank-rebalance:{resume_id}', 1, 300):
+        enqueue(REBALANCE_JOB, {'resume_id': resume_id})
+
+
+def rebalance(resume_id):
+    """
+    Give a resume's sections short, evenly spaced ranks in their current order.
+
+    Positions don't change, so nothing is announced. Ranks are cleared first
+    so the unique constraint never sees two rows swap keys. Returns how many
+    sections were renumbered.
+    """
+    with transaction.atomic():
+        sections = list(
+            Section.objects.select_for_update().filter(resume_id=resume_id).only('id', 'rank', 'order')
+        )
+        Section.objects.filter(resume_id=resume_id).update(rank='')
+        for position, (section, rank) in enumerate(zip(sections, spread_keys(len(sections))), 1):
+            section.rank, section.order = rank, position
+        Section.objects.bulk_update(sections, ['rank', 'order'], batch_size=500)
+    logger.info(f"Rebalanced {len(sections)} section ranks of resume {resume_id}")
+    return len(sections)
+
+
+@job(REBALANCE_JOB)
+def rebalance_job(payload, job):
+    cache.delete(f"rank-rebalance:{payload['resume_id']}")
+    return {'sections': rebalance(payload['resume_id'])}
@@ -0,0 +1,133 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'HTTP_X_PROFILE'
+SALT = 'api.request_profiler'
+# Underscores separate the tags, so they can't appear in the route
+UNSAFE_CHARS_RE = re.compile(r'[^A-Za-z0-9.-]+')
+# <unix ns>_<route>_<method>_<status>_<duration ms>ms_<pid>.prof
+FILENAME_RE = re.compile(
+    r'^(?P<timestamp>\d+)_(?P<route>[A-Za-z0-9.-]+)_(?P<method>[A-Z]+)_(?P<status>\d+)_(?P<duration>\d+)ms_\d+\.prof$'
+)
+
+_rotate_lock = threading.Lock()
+
+
+def profile_dir():
+    return getattr(settings, 'REQUEST_PROFILER_DIR', None) or os.path.join(tempfile.gettempdir(), 'resume-profiles')
+
+
+def make_token():
+    """A value for the X-Profile header that forces profiling of one request"""
+    return signing.TimestampSigner(salt=SALT).sign('profile')
+
+
+def valid_token(value):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            value, max_age=getattr(settings, 'REQUEST_PROFILER_TOKEN_MAX_AGE', 3600)
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def profile_filename(route, method, status, duration):
+    route = UNSAFE_CHARS_RE.sub('.', route or 'unresolved').strip('.') or 'unresolved'
+    return f'{time.time_ns()}_{route}_{method}_{status}_{round(duration * 1000)}ms_{os.getpid()}.prof'
+
+
+def parse_filename(name):
+    """Return the route, method, status and duration tags of a profile file, or None"""
+    match = FILENAME_RE.match(name)
+    if match is None:
+        return None
+    return {
+        'timestamp': int(match['timestamp']) / 1e9,
+        'route': match['route'],
+        'method': match['method'],
+        'status': int(match['status']),
+        'duration': int(match['duration']) / 1000,
+    }
+
+
+def rotate(directory, keep):
+    """Delete the oldest profiles beyond the newest ``keep``"""
+    with _rotate_lock:
+        names = sorted(name for name in os.listdir(directory) if FILENAME_RE.match(name))
+        for name in names[:max(len(names) - keep, 0)]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                # Another process rotated it already
+                pass
+
+
+class RequestProfilerMiddleware:
+    """
+    Opt-in sampled cProfile of whole requests.
+
+    Enabled with REQUEST_PROFILER_ENABLED. A REQUEST_PROFILER_SAMPLE_RATE
+    fraction of requests is profiled, plus any request carrying a signed
+    X-Profile header (see ``manage.py profile_report --token``). Profiles are
+    written to REQUEST_PROFILER_DIR named after the route, method, status and
+    duration, keeping the newest REQUEST_PROFILER_MAX_FILES. Aggregate them
+    with ``manage.py profile_report``.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_PROFILER_SAMPLE_RATE', 0.01)
+        self.max_files = getattr(settings, 'REQUEST_PROFILER_MAX_FILES', 200)
+
+    def should_profile(self, request):
+        header = request.META.get(HEADER)
+        if header is not None:
+            return valid_token(header)
+        return random.random() < self.sample_rate
+
+    def __call__(self, request):
+        forced = HEADER in request.META
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already running in this thread
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        name = profile_filename(match.url_name if match else None, request.method, response.status_code, duration)
+        directory = profile_dir()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(directory, name))
+            rotate(directory, self.max_files)
+        except OSError as exc:
+            logger.warning(f"Could not write request profile {name}: {exc}")
+            return response
+        if forced:
+            response['X-Profile-Id'] = name
+        return response
@@ -0,0 +1,8 @@
+from django.urls import re_path
+
+from .consumers import ResumeEditConsumer
+
+# WebSocket URL patterns, served by config.asgi
+websocket_urlpatterns = [
+    re_path(r'^ws/resumes/(?P<resume_id>\d+)/$', ResumeEditConsumer.as_asgi()),
+]
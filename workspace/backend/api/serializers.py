@@ -1,9 +1,21 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Resume, Section, Style
+from django.db.models.manager import BaseManager
+from .models import Resume, Section, Style, Job, set_positions
+from .ranking import place
 
 User = get_user_model()
 
+class SparseFieldsMixin:
+    """Drop every field not named in the 'sparse_fields' context entry, when present"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        sparse_fields = self.context.get('sparse_fields')
+        if sparse_fields is not None:
+            for name in set(self.fields) - set(sparse_fields):
+                self.fields.pop(name)
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the User model"""
     class Meta:
@@ -24,11 +36,33 @@ class StyleSerializer(serializers.ModelSerializer):
         model = Style
         fields = ('id', 'primary_color', 'font_family', 'font_size')
 
+class SectionListSerializer(serializers.ListSerializer):
+    """Numbers sections that have no ``position`` yet once per list rather than once per row"""
+    
+    def to_representation(self, data):
+        sections = list(data.all() if isinstance(data, BaseManager) else data)
+        if any(getattr(section, 'position', None) is None for section in sections):
+            if isinstance(data, BaseManager) and hasattr(data, 'instance'):
+                # A resume's whole (prefetched) ``sections`` relation is already in order
+                for position, section in enumerate(sections, 1):
+                    section.position = position
+            else:
+                set_positions(sections)
+        return super().to_representation(sections)
+
+def section_index(section):
+    """The 0-based index API clients know as ``order``, from the section's 1-based ``position``"""
+    return None if section.position is None else section.position - 1
+
 class SectionSerializer(serializers.ModelSerializer):
-    """Serializer for the Section model"""
+    """Serializer for the Section model; instances must have ``position`` set (see set_positions)"""
     class Meta:
         model = Section
+        list_serializer_class = SectionListSerializer
         fields = ('id', 'type', 'content', 'order')
+        # The 0-based index in the resume, as the client numbers sections; new sections go
+        # to the end when omitted. Writing a different index moves the section there.
+        extra_kwargs = {'order': {'required': False}}
         
     def validate(self, data):
         """Validate the entire section data"""
@@ -50,8 +84,30 @@ class SectionSerializer(serializers.ModelSerializer):
         if not isinstance(value, dict):
             raise serializers.ValidationError("Content must be a JSON object")
         return value
+    
+    def create(self, validated_data):
+        """Insert the section at the requested index without renumbering its siblings"""
+        index = validated_data.pop('order', None)
+        return place(Section(**validated_data), None if index is None else index + 1)
+    
+    def update(self, instance, validated_data):
+        """Apply the changes, moving the section when a different index is given"""
+        index = validated_data.pop('order', None)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Clients send the index back with every edit; only a changed one is a move
+        if index is None or index + 1 == getattr(instance, 'position', None):
+            instance.save()
+            return instance
+        return place(instance, index + 1)
+    
+    def to_representation(self, instance):
+        """Report the index derived from the rank as 'order'"""
+        data = super().to_representation(instance)
+        data['order'] = section_index(instance)
+        return data
 
-class ResumeSerializer(serializers.ModelSerializer):
+class ResumeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for the Resume model"""
     sections = SectionSerializer(many=True, read_only=True)
     style = StyleSerializer(read_only=True)
@@ -77,11 +133,42 @@ class ResumeListSerializer(serializers.ModelSerializer):
         model = Resume
         fields = ('id', 'title', 'template_name', 'updated_at')
 
-class PublicResumeSerializer(serializers.ModelSerializer):
+class TrashedResumeSerializer(serializers.ModelSerializer):
+    """Resume in the trash, with the time it will be purged"""
+    purge_at = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Resume
+        fields = ('id', 'title', 'template_name', 'updated_at', 'deleted_at', 'purge_at')
+    
+    def get_purge_at(self, obj):
+        return obj.deleted_at + self.context['retention']
+
+class SectionOrderSerializer(serializers.Serializer):
+    """Validate a resume's section ids in their new order"""
+    section_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=500)
+
+class DuplicateResumeSerializer(serializers.Serializer):
+    """Validate the optional title of a resume's copy"""
+    title = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
+class ResumeIdsSerializer(serializers.Serializer):
+    """Validate the ids of a bulk resume operation"""
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=500)
+
+class PublicResumeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for publicly shared resumes"""
     sections = SectionSerializer(many=True, read_only=True)
     style = StyleSerializer(read_only=True)
     
     class Meta:
         model = Resume
-        fields = ('id', 'title', 'template_name', 'sections', 'style')
\ No newline at end of file
+        fields = ('id', 'title', 'template_name', 'sections', 'style')
+
+class JobSerializer(serializers.ModelSerializer):
+    """Read-only serializer for polling background job status"""
+    class Meta:
+        model = Job
+        fields = ('id', 'kind', 'status', 'result', 'error', 'attempts', 'max_attempts',
+                  'run_at', 'created_at', 'started_at', 'finished_at')
+        read_only_fields = fields
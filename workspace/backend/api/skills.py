@@ -0,0 +1,234 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+from .models import Section
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PATH = Path(__file__).resolve().parent / 'data' / 'skills.json'
+
+# Match kinds, best first
+EXACT, NAME_PREFIX, WORD_PREFIX, FUZZY = range(4)
+
+
+def load_catalog(path=CATALOG_PATH):
+    """Return the predefined skill categories shipped with the backend"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_section_skills(content):
+    """Yield (name, category) for every skill stored in a skills section's content"""
+    if not isinstance(content, dict):
+        return
+    for item in content.get('items') or []:
+        if isinstance(item, str):
+            name, category = item, None
+        elif isinstance(item, dict):
+            name, category = item.get('name'), item.get('category')
+        else:
+            continue
+        if isinstance(name, str) and name.strip():
+            yield name.strip(), category if isinstance(category, str) else None
+
+
+def prefix_distance(query, name, max_edits):
+    """
+    Edit distance (adjacent swaps count as one edit) between query and the
+    closest prefix of name, or None if it exceeds max_edits. Lets 'pyhton'
+    match 'Python' and 'javscr' match 'JavaScript'.
+    """
+    before, previous = None, list(range(len(name) + 1))
+    for i, char in enumerate(query, 1):
+        current = [i]
+        for j, other in enumerate(name, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+            if i > 1 and j > 1 and char == name[j - 2] and query[i - 2] == other:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > max_edits:
+            return None
+        before, previous = previous, current
+    distance = min(previous)
+    return distance if distance <= max_edits else None
+
+
+class SkillIndex:
+    """
+    Immutable in-memory skill index.
+
+    Lowercased names and their individual words are kept in sorted arrays, so
+    a prefix lookup is a bisect plus a scan over the matches. Fuzzy matching
+    only runs when prefix matches don't fill the page, and only over names
+    that share the query's first letter.
+    """
+
+    def __init__(self, skills):
+        # skills: iterable of (name, category, popularity)
+        self.entries = []
+        seen = {}
+        for name, category, popularity in skills:
+            key = name.lower()
+            if key in seen:
+                entry = self.entries[seen[key]]
+                entry['popularity'] += popularity
+                entry['category'] = entry['category'] or category
+                continue
+            seen[key] = len(self.entries)
+            self.entries.append({'name': name, 'category': category, 'popularity': popularity})
+
+        self.lowered = [entry['name'].lower() for entry in self.entries]
+        self.names = sorted((name, i) for i, name in enumerate(self.lowered))
+        self.name_keys = [key for key, _ in self.names]
+        self.words = sorted(
+            (word, i)
+            for i in range(len(self.entries))
+            for word in self.lowered[i].replace('/', ' ').replace('-', ' ').split()[1:]
+        )
+        self.word_keys = [key for key, _ in self.words]
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def _prefix_range(keys, pairs, prefix):
+        start = bisect_left(keys, prefix)
+        for position in range(start, len(keys)):
+            if not keys[position].startswith(prefix):
+                break
+            yield pairs[position][1]
+
+    def search(self, query, category=None, limit=10):
+        """Return up to limit entries ranked by match quality then popularity"""
+        query = query.strip().lower()
+        matches = {}
+
+        def consider(i, kind):
+            entry = self.entries[i]
+            if category and entry['category'] != category:
+                return
+            if kind < matches.get(i, FUZZY + 1):
+                matches[i] = kind
+
+        if not query:
+            for i in range(len(self.entries)):
+                consider(i, NAME_PREFIX)
+        else:
+            for i in self._prefix_range(self.name_keys, self.names, query):
+                consider(i, EXACT if self.lowered[i] == query else NAME_PREFIX)
+            for i in self._prefix_range(self.word_keys, self.words, query):
+                consider(i, WORD_PREFIX)
+            if len(matches) < limit and len(query) >= 3:
+                max_edits = 1 if len(query) < 7 else 2
+                for i in self._prefix_range(self.name_keys, self.names, query[0]):
+                    if i not in matches and prefix_distance(query, self.lowered[i], max_edits) is not None:
+                        consider(i, FUZZY)
+
+        ranked = sorted(
+            matches.items(),
+            key=lambda item: (item[1], -self.entries[item[0]]['popularity'], len(self.entries[item[0]]['name']))
+        )
+        return [dict(self.entries[i], match=kind) for i, kind in ranked[:limit]]
+
+
+def build_index():
+    """
+    Build an index from the catalog plus the skills stored in skills sections.
+
+    The index is shared by every user, so a stored skill is only included
+    when it's in the catalog or listed in at least SKILLS_MIN_RESUMES
+    resumes; one person's entries never show up in anyone else's results.
+    """
+    skills = []
+    catalog = set()
+    for category in load_catalog():
+        for name in category['skills']:
+            skills.append((name, category['id'], 1))
+            catalog.add(name.lower())
+
+    min_resumes = getattr(settings, 'SKILLS_MIN_RESUMES', 5)
+    counts = Counter()
+    categories = {}
+    resumes = defaultdict(set)
+    rows = Section.objects.filter(type='skills', resume__deleted_at__isnull=True).values_list('resume_id', 'content')
+    for resume_id, content in rows.iterator(chunk_size=2000):
+        for name, category in iter_section_skills(content):
+            counts[name] += 1
+            categories.setdefault(name, category)
+            key = name.lower()
+            if key not in catalog and len(resumes[key]) < min_resumes:
+                resumes[key].add(resume_id)
+    for name, count in counts.items():
+        key = name.lower()
+        if key in catalog or len(resumes[key]) >= min_resumes:
+            skills.append((name, categories[name], count))
+    return SkillIndex(skills)
+
+
+_index = None
+_built_at = 0.0
+_rebuilding = False
+_lock = threading.Lock()
+
+
+def get_skill_index():
+    """
+    Return the process-wide skill index.
+
+    The first call builds it. After SKILLS_INDEX_TTL seconds it's rebuilt in a
+    background thread and the old index keeps serving until the new one is
+    ready, so no request waits for a rebuild.
+    """
+    global _index, _built_at
+    ttl = getattr(settings, 'SKILLS_INDEX_TTL', 600)
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = build_index()
+                _built_at = time.monotonic()
+        return _index
+    if time.monotonic() - _built_at > ttl:
+        _start_rebuild(lambda: time.monotonic() - _built_at > ttl)
+    return _index
+
+
+def warm_skill_index():
+    """Start building the index in a background thread, unless it's built or being built"""
+    _start_rebuild(lambda: _index is None)
+
+
+def _start_rebuild(needed):
+    global _rebuilding
+    with _lock:
+        start = not _rebuilding and needed()
+        _rebuilding = _rebuilding or start
+    if start:
+        threading.Thread(target=_rebuild, name='skill-index', daemon=True).start()
+
+
+def _rebuild():
+    global _index, _built_at, _rebuilding
+    try:
+        index = build_index()
+    except Exception:
+        logger.exception("Rebuilding the skill index failed; serving the old one")
+        index = _index
+    finally:
+        # Request threads open their own connections
+        connections.close_all()
+    with _lock:
+        # A failed rebuild is retried after another TTL rather than on every request
+        _index, _built_at, _rebuilding = index, time.monotonic(), False
+
+
+def reset_skill_index():
+    global _index
+    _index = None
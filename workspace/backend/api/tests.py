@@ -1,12 +1,77 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from xml.etree import ElementTree
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib import admin
 from django.contrib.auth import get_user_model
-from .models import Resume, Section, Style
+from .models import Resume, Section, Style, ResumeViewCount, ResumeDailyViews, Job, ResumeChange, ResumeArchive, ResumeDocument
+from .middleware import CompressionMiddleware, GzipCodec, negotiate_encoding
+from .hashing import run_in_hashing_pool
+from .view_counters import ViewCounterBuffer, view_counter
+from .query_profiler import QueryBudgetTestMixin, QueryProfilerMiddleware, fingerprint, profile
+from . import health, jobs
+from .skills import SkillIndex, build_index, get_skill_index, prefix_distance, reset_skill_index
+from .matching import match_resumes, term_cache, tokenize
+from .diff import diff_items, diff_resumes, longest_increasing_subsequence
+from .routing import websocket_urlpatterns
+from .changes import change_stream, prune_changes
+from .db_router import ReplicaRouter, reset_unavailable, sticky_key
+from .archive import archive_idle_resumes, archive_resumes, decode_sections
+from .trash import PURGE_JOB, purge_trash
+from .fieldsets import parse_include
+from .docx_export import stream_docx
+from .json_resume import ConversionError, from_json_resume
+from .documents import refresh_documents
+from .collab import OpError, apply_section_ops
+from .views import ResumeViewSet
+from .ranking import REBALANCE_JOB, key_between, spread_keys
+from .request_profiler import make_token as make_profile_token, parse_filename as parse_profile_filename, valid_token as valid_profile_token
+from .metrics import RequestMetrics, _request_metrics, archive_worker, collect, install_cache_counters, local_file
+from .throttling import LocalTokenBucketStore, CacheSlidingWindowStore, local_store
 
 User = get_user_model()
 
-class AuthTests(APITestCase):
+class BaseAPITestCase(APITestCase):
+    """API test case that starts every test with empty throttle buckets and view counters"""
+    
+    def _pre_setup(self):
+        super()._pre_setup()
+        local_store.clear()
+        cache.clear()
+        view_counter.clear()
+    
+    def _post_teardown(self):
+        # Don't leave buffered views for the exit-time flush once the test database is gone
+        view_counter.clear()
+        super()._post_teardown()
+
+class AuthTests(BaseAPITestCase):
     """Test the auth API"""
     
     def setUp(self):
@@ -47,7 +112,7 @@ class AuthTests(APITestCase):
         self.assertIn('access', response.data)
         self.assertIn('refresh', response.data)
 
-class ResumeTests(APITestCase):
+class ResumeTests(BaseAPITestCase):
     """Test the resume API"""
     
     def setUp(self):
@@ -120,7 +185,7 @@ class ResumeTests(APITestCase):
         self.resume.refresh_from_db()
         self.assertIsNotNone(self.resume.share_slug)
 
-class SectionTests(APITestCase):
+class SectionTests(BaseAPITestCase):
     """Test the section API"""
     
     def setUp(self):
@@ -189,3 +254,2608 @@ class SectionTests(APITestCase):
         response = self.client.get(self.sections_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
+
+class CompressionTests(BaseAPITestCase):
+    """Test negotiated response compression"""
+    
+    def setUp(self):
+        """Setup a shared resume with a compressible payload"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.resume = Resume.objects.create(user=self.user, title='Shared Resume')
+        Style.objects.create(resume=self.resume)
+        Section.objects.create(
+            resume=self.resume,
+            type='summary',
+            content={'text': 'Experienced developer building web applications. ' * 40},
+            order=1
+        )
+        self.url = reverse('public-resume', args=[self.resume.share_slug])
+    
+    def test_gzip_negotiated(self):
+        """Test gzip is used when it is the only accepted encoding"""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        payload = json.loads(gzip.decompress(response.content))
+        self.assertEqual(payload['title'], 'Shared Resume')
+    
+    def test_no_accept_encoding(self):
+        """Test responses are untouched when the client accepts no encoding"""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='identity, gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json()['title'], 'Shared Resume')
+    
+    def test_small_body_skipped(self):
+        """Test bodies under the minimum length are not compressed"""
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        middleware = CompressionMiddleware(lambda r: HttpResponse(b'{}'))
+        response = middleware(request)
+        self.assertFalse(response.has_header('Content-Encoding'))
+    
+    def test_large_body_streamed(self):
+        """Test bodies over the stream threshold are compressed incrementally"""
+        body = b'x' * 5000
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        with override_settings(COMPRESSION_STREAM_THRESHOLD=1000):
+            middleware = CompressionMiddleware(lambda r: HttpResponse(body))
+        response = middleware(request)
+        self.assertTrue(response.streaming)
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), body)
+    
+    def test_public_response_compressed_once(self):
+        """Test cacheable responses reuse the compressed bytes"""
+        with mock.patch.object(GzipCodec, 'compress', autospec=True, side_effect=GzipCodec.compress) as compress:
+            first = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+            second = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first.content, second.content)
+    
+    def test_accept_encoding_negotiation(self):
+        """Test q-values and server preference when picking an encoding"""
+        codecs = {'br': object(), 'zstd': object(), 'gzip': GzipCodec()}
+        self.assertEqual(negotiate_encoding('gzip, br', codecs), 'br')
+        self.assertEqual(negotiate_encoding('br;q=0.5, gzip', codecs), 'gzip')
+        self.assertEqual(negotiate_encoding('*', codecs), 'br')
+        self.assertIsNone(negotiate_encoding('deflate', codecs))
+
+class ThrottleTests(BaseAPITestCase):
+    """Test token-bucket and sliding-window throttling"""
+    
+    def setUp(self):
+        """Setup a shared resume and tight throttle rates"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.resume = Resume.objects.create(user=self.user, title='Shared Resume')
+        Style.objects.create(resume=self.resume)
+        self.public_url = reverse('public-resume', args=[self.resume.share_slug])
+        self.rates = mock.patch.dict(
+            'rest_framework.settings.api_settings.DEFAULT_THROTTLE_RATES',
+            {'public_resume': '5/min', 'public_resume_slug': '8/min',
+             'login': '100/min', 'login_username': '3/min', 'register': '2/hour'}
+        )
+        self.rates.start()
+        self.addCleanup(self.rates.stop)
+    
+    def test_public_resume_burst(self):
+        """Test a burst from one IP is cut off after the bucket empties"""
+        codes = [self.client.get(self.public_url).status_code for _ in range(7)]
+        self.assertEqual(codes[:5], [status.HTTP_200_OK] * 5)
+        self.assertEqual(codes[5:], [status.HTTP_429_TOO_MANY_REQUESTS] * 2)
+        response = self.client.get(self.public_url)
+        self.assertIn('Retry-After', response)
+    
+    def test_public_resume_revalidated(self):
+        """Test shared copies must be revalidated, and a matching ETag is answered with a counted 304"""
+        response = self.client.get(self.public_url)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        etag = response['ETag']
+        with mock.patch.object(view_counter, 'record') as record:
+            response = self.client.get(self.public_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        record.assert_called_once_with(self.resume.pk)
+        
+        self.resume.title = 'Renamed'
+        self.resume.save()
+        self.assertEqual(self.client.get(self.public_url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+        
+        self.resume.share_slug = uuid.uuid4()
+        self.resume.save()
+        self.assertEqual(self.client.get(self.public_url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_share_slug_limit_across_ips(self):
+        """Test one share_slug is limited even when requests come from many IPs"""
+        codes = [
+            self.client.get(self.public_url, REMOTE_ADDR=f'10.0.0.{i}').status_code
+            for i in range(10)
+        ]
+        self.assertEqual(codes.count(status.HTTP_200_OK), 8)
+        self.assertEqual(codes.count(status.HTTP_429_TOO_MANY_REQUESTS), 2)
+    
+    def test_login_username_burst(self):
+        """Test credential stuffing against one username is throttled"""
+        url = reverse('token_obtain_pair')
+        codes = [
+            self.client.post(url, {'username': 'TestUser', 'password': f'guess{i}'}, format='json').status_code
+            for i in range(4)
+        ]
+        self.assertEqual(codes[:3], [status.HTTP_401_UNAUTHORIZED] * 3)
+        self.assertEqual(codes[3], status.HTTP_429_TOO_MANY_REQUESTS)
+        # Other usernames are unaffected
+        response = self.client.post(url, {'username': 'other', 'password': 'x'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_register_burst(self):
+        """Test registration is throttled per IP"""
+        url = reverse('register')
+        codes = [
+            self.client.post(url, {'username': f'user{i}', 'password': 'testpassword123'}, format='json').status_code
+            for i in range(3)
+        ]
+        self.assertEqual(codes, [status.HTTP_201_CREATED, status.HTTP_201_CREATED, status.HTTP_429_TOO_MANY_REQUESTS])
+    
+    def test_token_bucket_refills(self):
+        """Test the local token bucket refills with elapsed time"""
+        store = LocalTokenBucketStore()
+        self.assertEqual([store.hit('k', 2, 60, now=0)[0] for _ in range(3)], [True, True, False])
+        allowed, wait = store.hit('k', 2, 60, now=0)
+        self.assertAlmostEqual(wait, 30)
+        self.assertTrue(store.hit('k', 2, 60, now=30)[0])
+        self.assertFalse(store.hit('k', 2, 60, now=30)[0])
+    
+    def test_token_bucket_bounded(self):
+        """Test the local store evicts old buckets past max_entries"""
+        store = LocalTokenBucketStore(max_entries=3)
+        for i in range(10):
+            store.hit(f'ip{i}', 5, 60, now=0)
+        self.assertEqual(len(store._buckets), 3)
+    
+    def test_cache_sliding_window(self):
+        """Test the shared cache store weights the previous window"""
+        store = CacheSlidingWindowStore()
+        self.assertEqual([store.hit('k', 4, 60, now=0)[0] for _ in range(5)], [True] * 4 + [False])
+        # Halfway through the next window half of the previous count still applies
+        self.assertEqual([store.hit('k', 4, 60, now=90)[0] for _ in range(3)], [True, True, False])
+    
+    def test_cache_store_setting(self):
+        """Test THROTTLE_STORE='cache' routes throttles through the cache store"""
+        with override_settings(THROTTLE_STORE='cache'):
+            codes = [self.client.get(self.public_url).status_code for _ in range(6)]
+        self.assertEqual(codes.count(status.HTTP_429_TOO_MANY_REQUESTS), 1)
+        self.assertEqual(len(local_store._buckets), 0)
+
+class PasswordHashingTests(BaseAPITestCase):
+    """Test configurable hashers, rehash-on-login and pooled hashing"""
+    
+    scrypt_first = [
+        'api.hashing.PooledScryptPasswordHasher',
+        'api.hashing.PooledPBKDF2PasswordHasher',
+    ]
+    
+    def test_rehash_on_login(self):
+        """Test a legacy PBKDF2 hash is upgraded when the user logs in"""
+        user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+        with override_settings(PASSWORD_HASHERS=self.scrypt_first):
+            response = self.client.post(
+                reverse('token_obtain_pair'),
+                {'username': 'testuser', 'password': 'testpassword123'},
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+    
+    def test_hashing_runs_in_pool(self):
+        """Test hashing is offloaded to the bounded pool when enabled"""
+        with override_settings(PASSWORD_HASHING_POOL_SIZE=2):
+            thread_name = run_in_hashing_pool(lambda: threading.current_thread().name)
+            encoded = make_password('testpassword123')
+        self.assertTrue(thread_name.startswith('password-hashing'))
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$'))
+    
+    def test_hashing_inline_by_default(self):
+        """Test hashing stays on the calling thread when the pool is disabled"""
+        thread_name = run_in_hashing_pool(lambda: threading.current_thread().name)
+        self.assertEqual(thread_name, threading.current_thread().name)
+    
+    def test_bench_auth_command(self):
+        """Test the login benchmark reports a rate and cleans up its user"""
+        out = StringIO()
+        call_command('bench_auth', hasher=['scrypt'], requests=2, stdout=out)
+        self.assertIn('scrypt', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='bench-auth-').exists())
+
+@override_settings(VIEW_COUNTER_FLUSH_INTERVAL=3600)
+class ViewCounterTests(BaseAPITestCase):
+    """Test buffered share view counters"""
+    
+    def setUp(self):
+        """Setup a shared resume and an authenticated owner"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.resume = Resume.objects.create(user=self.user, title='Shared Resume')
+        Style.objects.create(resume=self.resume)
+        self.public_url = reverse('public-resume', args=[self.resume.share_slug])
+        self.stats_url = reverse('resume-view-stats', args=[self.resume.id])
+    
+    def test_views_buffered_until_flush(self):
+        """Test public views don't touch the database until flushed"""
+        for _ in range(3):
+            self.client.get(self.public_url)
+        self.assertFalse(ResumeViewCount.objects.exists())
+        view_counter.flush()
+        self.assertEqual(ResumeViewCount.objects.get(resume=self.resume).views, 3)
+        self.assertEqual(ResumeDailyViews.objects.get(resume=self.resume).views, 3)
+    
+    def test_flush_increments_existing_rows(self):
+        """Test repeated flushes add to the stored totals"""
+        buffer = ViewCounterBuffer()
+        for _ in range(2):
+            buffer.record(self.resume.pk)
+        buffer.flush()
+        buffer.record(self.resume.pk)
+        buffer.flush()
+        self.assertEqual(ResumeViewCount.objects.get(resume=self.resume).views, 3)
+        self.assertEqual(ResumeDailyViews.objects.get(resume=self.resume).views, 3)
+    
+    def test_flush_query_count_is_constant(self):
+        """Test a flush of many resumes uses a fixed number of queries"""
+        resumes = [Resume.objects.create(user=self.user, title=f'Resume {i}') for i in range(20)]
+        buffer = ViewCounterBuffer()
+        for resume in resumes:
+            buffer.record(resume.pk)
+        # savepoint, resume lookup, insert + update for totals, insert + select + update for daily, release
+        with self.assertNumQueries(8):
+            buffer.flush()
+        self.assertEqual(ResumeViewCount.objects.filter(views=1).count(), 20)
+    
+    def test_deleted_resume_dropped(self):
+        """Test counts for resumes deleted before the flush are discarded"""
+        buffer = ViewCounterBuffer()
+        buffer.record(self.resume.pk)
+        self.resume.delete()
+        buffer.flush()
+        self.assertFalse(ResumeViewCount.objects.exists())
+    
+    def test_failed_flush_keeps_counts(self):
+        """Test counts are re-buffered when the flush fails"""
+        buffer = ViewCounterBuffer()
+        buffer.record(self.resume.pk)
+        with mock.patch.object(ViewCounterBuffer, '_write_totals', side_effect=RuntimeError):
+            buffer.flush()
+        self.assertEqual(buffer.pending(self.resume.pk), 1)
+    
+    def test_owner_endpoint(self):
+        """Test owners see flushed and pending views"""
+        self.client.get(self.public_url)
+        view_counter.flush()
+        self.client.get(self.public_url)
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.stats_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['views'], 2)
+        self.assertEqual(response.data['daily'][0]['views'], 1)
+    
+    def test_owner_endpoint_other_user(self):
+        """Test other users can't read view counts"""
+        other = User.objects.create_user(username='other', password='testpassword123')
+        self.client.force_authenticate(other)
+        response = self.client.get(self.stats_url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class ResumeDuplicateTests(BaseAPITestCase):
+    """Test server-side resume duplication"""
+    
+    def setUp(self):
+        """Setup a resume with a custom style"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(self.user)
+        self.resume = Resume.objects.create(user=self.user, title='Base Resume', template_name='modern')
+        Style.objects.create(resume=self.resume, primary_color='#123456', font_family='Georgia', font_size=12)
+    
+    def add_sections(self, resume, count):
+        Section.objects.bulk_create([
+            Section(resume=resume, type='experience', content={'items': [{'company': f'Company {i}'}]}, order=i)
+            for i in range(count)
+        ])
+    
+    def duplicate_queries(self, resume):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('resume-duplicate', args=[resume.id]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return len(queries)
+    
+    def test_duplicate_copies_everything(self):
+        """Test the copy has the same style and sections but a new share_slug"""
+        self.add_sections(self.resume, 3)
+        response = self.client.post(reverse('resume-duplicate', args=[self.resume.id]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        copy = Resume.objects.get(pk=response.data['id'])
+        self.assertEqual(copy.title, 'Base Resume (Copy)')
+        self.assertEqual(copy.template_name, 'modern')
+        self.assertNotEqual(copy.share_slug, self.resume.share_slug)
+        self.assertEqual(copy.style.font_family, 'Georgia')
+        self.assertEqual(copy.style.primary_color, '#123456')
+        self.assertEqual(
+            list(copy.sections.values_list('type', 'content', 'order')),
+            list(self.resume.sections.values_list('type', 'content', 'order'))
+        )
+        self.assertEqual(len(response.data['sections']), 3)
+    
+    def test_duplicate_custom_title(self):
+        """Test a title can be given for the copy"""
+        response = self.client.post(
+            reverse('resume-duplicate', args=[self.resume.id]), {'title': 'Tailored'}, format='json'
+        )
+        self.assertEqual(response.data['title'], 'Tailored')
+        
+        for title in ('x' * 256, ['Tailored'], {'text': 'Tailored'}):
+            response = self.client.post(
+                reverse('resume-duplicate', args=[self.resume.id]), {'title': title}, format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, title)
+            self.assertIn('title', response.data)
+        self.assertEqual(Resume.objects.count(), 2)
+    
+    def test_duplicate_constant_queries(self):
+        """Test duplication cost doesn't grow with the number of sections"""
+        small = Resume.objects.create(user=self.user, title='Small')
+        Style.objects.create(resume=small)
+        self.add_sections(small, 2)
+        self.add_sections(self.resume, 40)
+        self.assertEqual(self.duplicate_queries(small), self.duplicate_queries(self.resume))
+    
+    def test_duplicate_other_users_resume(self):
+        """Test users can't duplicate resumes they don't own"""
+        other = User.objects.create_user(username='other', password='testpassword123')
+        self.client.force_authenticate(other)
+        response = self.client.post(reverse('resume-duplicate', args=[self.resume.id]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Resume.objects.count(), 1)
+
+class QueryBudgetTests(QueryBudgetTestMixin, BaseAPITestCase):
+    """Test per-endpoint SQL query budgets"""
+    
+    def setUp(self):
+        """Setup a resume with several sections"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(self.user)
+        self.resume = Resume.objects.create(user=self.user, title='Budget Resume')
+        Style.objects.create(resume=self.resume)
+        self.sections = Section.objects.bulk_create([
+            Section(resume=self.resume, type='experience', content={'items': []}, order=i, rank=rank)
+            for i, rank in enumerate(spread_keys(5))
+        ])
+    
+    def test_resume_list_budget(self):
+        """Test listing resumes stays within budget"""
+        Resume.objects.create(user=self.user, title='Second Resume')
+        with self.assertQueryBudget('resume-list'):
+            self.client.get(reverse('resume-list'))
+    
+    def test_resume_detail_budget(self):
+        """Test nested sections and style don't add per-row queries"""
+        with self.assertQueryBudget('resume-detail') as query_profile:
+            response = self.client.get(reverse('resume-detail', args=[self.resume.id]))
+        self.assertEqual(len(response.data['sections']), 5)
+        self.assertGreater(query_profile.serializer_time, 0)
+    
+    def test_resume_update_budget(self):
+        """Test updating a resume doesn't reload nested data per row"""
+        with self.assertQueryBudget('resume-detail'):
+            response = self.client.patch(
+                reverse('resume-detail', args=[self.resume.id]), {'title': 'Renamed'}, format='json'
+            )
+        self.assertEqual(response.data['title'], 'Renamed')
+    
+    def test_resume_duplicate_budget(self):
+        """Test duplicating a resume stays within budget"""
+        with self.assertQueryBudget('resume-duplicate'):
+            self.client.post(reverse('resume-duplicate', args=[self.resume.id]))
+    
+    def test_section_create_budget(self):
+        """Test creating a section stays within budget"""
+        with self.assertQueryBudget('resume-sections'):
+            self.client.post(
+                reverse('resume-sections', args=[self.resume.id]), {'type': 'summary'}, format='json'
+            )
+    
+    def test_section_update_budget(self):
+        """Test the ownership check doesn't load the resume and user separately"""
+        with self.assertQueryBudget('section-detail'):
+            response = self.client.patch(
+                reverse('section-detail', args=[self.sections[0].id]),
+                {'content': {'items': [{'company': 'Acme'}]}},
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_public_resume_budget(self):
+        """Test the shared resume payload stays within budget"""
+        self.client.force_authenticate(None)
+        with self.assertQueryBudget('public-resume'):
+            self.client.get(reverse('public-resume', args=[self.resume.share_slug]))
+    
+    def test_duplicates_detected(self):
+        """Test an N+1 pattern is reported as a duplicated fingerprint"""
+        with profile() as query_profile:
+            for section in Section.objects.all():
+                section.resume.title
+        self.assertEqual(list(query_profile.duplicates().values()), [5])
+        violations = query_profile.budget_violations({'queries': 3, 'duplicates': 0})
+        self.assertEqual(len(violations), 2)
+    
+    def test_fingerprint_collapses_in_clause(self):
+        """Test IN lists of any length share one fingerprint"""
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            fingerprint('SELECT  *  FROM t WHERE id IN (%s)')
+        )
+    
+    def test_serializers_patched_only_when_enabled(self):
+        """Test DRF's serializers are left alone unless profiling is switched on"""
+        with mock.patch('api.query_profiler.install_serializer_timer') as install:
+            with profile():
+                pass
+            with self.assertRaises(MiddlewareNotUsed):
+                QueryProfilerMiddleware(lambda r: HttpResponse())
+            install.assert_not_called()
+            with override_settings(QUERY_PROFILER_ENABLED=True):
+                QueryProfilerMiddleware(lambda r: HttpResponse())
+            install.assert_called_once_with()
+    
+    def test_debug_headers(self):
+        """Test the middleware adds timing headers when enabled"""
+        with override_settings(QUERY_PROFILER_ENABLED=True, QUERY_PROFILER_HEADERS=True):
+            request = RequestFactory().get('/')
+            middleware = QueryProfilerMiddleware(lambda r: (User.objects.count(), HttpResponse())[1])
+            response = middleware(request)
+        self.assertEqual(response['X-Query-Count'], '1')
+        self.assertIn('X-Query-DB-Time-Ms', response)
+
+class JobQueueTests(BaseAPITestCase):
+    """Test the database-backed job queue"""
+    
+    def setUp(self):
+        """Register test handlers and authenticate"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(self.user)
+        self.calls = []
+        
+        def record(payload, job):
+            self.calls.append(payload['n'])
+            return {'doubled': payload['n'] * 2}
+        
+        def flaky(payload, job):
+            if job.attempts < payload['succeed_on']:
+                raise RuntimeError('temporary failure')
+            return 'ok'
+        
+        registry = mock.patch.dict(jobs._registry, {'test.record': record, 'test.flaky': flaky})
+        registry.start()
+        self.addCleanup(registry.stop)
+    
+    def test_enqueue_and_run(self):
+        """Test queued jobs run in order and store their result"""
+        first = jobs.enqueue('test.record', {'n': 1}, user=self.user)
+        jobs.enqueue('test.record', {'n': 2}, user=self.user)
+        self.assertEqual(jobs.run_pending(), 2)
+        self.assertEqual(self.calls, [1, 2])
+        first.refresh_from_db()
+        self.assertEqual(first.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(first.result, {'doubled': 2})
+        self.assertEqual(first.attempts, 1)
+    
+    def test_unknown_kind_rejected(self):
+        """Test enqueueing a job without a handler fails early"""
+        with self.assertRaises(ValueError):
+            jobs.enqueue('test.missing')
+    
+    def test_claim_is_exclusive(self):
+        """Test a claimed job is not handed to a second worker"""
+        jobs.enqueue('test.record', {'n': 1})
+        self.assertEqual(len(jobs.claim_jobs(5, worker='a')), 1)
+        self.assertEqual(jobs.claim_jobs(5, worker='b'), [])
+    
+    def test_future_jobs_not_claimed(self):
+        """Test jobs scheduled in the future wait until they are due"""
+        jobs.enqueue('test.record', {'n': 1}, run_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(jobs.run_pending(), 0)
+    
+    def test_retry_with_backoff(self):
+        """Test failures are retried later and then succeed"""
+        job = jobs.enqueue('test.flaky', {'succeed_on': 2}, max_attempts=3)
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('temporary failure', job.error)
+        self.assertGreater(job.run_at, job.created_at)
+        
+        Job.objects.filter(pk=job.pk).update(run_at=job.created_at)
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.attempts, 2)
+    
+    def test_fails_after_max_attempts(self):
+        """Test a job that keeps failing ends up failed"""
+        job = jobs.enqueue('test.flaky', {'succeed_on': 10}, max_attempts=1)
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIsNotNone(job.finished_at)
+    
+    def test_backoff_grows_and_caps(self):
+        """Test the retry delay doubles per attempt up to the cap"""
+        with override_settings(JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=100):
+            self.assertTrue(8 <= jobs.backoff_delay(1) <= 12)
+            self.assertTrue(32 <= jobs.backoff_delay(3) <= 48)
+            self.assertTrue(80 <= jobs.backoff_delay(10) <= 120)
+    
+    def test_requeue_stale(self):
+        """Test jobs orphaned by a dead worker are requeued and the lost run counts as an attempt"""
+        job = jobs.enqueue('test.record', {'n': 1})
+        jobs.claim_jobs(1)
+        self.assertEqual(jobs.requeue_stale(60), 0)
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(60), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_QUEUED, 1))
+        self.assertEqual(jobs.run_pending(), 1)
+    
+    def test_stale_job_fails_at_max_attempts(self):
+        """Test a job that keeps losing its worker is failed instead of requeued forever"""
+        job = jobs.enqueue('test.record', {'n': 1}, max_attempts=2)
+        for expected in (Job.STATUS_QUEUED, Job.STATUS_FAILED):
+            jobs.claim_jobs(1)
+            Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+            jobs.requeue_stale(60)
+            job.refresh_from_db()
+            self.assertEqual(job.status, expected)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.finished_at)
+        self.assertIn('heartbeats', job.error)
+        self.assertEqual(jobs.run_pending(), 0)
+    
+    def test_run_workers_once(self):
+        """Test the management command drains due jobs"""
+        for n in range(3):
+            jobs.enqueue('test.record', {'n': n})
+        out = StringIO()
+        call_command('run_workers', once=True, stdout=out)
+        self.assertIn('Processed 3 jobs', out.getvalue())
+        self.assertEqual(Job.objects.filter(status=Job.STATUS_SUCCEEDED).count(), 3)
+    
+    def test_status_endpoint(self):
+        """Test users can poll only their own jobs"""
+        mine = jobs.enqueue('test.record', {'n': 1}, user=self.user)
+        other = User.objects.create_user(username='other', password='testpassword123')
+        theirs = jobs.enqueue('test.record', {'n': 2}, user=other)
+        
+        response = self.client.get(reverse('job-detail', args=[mine.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], Job.STATUS_QUEUED)
+        
+        response = self.client.get(reverse('job-detail', args=[theirs.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        
+        jobs.run_pending()
+        response = self.client.get(reverse('job-list'), {'status': Job.STATUS_SUCCEEDED})
+        self.assertEqual(response.data['count'], 1)
+
+class SkillSearchTests(BaseAPITestCase):
+    """Test the skills autocomplete index and endpoint"""
+    
+    def setUp(self):
+        """Setup a user whose resume lists some skills"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(self.user)
+        resume = Resume.objects.create(user=self.user, title='Skills Resume')
+        Section.objects.create(resume=resume, type='skills', order=1, content={
+            'items': ['Pydantic', {'name': 'Python', 'category': 'programming'}, {'name': 'Pyramid', 'category': 'backend'}]
+        })
+        Section.objects.create(resume=resume, type='skills', order=2, content={'items': ['Pyramid']})
+        settings_override = override_settings(SKILLS_MIN_RESUMES=1)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_skill_index()
+        self.addCleanup(reset_skill_index)
+        self.url = reverse('skills-search')
+    
+    def names(self, response):
+        return [result['name'] for result in response.data['results']]
+    
+    def test_prefix_search(self):
+        """Test prefix matches come back case-insensitively"""
+        response = self.client.get(self.url, {'q': 'typ'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('TypeScript', self.names(response))
+    
+    def test_exact_match_first(self):
+        """Test an exact name beats longer prefix matches"""
+        response = self.client.get(self.url, {'q': 'java'})
+        self.assertEqual(self.names(response)[0], 'Java')
+        self.assertIn('JavaScript', self.names(response))
+    
+    def test_stored_skills_augment_and_rank(self):
+        """Test skills from stored sections are indexed and ranked by popularity"""
+        names = self.names(self.client.get(self.url, {'q': 'py'}))
+        self.assertIn('Pydantic', names)
+        # Pyramid appears in two sections, Python in one plus the catalog
+        self.assertLess(names.index('Pyramid'), names.index('Pydantic'))
+    
+    @override_settings(SKILLS_MIN_RESUMES=2)
+    def test_private_skills_not_suggested(self):
+        """Test a stored skill outside the catalog is only indexed once enough resumes list it"""
+        names = [entry['name'] for entry in build_index().search('py', limit=50)]
+        self.assertNotIn('Pydantic', names)
+        self.assertIn('Python', names)
+        
+        other = Resume.objects.create(user=User.objects.create_user(username='other'), title='Other')
+        Section.objects.create(resume=other, type='skills', order=1, content={'items': ['pydantic']})
+        names = [entry['name'] for entry in build_index().search('py', limit=50)]
+        self.assertIn('Pydantic', names)
+        self.assertNotIn('Pyramid', names)
+    
+    @override_settings(SKILLS_INDEX_TTL=0)
+    def test_expired_index_rebuilt_in_background(self):
+        """Test an expired index keeps serving while its replacement is built in another thread"""
+        old = get_skill_index()
+        new, release = SkillIndex([]), threading.Event()
+        
+        def slow_build():
+            release.wait(5)
+            return new
+        
+        with mock.patch('api.skills.build_index', side_effect=slow_build) as build:
+            self.assertIs(get_skill_index(), old)
+            self.assertIs(get_skill_index(), old)
+            release.set()
+            for thread in threading.enumerate():
+                if thread.name == 'skill-index':
+                    thread.join(5)
+        build.assert_called_once()
+        with override_settings(SKILLS_INDEX_TTL=600):
+            self.assertIs(get_skill_index(), new)
+    
+    def test_word_prefix(self):
+        """Test later words in a skill name are searchable"""
+        self.assertIn('Tailwind CSS', self.names(self.client.get(self.url, {'q': 'css'})))
+    
+    def test_fuzzy_match(self):
+        """Test a typo still finds the skill"""
+        self.assertIn('Python', self.names(self.client.get(self.url, {'q': 'pyhton'})))
+    
+    def test_category_filter(self):
+        """Test results can be limited to one category"""
+        response = self.client.get(self.url, {'q': 'py', 'category': 'backend'})
+        self.assertEqual(set(r['category'] for r in response.data['results']), {'backend'})
+    
+    def test_limit(self):
+        """Test the result count is capped"""
+        response = self.client.get(self.url, {'q': '', 'limit': 3})
+        self.assertEqual(len(response.data['results']), 3)
+    
+    def test_prefix_distance(self):
+        """Test fuzzy prefix distance against the closest prefix"""
+        self.assertEqual(prefix_distance('javscr', 'javascript', 1), 1)
+        self.assertIsNone(prefix_distance('rubyx', 'python', 1))
+    
+    def test_lookup_is_fast(self):
+        """Test a lookup against a large index stays well under a millisecond on average"""
+        index = SkillIndex((f'Skill {i:05d}', 'custom', i % 7) for i in range(50000))
+        start = time.perf_counter()
+        for _ in range(200):
+            index.search('skill 123', limit=10)
+        self.assertLess((time.perf_counter() - start) / 200, 0.001)
+
+class JobHeartbeatTests(TransactionTestCase):
+    """Test running jobs refresh their heartbeat from another thread"""
+    
+    @override_settings(JOB_HEARTBEAT_INTERVAL=0.05)
+    def test_long_job_not_stale(self):
+        """Test a job running past the stale timeout isn't requeued while its worker is alive"""
+        def slow(payload, job):
+            hour_ago = timezone.now() - timedelta(hours=1)
+            Job.objects.filter(pk=job.pk).update(started_at=hour_ago, heartbeat_at=hour_ago)
+            time.sleep(0.3)
+            return {'requeued': jobs.requeue_stale(60)}
+        
+        with mock.patch.dict(jobs._registry, {'test.slow': slow}):
+            job = jobs.enqueue('test.slow')
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, {'requeued': 0})
+
+class ResumeMatchTests(BaseAPITestCase):
+    """Test job description match scoring"""
+    
+    job_description = (
+        'We are hiring a backend engineer with Python, Django and PostgreSQL. '
+        'Experience with Docker and Kubernetes is a plus. Python testing with pytest.'
+    )
+    
+    def setUp(self):
+        """Setup a backend and a frontend resume"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(self.user)
+        term_cache.clear()
+        self.backend = Resume.objects.create(user=self.user, title='Backend')
+        Section.objects.create(resume=self.backend, type='skills', order=1, content={
+            'items': ['Python', 'Django', {'name': 'PostgreSQL', 'category': 'database'}]
+        })
+        Section.objects.create(resume=self.backend, type='experience', order=2, content={
+            'items': [{'title': 'Backend Developer', 'description': 'Built Django APIs in Python', 'start_date': '2020'}]
+        })
+        self.frontend = Resume.objects.create(user=self.user, title='Frontend')
+        Section.objects.create(resume=self.frontend, type='skills', order=1, content={
+            'items': ['React', 'TypeScript', 'Docker']
+        })
+        self.url = reverse('resume-match')
+    
+    def test_ranks_best_fit_first(self):
+        """Test the resume sharing the most weighted keywords ranks first"""
+        response = self.client.post(self.url, {'job_description': self.job_description}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([r['resume_id'] for r in results], [self.backend.id, self.frontend.id])
+        self.assertGreater(results[0]['coverage'], results[1]['coverage'])
+    
+    def test_missing_keywords(self):
+        """Test keywords absent from a resume are reported, most frequent first"""
+        response = self.client.post(self.url, {'job_description': self.job_description}, format='json')
+        backend = response.data['results'][0]
+        self.assertIn('kubernetes', backend['missing_keywords'])
+        self.assertNotIn('django', backend['missing_keywords'])
+        frontend = response.data['results'][1]
+        self.assertEqual(frontend['missing_keywords'][0], 'python')
+    
+    def test_only_own_resumes(self):
+        """Test other users' resumes are never scored"""
+        other = User.objects.create_user(username='other', password='testpassword123')
+        Resume.objects.create(user=other, title='Other')
+        response = self.client.post(self.url, {'job_description': self.job_description}, format='json')
+        self.assertEqual(len(response.data['results']), 2)
+    
+    def test_requires_job_description(self):
+        """Test a missing job description is rejected"""
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_tokenize(self):
+        """Test technology names survive tokenization and stopwords are dropped"""
+        self.assertEqual(tokenize('Experience with C++, C#, Node.js and R.'), ['c++', 'c#', 'node.js', 'r'])
+    
+    def test_terms_cached_until_section_changes(self):
+        """Test section vectors are reused and recomputed only after an edit"""
+        section = self.backend.sections.get(type='skills')
+        version = Resume.objects.get(pk=self.backend.pk).version
+        with mock.patch('api.matching.tokenize', wraps=tokenize) as tokenizer:
+            term_cache.terms(section.id, self.backend.id, version, section.content)
+            term_cache.terms(section.id, self.backend.id, version, section.content)
+            self.assertEqual(tokenizer.call_count, 1)
+            
+            section.content = {'items': ['Go']}
+            section.save()
+            version = Resume.objects.get(pk=self.backend.pk).version
+            self.assertEqual(term_cache.terms(section.id, self.backend.id, version, section.content), {'go': 1})
+            self.assertEqual(tokenizer.call_count, 2)
+    
+    def test_scoring_many_resumes_is_interactive(self):
+        """Test scoring 500 resumes with warm vectors stays interactive"""
+        words = ['python', 'django', 'react', 'docker', 'aws', 'sql', 'java', 'spring', 'kafka', 'go']
+        sections = []
+        for resume_id in range(500):
+            for order in range(6):
+                sections.append((resume_id * 10 + order, resume_id, {'items': [
+                    {'title': 'Engineer', 'description': ' '.join(words[(resume_id + order + k) % 10] for k in range(40))}
+                ]}))
+        resumes = {resume_id: (f'Resume {resume_id}', 1) for resume_id in range(500)}
+        match_resumes(self.job_description, sections, resumes)
+        start = time.perf_counter()
+        results = match_resumes(self.job_description, sections, resumes, limit=5)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(len(results), 5)
+
+class ResumeDiffTests(BaseAPITestCase):
+    """Test the structural resume diff"""
+    
+    def setUp(self):
+        """Setup two versions of a resume"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(self.user)
+        self.base = Resume.objects.create(user=self.user, title='Base')
+        Style.objects.create(resume=self.base)
+        Section.objects.create(resume=self.base, type='summary', order=1, content={'text': 'Backend developer'})
+        Section.objects.create(resume=self.base, type='experience', order=2, content={'items': [
+            {'title': 'Engineer', 'company': 'Acme', 'description': 'APIs'},
+            {'title': 'Intern', 'company': 'Initech', 'description': 'Tests'},
+        ]})
+        self.tailored = Resume.objects.create(user=self.user, title='Tailored')
+        Style.objects.create(resume=self.tailored, font_family='Georgia')
+        Section.objects.create(resume=self.tailored, type='summary', order=1, content={'text': 'Python developer'})
+        Section.objects.create(resume=self.tailored, type='experience', order=2, content={'items': [
+            {'title': 'Intern', 'company': 'Initech', 'description': 'Tests'},
+            {'title': 'Engineer', 'company': 'Acme', 'description': 'Django APIs'},
+            {'title': 'Lead', 'company': 'Globex', 'description': 'Team'},
+        ]})
+        Section.objects.create(resume=self.tailored, type='skills', order=3, content={'items': ['Python']})
+    
+    def test_diff_endpoint(self):
+        """Test the endpoint returns compact change operations"""
+        response = self.client.get(reverse('resume-diff', args=[self.base.id, self.tailored.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        changes = response.data['changes']
+        self.assertIn({'op': 'replace', 'path': 'resume/title', 'from': 'Base', 'value': 'Tailored'}, changes)
+        self.assertIn({'op': 'replace', 'path': 'style/font_family', 'from': 'Inter', 'value': 'Georgia'}, changes)
+        self.assertIn(
+            {'op': 'replace', 'path': 'sections/summary/0/text', 'from': 'Backend developer', 'value': 'Python developer'},
+            changes
+        )
+        self.assertIn({'op': 'add', 'path': 'sections/skills/0', 'value': {'items': ['Python']}}, changes)
+        self.assertIn(
+            {'op': 'replace', 'path': 'sections/experience/0/items/1/description', 'from': 'APIs', 'value': 'Django APIs'},
+            changes
+        )
+        self.assertIn({'op': 'add', 'path': 'sections/experience/0/items/2',
+                       'value': {'title': 'Lead', 'company': 'Globex', 'description': 'Team'}}, changes)
+        self.assertEqual(len([c for c in changes if c['op'] == 'move']), 1)
+    
+    def test_unknown_ids_not_found(self):
+        """Test a non-numeric or missing id is a 404, not a server error"""
+        url = reverse('resume-diff', args=[self.base.id, self.tailored.id])
+        for path in (url.replace(f'/{self.base.id}/', '/abc/', 1), reverse('resume-diff', args=[self.base.id, 999999])):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, path)
+    
+    def test_identical_resumes(self):
+        """Test a resume diffed against itself has no changes"""
+        response = self.client.get(reverse('resume-diff', args=[self.base.id, self.base.id]))
+        self.assertEqual(response.data['changes'], [])
+    
+    def test_other_users_resume(self):
+        """Test resumes owned by someone else can't be diffed"""
+        other = User.objects.create_user(username='other', password='testpassword123')
+        foreign = Resume.objects.create(user=other, title='Foreign')
+        response = self.client.get(reverse('resume-diff', args=[self.base.id, foreign.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_duplicate_keys_pair_in_order(self):
+        """Test repeated items are matched occurrence by occurrence"""
+        ops = []
+        diff_items(['Python', 'Python', 'Go'], ['Python', 'Go'], 'items', (), ops)
+        self.assertEqual(ops, [{'op': 'remove', 'path': 'items/1'}])
+    
+    def test_single_move_is_one_op(self):
+        """Test moving one item to the front yields one move, not a shifted list"""
+        ops = []
+        old = [{'title': str(i)} for i in range(100)]
+        new = [old[-1]] + old[:-1]
+        diff_items(old, new, 'items', ('title',), ops)
+        self.assertEqual(ops, [{'op': 'move', 'from': 'items/99', 'path': 'items/0'}])
+    
+    def test_lis(self):
+        """Test the longest increasing subsequence positions"""
+        self.assertEqual(longest_increasing_subsequence([3, 0, 1, 4, 2]), {1, 2, 4})
+        self.assertEqual(longest_increasing_subsequence([]), set())
+    
+    def test_large_arrays_scale_linearly(self):
+        """Test diffing large arrays stays fast"""
+        old = {'sections': [{'type': 'experience', 'order': 1, 'content': {'items': [
+            {'title': f'Engineer {i}', 'company': f'Company {i}'} for i in range(20000)
+        ]}}]}
+        new_items = list(old['sections'][0]['content']['items'])
+        new_items.insert(0, new_items.pop())
+        new_items[500] = dict(new_items[500], company='Changed')
+        new = {'sections': [{'type': 'experience', 'order': 1, 'content': {'items': new_items}}]}
+        start = time.perf_counter()
+        ops = diff_resumes(old, new)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(len(ops), 3)
+    
+    def test_bench_diff_command(self):
+        """Test the diff benchmark runs"""
+        out = StringIO()
+        call_command('bench_diff', items=[50], repeat=1, stdout=out)
+        self.assertIn('50', out.getvalue())
+
+class CollaborativeEditingTests(TransactionTestCase):
+    """Test the WebSocket editing channel"""
+    
+    def setUp(self):
+        """Setup a resume with one section and a token for its owner"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.resume = Resume.objects.create(user=self.user, title='Live Resume')
+        self.section = Section.objects.create(resume=self.resume, type='summary', content={'text': ''}, order=1)
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.application = URLRouter(websocket_urlpatterns)
+    
+    async def connect(self, token=None, resume_id=None):
+        communicator = WebsocketCommunicator(self.application, f'/ws/resumes/{resume_id or self.resume.id}/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.send_json_to({'type': 'auth', 'token': token or self.token})
+        return communicator
+    
+    def test_batch_applied_and_broadcast(self):
+        """Test a batch is acknowledged to the sender and broadcast to other sessions"""
+        base_version = Resume.objects.get(pk=self.resume.pk).version
+        
+        async def scenario():
+            editor, viewer = await self.connect(), await self.connect()
+            self.assertEqual((await editor.receive_json_from())['type'], 'ready')
+            self.assertEqual((await viewer.receive_json_from())['version'], base_version)
+            
+            await editor.send_json_to({'type': 'ops', 'client_seq': 1, 'ops': [
+                {'op': 'update', 'section_id': self.section.id, 'content': {'text': 'Hello'}},
+                {'op': 'create', 'client_id': 'tmp-1', 'type': 'skills', 'content': {'items': ['Python']}},
+            ]})
+            ack = await editor.receive_json_from()
+            self.assertEqual(ack['type'], 'ack')
+            self.assertEqual(ack['client_seq'], 1)
+            self.assertEqual(ack['version'], base_version + 2)
+            self.assertEqual(ack['ops'][1]['section']['order'], 1)
+            
+            broadcast = await viewer.receive_json_from()
+            self.assertEqual(broadcast['type'], 'ops')
+            self.assertEqual(broadcast['version'], base_version + 2)
+            self.assertEqual(broadcast['ops'][0]['section']['content'], {'text': 'Hello'})
+            self.assertTrue(await editor.receive_nothing())
+            await editor.disconnect()
+            await viewer.disconnect()
+        
+        async_to_sync(scenario)()
+        self.section.refresh_from_db()
+        self.assertEqual(self.section.content, {'text': 'Hello'})
+        self.assertEqual(Section.objects.filter(resume=self.resume).count(), 2)
+    
+    def test_invalid_batch_rolled_back(self):
+        """Test one bad op rejects the whole batch"""
+        base_version = Resume.objects.get(pk=self.resume.pk).version
+        
+        async def scenario():
+            editor = await self.connect()
+            await editor.receive_json_from()
+            await editor.send_json_to({'type': 'ops', 'client_seq': 7, 'ops': [
+                {'op': 'update', 'section_id': self.section.id, 'content': {'text': 'Lost'}},
+                {'op': 'create', 'type': 'not-a-type'},
+            ]})
+            error = await editor.receive_json_from()
+            self.assertEqual(error['type'], 'error')
+            self.assertEqual(error['index'], 1)
+            await editor.disconnect()
+        
+        async_to_sync(scenario)()
+        self.section.refresh_from_db()
+        self.assertEqual(self.section.content, {'text': ''})
+        self.resume.refresh_from_db()
+        self.assertEqual(self.resume.version, base_version)
+    
+    def test_section_ids_validated(self):
+        """Test malformed section ids reject their op instead of reaching the query"""
+        for section_id in ([self.section.id], {'id': 1}, True, 'abc', 1.5, 2 ** 70, None):
+            with self.assertRaises(OpError) as raised:
+                apply_section_ops(self.resume.id, self.user, [
+                    {'op': 'create', 'type': 'skills'},
+                    {'op': 'update', 'section_id': section_id, 'content': {'text': 'Lost'}},
+                ])
+            self.assertEqual((raised.exception.index, raised.exception.errors), (1, 'section_id must be a section id'))
+        self.assertEqual(Section.objects.filter(resume=self.resume).count(), 1)
+        
+        # Ids sent as strings are still accepted
+        apply_section_ops(self.resume.id, self.user, [
+            {'op': 'update', 'section_id': str(self.section.id), 'content': {'text': 'Saved'}},
+        ])
+        self.section.refresh_from_db()
+        self.assertEqual(self.section.content, {'text': 'Saved'})
+    
+    def test_invalid_token_closes(self):
+        """Test a bad JWT closes the socket"""
+        async def scenario():
+            communicator = await self.connect(token='not-a-token')
+            output = await communicator.receive_output()
+            self.assertEqual(output, {'type': 'websocket.close', 'code': 4401})
+        async_to_sync(scenario)()
+    
+    def test_other_users_resume_forbidden(self):
+        """Test a valid user can't join someone else's resume"""
+        other = User.objects.create_user(username='other', password='testpassword123')
+        token = str(RefreshToken.for_user(other).access_token)
+        async def scenario():
+            communicator = await self.connect(token=token)
+            output = await communicator.receive_output()
+            self.assertEqual(output, {'type': 'websocket.close', 'code': 4403})
+        async_to_sync(scenario)()
+    
+    def test_joining_restores_archived_resume(self):
+        """Test an archived resume's sections are restored when an editing session joins it"""
+        Resume.objects.filter(pk=self.resume.pk).update(updated_at=timezone.now() - timedelta(days=400))
+        archive_resumes([self.resume.id])
+        self.assertTrue(Resume.objects.get(pk=self.resume.pk).is_archived)
+        async def scenario():
+            communicator = await self.connect()
+            self.assertEqual((await communicator.receive_json_from())['type'], 'ready')
+            await communicator.disconnect()
+        async_to_sync(scenario)()
+        self.assertFalse(Resume.objects.get(pk=self.resume.pk).is_archived)
+        self.assertTrue(Section.objects.filter(pk=self.section.pk).exists())
+    
+    def test_socket_closes_when_token_expires(self):
+        """Test a session ends when its token expires unless a fresh token extends it"""
+        short = AccessToken.for_user(self.user)
+        short.set_exp(lifetime=timedelta(seconds=1))
+        async def scenario():
+            expiring, extended = await self.connect(token=str(short)), await self.connect(token=str(short))
+            self.assertEqual((await expiring.receive_json_from())['type'], 'ready')
+            self.assertEqual((await extended.receive_json_from())['type'], 'ready')
+            await extended.send_json_to({'type': 'auth', 'token': self.token})
+            self.assertEqual((await extended.receive_json_from())['type'], 'authenticated')
+            
+            output = await expiring.receive_output(timeout=3)
+            self.assertEqual(output, {'type': 'websocket.close', 'code': 4401})
+            self.assertTrue(await extended.receive_nothing(timeout=0.5))
+            await extended.disconnect()
+        async_to_sync(scenario)()
+
+
+@override_settings(CHANGE_FEED_MAX_DURATION=0)
+class ChangeFeedTests(BaseAPITestCase):
+    """Test the server-sent change feed"""
+    
+    def setUp(self):
+        """Setup a resume with a section and style"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.resume = Resume.objects.create(user=self.user, title='Synced Resume')
+            Style.objects.create(resume=self.resume)
+            self.section = Section.objects.create(resume=self.resume, type='summary', content={'text': ''}, order=1)
+    
+    async def open_stream(self, last_event_id=None):
+        """GET the feed through the ASGI handler, which is the only one serving it"""
+        headers = {'Accept': 'text/event-stream', 'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        if last_event_id is not None:
+            headers['Last-Event-ID'] = str(last_event_id)
+        response = await self.async_client.get(reverse('change-stream'), headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response
+    
+    def read_events(self, last_event_id=None):
+        async def read():
+            response = await self.open_stream(last_event_id)
+            return b''.join([chunk async for chunk in response.streaming_content]).decode()
+        body = async_to_sync(read)()
+        events = []
+        for block in body.strip().split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+            if 'event' in fields:
+                events.append(fields)
+        return events
+    
+    def test_writes_recorded_with_versions(self):
+        """Test section, style and resume writes bump the version and record a change"""
+        writes = [
+            (reverse('section-detail', kwargs={'pk': self.section.id}), {'content': {'text': 'Hi'}}),
+            (reverse('style-detail', kwargs={'pk': self.resume.style.id}), {'font_size': 12}),
+            (reverse('resume-detail', kwargs={'pk': self.resume.id}), {'title': 'Renamed'}),
+        ]
+        for url, data in writes:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        changes = list(ResumeChange.objects.values_list('kind', 'action', 'section_id', 'version'))
+        self.assertEqual(changes, [
+            ('resume', 'created', None, 0),
+            ('section', 'created', self.section.id, 1),
+            ('section', 'updated', self.section.id, 2),
+            ('style', 'updated', None, 3),
+            ('resume', 'updated', None, 4),
+        ])
+    
+    def test_rolled_back_write_not_announced(self):
+        """Test changes are only recorded once their transaction commits"""
+        count = ResumeChange.objects.count()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.section.content = {'text': 'Discarded'}
+                    self.section.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(ResumeChange.objects.count(), count)
+    
+    def test_resume_delete_is_one_change(self):
+        """Test deleting a resume doesn't announce each cascaded section"""
+        resume_id = self.resume.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('resume-detail', kwargs={'pk': resume_id}))
+        latest = ResumeChange.objects.latest('id')
+        self.assertEqual((latest.kind, latest.action, latest.resume_id), ('resume', 'deleted', resume_id))
+        self.assertFalse(ResumeChange.objects.filter(kind='section', action='deleted').exists())
+    
+    def test_stream_resumes_from_last_event_id(self):
+        """Test the stream replays changes after Last-Event-ID"""
+        first = ResumeChange.objects.earliest('id')
+        events = self.read_events(first.id)
+        self.assertEqual([event['event'] for event in events], ['change'])
+        data = json.loads(events[0]['data'])
+        self.assertEqual(data, {
+            'kind': 'section', 'action': 'created', 'resume_id': self.resume.id,
+            'section_id': self.section.id, 'version': 1,
+        })
+        self.assertEqual(events[0]['id'], str(ResumeChange.objects.latest('id').id))
+    
+    def test_stream_starts_at_latest_change(self):
+        """Test a fresh connection skips history and a pruned Last-Event-ID asks for a reset"""
+        self.assertEqual(self.read_events(), [])
+        self.assertEqual([event['event'] for event in self.read_events(999999)], ['reset'])
+    
+    def test_stream_only_includes_own_changes(self):
+        """Test another user's changes are not streamed"""
+        first = ResumeChange.objects.earliest('id')
+        other = User.objects.create_user(username='other', password='testpassword123')
+        with self.captureOnCommitCallbacks(execute=True):
+            Resume.objects.create(user=other, title='Other Resume')
+        self.assertEqual(len(self.read_events(first.id)), 1)
+    
+    def test_stream_accepts_query_token(self):
+        """Test EventSource clients can authenticate with ?access_token="""
+        self.client.force_authenticate(user=None)
+        url = reverse('change-stream')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        token = str(RefreshToken.for_user(self.user).access_token)
+        async def read():
+            response = await self.async_client.get(url, {'access_token': token})
+            [chunk async for chunk in response.streaming_content]
+            return response
+        response = async_to_sync(read)()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Content-Encoding', response)
+    
+    def test_stream_needs_asgi(self):
+        """Test WSGI requests are refused instead of holding a worker for the whole stream"""
+        response = self.client.get(reverse('change-stream'))
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    @override_settings(CHANGE_FEED_MAX_DURATION=300, CHANGE_FEED_POLL_INTERVAL=0.05)
+    def test_events_sent_before_stream_ends(self):
+        """Test each event reaches the client while the stream is still open"""
+        first = ResumeChange.objects.earliest('id')
+        async def read():
+            response = await self.open_stream(first.id)
+            chunks = aiter(response.streaming_content)
+            started = time.monotonic()
+            retry, event = await anext(chunks), await anext(chunks)
+            elapsed = time.monotonic() - started
+            await chunks.aclose()
+            return retry, event, elapsed
+        retry, event, elapsed = async_to_sync(read)()
+        self.assertTrue(retry.startswith(b'retry:'))
+        self.assertIn(b'event: change', event)
+        self.assertLess(elapsed, 5)
+    
+    def test_heartbeats_while_idle(self):
+        """Test idle streams send heartbeat comments and end at the max duration"""
+        now = [0.0]
+        async def sleep(seconds):
+            now[0] += seconds
+        async def read():
+            return [chunk async for chunk in change_stream(self.user.id, clock=lambda: now[0], sleep=sleep)]
+        with override_settings(CHANGE_FEED_MAX_DURATION=40, CHANGE_FEED_HEARTBEAT=15, CHANGE_FEED_POLL_INTERVAL=5):
+            chunks = async_to_sync(read)()
+        self.assertEqual(chunks.count(': heartbeat\n\n'), 2)
+        self.assertEqual(now[0], 40)
+    
+    def test_prune_changes(self):
+        """Test old notifications are pruned"""
+        ResumeChange.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(prune_changes(retention=86400), 2)
+        self.assertFalse(ResumeChange.objects.exists())
+
+
+def add_database(alias, name):
+    """Register an extra SQLite database alias at runtime"""
+    connections.settings[alias] = connections.configure_settings({
+        'default': connections.settings['default'],
+        alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name},
+    })[alias]
+
+def remove_database(alias):
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(APITransactionTestCase):
+    """Test read replica routing against a second SQLite database"""
+    
+    # Resolved after setUpClass registers the replica alias
+    databases = '__all__'
+    
+    @classmethod
+    def setUpClass(cls):
+        """Create an empty replica database with the resume tables"""
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        add_database('replica', os.path.join(cls.replica_dir.name, 'replica.sqlite3'))
+        super().setUpClass()
+        with connections['replica'].schema_editor() as editor:
+            for model in (User, Resume, Style, Section):
+                editor.create_model(model)
+    
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        remove_database('replica')
+        cls.replica_dir.cleanup()
+    
+    def setUp(self):
+        """Setup a user whose resume only exists on the primary"""
+        cache.clear()
+        reset_unavailable()
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.resume = Resume.objects.create(user=self.user, title='Primary Only')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('resume-detail', kwargs={'pk': self.resume.id})
+    
+    def test_reads_go_to_replica(self):
+        """Test request reads use the replica, which hasn't seen the resume"""
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_reads_stick_to_primary_after_write(self):
+        """Test a client that just wrote reads its own writes from the primary"""
+        response = self.client.patch(self.url, {'title': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'Renamed')
+        
+        with override_settings(DB_REPLICA_STICKY_SECONDS=0):
+            cache.clear()
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_unavailable_replica_falls_back_to_primary(self):
+        """Test reads fall back to the primary when the replica can't be reached"""
+        replica = connections['replica']
+        replica.close()
+        failure = OperationalError('unable to open database file')
+        with self.assertLogs('api.db_router', level='WARNING'), \
+                mock.patch.object(replica, 'ensure_connection', side_effect=failure):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ReplicaRouter().db_for_read(Resume), 'default')
+    
+    def test_failed_replica_query_retried_on_primary(self):
+        """Test only a replica query failing after the connection opened is run again, on the primary"""
+        replica = connections['replica']
+        User.objects.using('replica').create(pk=self.user.pk, username=self.user.username)
+        Resume.objects.using('replica').create(pk=self.resume.pk, user_id=self.user.pk, title='Replica Copy')
+        # The resume loads from the replica, then its sections fail
+        with replica.schema_editor() as editor:
+            editor.delete_model(Section)
+        
+        def restore_table():
+            with replica.schema_editor() as editor:
+                editor.create_model(Section)
+        self.addCleanup(restore_table)
+        
+        Section.objects.create(resume=self.resume, type='summary', content={'text': 'From the primary'}, order=1)
+        
+        with self.assertLogs('api.db_router', level='WARNING'), \
+                mock.patch('api.views.ResumeViewSet.retrieve', autospec=True, side_effect=ResumeViewSet.retrieve) as retrieve, \
+                CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'Replica Copy')
+        self.assertEqual([s['content'] for s in response.data['sections']], [{'text': 'From the primary'}])
+        retrieve.assert_called_once()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(ReplicaRouter().db_for_read(Resume), 'default')
+    
+    def test_streamed_import_pins_client_once_written(self):
+        """Test resumes imported while the response streams are read back from the primary"""
+        response = self.client.generic(
+            'POST', reverse('resume-json-resumes'), json.dumps({'basics': {'name': 'Bo'}}).encode(),
+            content_type='application/x-ndjson',
+        )
+        # The pin set when the response was returned has expired by the time a long import ends
+        cache.clear()
+        [result] = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        response = self.client.get(reverse('resume-detail', kwargs={'pk': result['id']}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_reads_outside_requests_use_primary(self):
+        """Test management commands and workers never read from a replica"""
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Resume), 'default')
+        self.assertEqual(router.db_for_write(Resume), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'api'))
+    
+    def test_sticky_key_uses_token_user(self):
+        """Test stickiness follows the token's user rather than the client IP"""
+        token = str(RefreshToken.for_user(self.user).access_token)
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(sticky_key(request), f'user:{self.user.id}')
+        self.assertEqual(sticky_key(RequestFactory().get('/')), 'ip:127.0.0.1')
+
+
+class ArchiveTests(BaseAPITestCase):
+    """Test cold storage of idle resumes"""
+    
+    def setUp(self):
+        """Setup an idle resume with sections and an active one"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.idle = Resume.objects.create(user=self.user, title='Old Resume')
+        Style.objects.create(resume=self.idle)
+        self.sections = [
+            Section.objects.create(resume=self.idle, type='summary', content={'text': 'Django developer'}, order=1),
+            Section.objects.create(resume=self.idle, type='skills', content={'items': ['Python', 'Django']}, order=2),
+        ]
+        self.active = Resume.objects.create(user=self.user, title='Current Resume')
+        Section.objects.create(resume=self.active, type='summary', content={'text': 'Current'}, order=1)
+        Resume.objects.filter(pk=self.idle.pk).update(updated_at=timezone.now() - timedelta(days=400))
+    
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_resumes', *args, stdout=out)
+        return out.getvalue()
+    
+    def test_archive_moves_idle_sections(self):
+        """Test idle resumes' sections move into one compressed row without announcing changes"""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            output = self.archive()
+        self.assertIn('Archived 1 resumes (2 sections)', output)
+        self.assertEqual(callbacks, [])
+        
+        self.assertFalse(Section.objects.filter(resume=self.idle).exists())
+        self.assertEqual(Section.objects.filter(resume=self.active).count(), 1)
+        archive = ResumeArchive.objects.get(resume=self.idle)
+        self.assertEqual(archive.section_count, 2)
+        self.assertEqual([row['id'] for row in decode_sections(archive.data)], [s.id for s in self.sections])
+        self.assertTrue(Resume.objects.get(pk=self.idle.pk).is_archived)
+    
+    def test_restore_reranks_on_rank_collision(self):
+        """Test a section that took an archived section's rank doesn't make the resume unreadable"""
+        for section, rank in zip(self.sections, spread_keys(2)):
+            Section.objects.filter(pk=section.pk).update(rank=rank)
+        self.archive()
+        archived_rank = decode_sections(ResumeArchive.objects.get(resume=self.idle).data)[0]['rank']
+        Section.objects.bulk_create([Section(resume=self.idle, type='custom', content={}, order=1, rank=archived_rank)])
+        
+        response = self.client.get(reverse('resume-detail', kwargs={'pk': self.idle.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([s['type'] for s in response.data['sections']], ['summary', 'skills', 'custom'])
+        ranks = list(Section.objects.filter(resume=self.idle).values_list('rank', flat=True))
+        self.assertEqual(len(set(ranks) - {''}), 3)
+    
+    def test_collaborative_ops_restore_first(self):
+        """Test a collaborative batch on an archived resume ranks new sections against the archived ones"""
+        self.archive()
+        apply_section_ops(self.idle.id, self.user, [{'op': 'create', 'type': 'custom', 'content': {'title': 'New'}}])
+        self.assertFalse(Resume.objects.get(pk=self.idle.pk).is_archived)
+        response = self.client.get(reverse('resume-detail', kwargs={'pk': self.idle.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([s['type'] for s in response.data['sections']], ['summary', 'skills', 'custom'])
+    
+    def test_retrieve_restores_sections(self):
+        """Test reading an archived resume restores its sections with their ids"""
+        self.archive()
+        response = self.client.get(reverse('resume-detail', kwargs={'pk': self.idle.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([s['id'] for s in response.data['sections']], [s.id for s in self.sections])
+        self.assertEqual(response.data['sections'][1]['content'], {'items': ['Python', 'Django']})
+        self.assertFalse(ResumeArchive.objects.exists())
+        
+        # Recently restored resumes aren't archived again straight away
+        self.assertIn('Archived 0 resumes', self.archive())
+        response = self.client.get(reverse('section-detail', kwargs={'pk': self.sections[0].id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_nested_section_list_restores(self):
+        """Test listing an archived resume's sections restores them"""
+        self.archive()
+        response = self.client.get(reverse('resume-sections', kwargs={'resume_pk': self.idle.id}))
+        self.assertEqual(response.data['count'], 2)
+        self.assertFalse(Resume.objects.get(pk=self.idle.pk).is_archived)
+    
+    def test_section_detail_restores(self):
+        """Test reading or editing an archived resume's section by id restores the resume first"""
+        self.archive()
+        url = reverse('section-detail', kwargs={'pk': self.sections[1].id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['order'], 1)
+        self.assertFalse(Resume.objects.get(pk=self.idle.pk).is_archived)
+        
+        Resume.objects.filter(pk=self.idle.pk).update(updated_at=timezone.now() - timedelta(days=400), restored_at=None)
+        self.archive()
+        self.assertTrue(Resume.objects.get(pk=self.idle.pk).is_archived)
+        response = self.client.patch(url, {'content': {'items': ['Python']}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Section.objects.get(pk=self.sections[1].id).content, {'items': ['Python']})
+        
+        # Other users' archived sections stay hidden
+        other = User.objects.create_user(username='other', password='testpassword123')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(reverse('section-detail', kwargs={'pk': self.sections[0].id})).status_code,
+                         status.HTTP_404_NOT_FOUND)
+    
+    def test_match_reads_archive_without_restoring(self):
+        """Test matching scores archived resumes straight from their archive"""
+        self.archive()
+        response = self.client.post(reverse('resume-match'), {'job_description': 'Django developer'}, format='json')
+        self.assertEqual(response.data['results'][0]['resume_id'], self.idle.id)
+        self.assertTrue(Resume.objects.get(pk=self.idle.pk).is_archived)
+    
+    def test_batches_are_resumable(self):
+        """Test a limited run reports its last id and a later run continues after it"""
+        extra = [Resume.objects.create(user=self.user, title=f'Old {i}') for i in range(2)]
+        Resume.objects.filter(pk__in=[r.pk for r in extra]).update(updated_at=timezone.now() - timedelta(days=400))
+        
+        batches = list(archive_idle_resumes(batch_size=1, limit=2))
+        self.assertEqual(batches, [(self.idle.id, 1, 2), (extra[0].id, 1, 0)])
+        output = self.archive('--after-id', str(extra[0].id))
+        self.assertIn(f'up to id {extra[1].id}', output)
+        self.assertEqual(Resume.objects.filter(is_archived=True).count(), 3)
+
+
+class TrashTests(BaseAPITestCase):
+    """Test bulk delete, the trash and the purge job"""
+    
+    def setUp(self):
+        """Setup three resumes with sections"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.resumes = []
+        for i in range(3):
+            resume = Resume.objects.create(user=self.user, title=f'Resume {i}')
+            Style.objects.create(resume=resume)
+            Section.objects.create(resume=resume, type='summary', content={'text': f'Summary {i}'}, order=1)
+            self.resumes.append(resume)
+        self.ids = [resume.id for resume in self.resumes[:2]]
+    
+    def test_bulk_delete_hides_resumes(self):
+        """Test bulk delete trashes with one UPDATE and hides resumes and their sections"""
+        other = User.objects.create_user(username='other', password='testpassword123')
+        foreign = Resume.objects.create(user=other, title='Not Mine')
+        url = reverse('resume-bulk-delete')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'ids': self.ids + [foreign.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(response.data['deleted']), self.ids)
+        self.assertEqual(sum(q['sql'].startswith('UPDATE') for q in queries.captured_queries), 1)
+        
+        self.assertEqual(list(Resume.objects.filter(user=self.user)), [self.resumes[2]])
+        self.assertEqual(Resume.all_objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Section.objects.filter(resume_id__in=self.ids).count(), 2)
+        self.assertEqual(self.client.get(reverse('resume-detail', kwargs={'pk': self.ids[0]})).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        section = Section.objects.get(resume_id=self.ids[0])
+        self.assertEqual(self.client.get(reverse('section-detail', kwargs={'pk': section.id})).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Resume.objects.get(pk=foreign.pk).deleted_at, None)
+    
+    def test_destroy_moves_to_trash(self):
+        """Test DELETE on one resume goes through the trash"""
+        response = self.client.delete(reverse('resume-detail', kwargs={'pk': self.ids[0]}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(Resume.all_objects.filter(pk=self.ids[0], deleted_at__isnull=False).exists())
+        self.assertEqual(Job.objects.get().kind, PURGE_JOB)
+    
+    def test_restore_within_window(self):
+        """Test trashed resumes can be listed and restored until the window closes"""
+        self.client.post(reverse('resume-bulk-delete'), {'ids': self.ids}, format='json')
+        response = self.client.get(reverse('resume-trash'))
+        self.assertEqual(response.data['count'], 2)
+        self.assertIn('purge_at', response.data['results'][0])
+        
+        Resume.all_objects.filter(pk=self.ids[1]).update(deleted_at=timezone.now() - timedelta(days=31))
+        response = self.client.post(reverse('resume-restore'), {'ids': self.ids}, format='json')
+        self.assertEqual(response.data['restored'], [self.ids[0]])
+        self.assertTrue(Resume.objects.filter(pk=self.ids[0]).exists())
+        self.assertFalse(Resume.objects.filter(pk=self.ids[1]).exists())
+    
+    def test_purge_job_deletes_expired_in_chunks(self):
+        """Test the purge job hard-deletes only expired trash, skipping restored resumes"""
+        self.client.post(reverse('resume-bulk-delete'), {'ids': self.ids}, format='json')
+        job = Job.objects.get(kind=PURGE_JOB)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(days=29))
+        
+        self.client.post(reverse('resume-restore'), {'ids': [self.ids[1]]}, format='json')
+        Resume.all_objects.filter(pk__in=self.ids).update(deleted_at=timezone.now() - timedelta(days=31))
+        Resume.all_objects.filter(pk=self.ids[1]).update(deleted_at=None)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.result, {'purged': 1})
+        self.assertFalse(Resume.all_objects.filter(pk=self.ids[0]).exists())
+        self.assertFalse(Section.objects.filter(resume_id=self.ids[0]).exists())
+        self.assertTrue(Resume.objects.filter(pk=self.ids[1]).exists())
+    
+    def test_purge_batches(self):
+        """Test purging without ids deletes every expired resume batch by batch"""
+        Resume.all_objects.update(deleted_at=timezone.now() - timedelta(days=31))
+        self.assertEqual(purge_trash(batch_size=2), 3)
+        self.assertFalse(Resume.all_objects.exists())
+    
+    def test_bulk_delete_validates_ids(self):
+        """Test bulk operations require a non-empty list of ids"""
+        response = self.client.post(reverse('resume-bulk-delete'), {'ids': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SparseFieldsetTests(BaseAPITestCase):
+    """Test ?fields= and ?include= on resume reads"""
+    
+    def setUp(self):
+        """Setup a shared resume with several sections"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.resume = Resume.objects.create(user=self.user, title='Sparse Resume')
+        Style.objects.create(resume=self.resume)
+        for order, section_type in enumerate(('contact', 'summary', 'experience'), 1):
+            Section.objects.create(resume=self.resume, type=section_type, content={'text': section_type}, order=order)
+        self.url = reverse('resume-detail', kwargs={'pk': self.resume.id})
+    
+    def test_fields_limit_columns_and_skip_relations(self):
+        """Test ?fields= returns only those fields and never loads sections or style"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,title'})
+        self.assertEqual(response.data, {'id': self.resume.id, 'title': 'Sparse Resume'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('template_name', queries[0]['sql'])
+        self.assertNotIn('api_style', queries[0]['sql'])
+    
+    def test_include_filters_sections(self):
+        """Test include=sections[type=...] loads only those section types"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'include': 'sections[type=contact,summary]'})
+        self.assertEqual([s['type'] for s in response.data['sections']], ['contact', 'summary'])
+        self.assertIn('style', response.data)
+        self.assertTrue(any("IN ('contact', 'summary')" in query['sql'] for query in queries))
+        
+        # Positions still count the sections left out
+        response = self.client.get(self.url, {'include': 'sections[type=experience]'})
+        self.assertEqual([s['order'] for s in response.data['sections']], [2])
+    
+    def test_list_with_included_sections(self):
+        """Test the list can carry one section type per resume for card previews"""
+        response = self.client.get(reverse('resume-list'), {'fields': 'id,title', 'include': 'sections[type=contact]'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.data['results'][0]
+        self.assertEqual(set(result), {'id', 'title', 'sections'})
+        self.assertEqual([s['type'] for s in result['sections']], ['contact'])
+        
+        response = self.client.get(reverse('resume-list'))
+        self.assertNotIn('sections', response.data['results'][0])
+    
+    def test_public_resume_fieldset(self):
+        """Test the public page supports the same selection"""
+        url = reverse('public-resume', kwargs={'share_slug': self.resume.share_slug})
+        response = self.client.get(url, {'fields': 'title', 'include': 'sections[type=summary]'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {'title', 'sections'})
+        self.assertEqual(len(response.data['sections']), 1)
+    
+    def test_archived_resume_respects_filter(self):
+        """Test a restored archived resume still gets filtered sections"""
+        Resume.objects.filter(pk=self.resume.pk).update(updated_at=timezone.now() - timedelta(days=400))
+        list(archive_idle_resumes())
+        response = self.client.get(self.url, {'include': 'sections[type=experience]'})
+        self.assertEqual([s['type'] for s in response.data['sections']], ['experience'])
+    
+    def test_invalid_selection(self):
+        """Test unknown fields, relations, filters and section types are rejected"""
+        for params in ({'fields': 'id,secret'}, {'include': 'sections[type=bogus]'},
+                       {'include': 'sections[order=1]'}, {'include': 'owner'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+    
+    def test_parse_include(self):
+        """Test include parsing keeps commas inside brackets with their filter"""
+        self.assertEqual(parse_include('sections[type=contact,summary],style'), {
+            'sections': ('type', ['contact', 'summary']), 'style': None,
+        })
+
+class SectionRankTests(BaseAPITestCase):
+    """Test rank-based section ordering"""
+    
+    def setUp(self):
+        """Setup a resume with four ranked sections"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.resume = Resume.objects.create(user=self.user, title='Ranked Resume')
+        self.url = reverse('resume-sections', kwargs={'resume_pk': self.resume.pk})
+        self.sections = [
+            self.client.post(self.url, {'type': section_type}, format='json').data
+            for section_type in ('contact', 'summary', 'experience', 'skills')
+        ]
+    
+    def listed_types(self):
+        return [s['type'] for s in self.client.get(self.url).data['results']]
+    
+    def section_writes(self, queries):
+        return [q['sql'] for q in queries.captured_queries
+                if q['sql'].startswith(('UPDATE "api_section"', 'INSERT INTO "api_section"'))]
+    
+    def test_key_between(self):
+        """Test keys stay strictly ordered under repeated inserts at either end and in the middle"""
+        keys = spread_keys(3)
+        self.assertEqual(keys, sorted(keys))
+        for _ in range(50):
+            keys.insert(0, key_between('', keys[0]))
+            keys.append(key_between(keys[-1], None))
+            keys.insert(len(keys) // 2, key_between(keys[len(keys) // 2 - 1], keys[len(keys) // 2]))
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertTrue(all(not key.endswith('0') for key in keys))
+        with self.assertRaises(ValueError):
+            key_between('b', 'a')
+    
+    def test_create_appends(self):
+        """Test new sections go last and report dense 0-based indexes as 'order'"""
+        self.assertEqual([s['order'] for s in self.sections], [0, 1, 2, 3])
+        self.assertEqual(self.listed_types(), ['contact', 'summary', 'experience', 'skills'])
+    
+    def test_move_writes_one_row(self):
+        """Test moving a section to the top rewrites only that section"""
+        url = reverse('section-detail', kwargs={'pk': self.sections[3]['id']})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(url, {'order': 0}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['order'], 0)
+        self.assertEqual(len(self.section_writes(queries)), 1)
+        self.assertEqual(self.listed_types(), ['skills', 'contact', 'summary', 'experience'])
+        
+        detail = self.client.get(reverse('resume-detail', kwargs={'pk': self.resume.pk})).data
+        self.assertEqual([(s['type'], s['order']) for s in detail['sections']], [
+            ('skills', 0), ('contact', 1), ('summary', 2), ('experience', 3),
+        ])
+    
+    def test_plain_queries_skip_positions(self):
+        """Test positions are only numbered for querysets that serialize sections"""
+        self.assertNotIn('COUNT', str(Section.objects.filter(resume=self.resume).query))
+        self.assertFalse(hasattr(Section.objects.get(pk=self.sections[1]['id']), 'position'))
+        positioned = Section.objects.filter(resume=self.resume, type__in=['summary', 'skills']).with_positions()
+        self.assertEqual(sorted(section.position for section in positioned), [2, 4])
+    
+    def test_batch_reports_final_positions(self):
+        """Test a collaborative batch reports positions after all of its ops"""
+        _, applied = apply_section_ops(self.resume.id, self.user, [
+            {'op': 'update', 'section_id': self.sections[0]['id'], 'content': {'text': 'Moved down'}},
+            {'op': 'create', 'type': 'custom', 'order': 0},
+        ])
+        self.assertEqual([op['section']['order'] for op in applied], [1, 0])
+    
+    def test_insert_in_middle(self):
+        """Test creating at a position writes one row and shifts the rest without renumbering"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'type': 'projects', 'order': 2}, format='json')
+        self.assertEqual(response.data['order'], 2)
+        self.assertEqual(len(self.section_writes(queries)), 1)
+        self.assertEqual(self.listed_types(), ['contact', 'summary', 'projects', 'experience', 'skills'])
+    
+    def test_client_reorder_protocol(self):
+        """Test the editor's save of every section with its index, and a reorder, keep the order the user sees"""
+        for section in self.sections:
+            url = reverse('section-detail', kwargs={'pk': section['id']})
+            self.client.patch(url, {'type': section['type'], 'content': section['content'], 'order': section['order']}, format='json')
+        self.assertEqual(self.listed_types(), ['contact', 'summary', 'experience', 'skills'])
+        
+        ids = [section['id'] for section in self.sections]
+        target = [ids[3], ids[0], ids[1], ids[2]]
+        url = reverse('resume-reorder-sections', kwargs={'pk': self.resume.pk})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'section_ids': target}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(s['id'], s['order']) for s in response.data], [(pk, i) for i, pk in enumerate(target)])
+        # Moving the last section to the top leaves the others where they are
+        self.assertEqual(len(self.section_writes(queries)), 1)
+        self.assertEqual(self.listed_types(), ['skills', 'contact', 'summary', 'experience'])
+        
+        # Sequential index writes, as older clients send them, land the same way
+        for index, pk in enumerate([ids[2], ids[0], ids[1], ids[3]]):
+            self.client.patch(reverse('section-detail', kwargs={'pk': pk}), {'order': index}, format='json')
+        self.assertEqual(self.listed_types(), ['experience', 'contact', 'summary', 'skills'])
+    
+    def test_reorder_requires_every_section(self):
+        """Test a reorder listing missing, extra or repeated sections is rejected without moving anything"""
+        ids = [section['id'] for section in self.sections]
+        other = Resume.objects.create(user=self.user, title='Other')
+        foreign = Section.objects.create(resume=other, type='summary', content={}, order=1)
+        url = reverse('resume-reorder-sections', kwargs={'pk': self.resume.pk})
+        for section_ids in (ids[:3], ids + [foreign.id], [ids[0]] + ids[:3], []):
+            response = self.client.post(url, {'section_ids': section_ids}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, section_ids)
+        self.assertEqual(self.listed_types(), ['contact', 'summary', 'experience', 'skills'])
+    
+    def test_rank_collision_retried(self):
+        """Test a writer whose neighbours went stale picks a new rank instead of failing"""
+        from . import ranking
+        stale = ranking.sibling_ranks(self.resume.pk)
+        self.client.post(self.url, {'type': 'projects'}, format='json')
+        real = ranking.sibling_ranks
+        calls = []
+        
+        def sibling_ranks(resume_id, exclude=None):
+            # The first read misses the section created above, so its rank is picked again
+            calls.append(resume_id)
+            return stale if len(calls) == 1 else real(resume_id, exclude)
+        
+        with mock.patch('api.ranking.sibling_ranks', side_effect=sibling_ranks):
+            response = self.client.post(self.url, {'type': 'custom'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(response.data['order'], 5)
+        self.assertEqual(self.listed_types()[-2:], ['projects', 'custom'])
+    
+    def test_unranked_sections_ranked_on_first_move(self):
+        """Test rows created without a rank keep their order and are ranked in the background when one is moved"""
+        resume = Resume.objects.create(user=self.user, title='Legacy')
+        legacy = Section.objects.bulk_create([
+            Section(resume=resume, type=section_type, content={}, order=i)
+            for i, section_type in enumerate(('summary', 'experience', 'education'), 1)
+        ])
+        url = reverse('section-detail', kwargs={'pk': legacy[2].id})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(url, {'order': 0}, format='json')
+        # Only the moved row is written; it can't go in front of the unranked rows yet
+        self.assertEqual(len(self.section_writes(queries)), 1)
+        self.assertEqual(response.data['order'], 2)
+        self.assertEqual(Job.objects.filter(kind=REBALANCE_JOB).count(), 1)
+        
+        jobs.run_pending()
+        self.assertNotIn('', Section.objects.filter(resume=resume).values_list('rank', flat=True))
+        response = self.client.patch(url, {'order': 0}, format='json')
+        self.assertEqual(response.data['order'], 0)
+        self.assertEqual(
+            list(Section.objects.filter(resume=resume).values_list('type', flat=True)),
+            ['education', 'summary', 'experience']
+        )
+    
+    @override_settings(SECTION_RANK_REBALANCE_LENGTH=3)
+    def test_long_ranks_rebalanced_in_background(self):
+        """Test repeated inserts at one spot queue a single rebalance that shortens keys in place"""
+        for _ in range(20):
+            self.client.post(self.url, {'type': 'custom', 'order': 1}, format='json')
+        self.assertEqual(Job.objects.filter(kind=REBALANCE_JOB).count(), 1)
+        before = list(Section.objects.filter(resume=self.resume).values_list('id', flat=True))
+        self.assertGreater(max(len(rank) for rank in Section.objects.values_list('rank', flat=True)), 3)
+        
+        jobs.run_pending()
+        self.assertEqual(list(Section.objects.filter(resume=self.resume).values_list('id', flat=True)), before)
+        self.assertLessEqual(max(len(rank) for rank in Section.objects.values_list('rank', flat=True)), 2)
+        self.assertEqual(
+            list(Section.objects.filter(resume=self.resume).values_list('order', flat=True)),
+            list(range(1, 25))
+        )
+
+@override_settings(ADMIN_PERFORMANCE_MODE=True)
+class AdminPerformanceTests(BaseAPITestCase):
+    """Test admin changelists stay cheap on large tables"""
+    
+    def setUp(self):
+        """Setup a staff user and two resumes with sections"""
+        self.admin_user = User.objects.create_superuser(username='admin', password='testpassword123')
+        self.client.force_login(self.admin_user)
+        self.owner = User.objects.create_user(username='owner', password='testpassword123')
+        self.backend = Resume.objects.create(user=self.owner, title='Backend Developer')
+        self.frontend = Resume.objects.create(user=self.owner, title='Frontend Developer')
+        self.add_sections(self.backend, 2)
+    
+    def add_sections(self, resume, count):
+        Section.objects.bulk_create([
+            Section(resume=resume, type='custom', content={}, order=i, rank=rank)
+            for i, rank in enumerate(spread_keys(count), 1)
+        ])
+    
+    def get(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, [q['sql'] for q in queries.captured_queries]
+    
+    def test_changelists_constant_queries(self):
+        """Test changelist queries don't grow with the rows shown and every count is bounded"""
+        names = ('admin:api_section_changelist', 'admin:api_resume_changelist', 'admin:api_style_changelist')
+        before = {name: self.get(reverse(name))[1] for name in names}
+        for i in range(10):
+            resume = Resume.objects.create(user=User.objects.create_user(username=f'user{i}'), title=f'Resume {i}')
+            Style.objects.create(resume=resume)
+            self.add_sections(resume, 3)
+        for name in names:
+            _, after = self.get(reverse(name))
+            self.assertEqual(len(before[name]), len(after), name)
+            for sql in after:
+                if sql.startswith('SELECT COUNT('):
+                    self.assertIn('LIMIT', sql, name)
+    
+    def test_estimated_count_for_unfiltered_changelist(self):
+        """Test an unfiltered changelist of a big table reports the planner estimate"""
+        with mock.patch('api.admin.estimated_count', return_value=5_000_000) as estimate, \
+                override_settings(ADMIN_COUNT_LIMIT=10):
+            response, _ = self.get(reverse('admin:api_section_changelist'))
+        estimate.assert_called_once()
+        self.assertEqual(response.context['cl'].result_count, 5_000_000)
+        
+        # The manager's soft delete filter alone doesn't make a changelist filtered
+        with mock.patch('api.admin.estimated_count', return_value=5_000_000) as estimate, \
+                override_settings(ADMIN_COUNT_LIMIT=10):
+            response, _ = self.get(reverse('admin:api_resume_changelist'))
+            self.get(reverse('admin:api_resume_changelist'), {'q': 'Back'})
+        estimate.assert_called_once()
+        self.assertEqual(response.context['cl'].result_count, 5_000_000)
+    
+    @override_settings(ADMIN_COUNT_LIMIT=1)
+    def test_filtered_count_capped(self):
+        """Test a filtered changelist counts at most ADMIN_COUNT_LIMIT rows, but always past one page"""
+        Resume.objects.create(user=self.owner, title='Data Engineer')
+        with mock.patch.object(admin.site._registry[Resume], 'list_per_page', 1):
+            response, _ = self.get(reverse('admin:api_resume_changelist'))
+        self.assertEqual(response.context['cl'].result_count, 2)
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+    
+    def test_prefix_search(self):
+        """Test performance mode searches by prefix"""
+        url = reverse('admin:api_resume_changelist')
+        response, queries = self.get(url, {'q': 'Back'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.backend])
+        self.assertFalse(any("LIKE '%Back%'" in sql or "LIKE %Back%" in sql for sql in queries))
+        response, _ = self.get(url, {'q': 'Developer'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+        response, _ = self.get(url, {'q': 'wner'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+        response, _ = self.get(url, {'q': 'owner'})
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+    
+    def test_added_section_ranked(self):
+        """Test a section added in the admin is ranked at its order like the API would"""
+        response = self.client.post(reverse('admin:api_section_add'), {
+            'resume': self.backend.pk, 'type': 'summary', 'content': '{"text": ""}', 'order': 1, 'rank': '',
+        })
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        sections = list(Section.objects.filter(resume=self.backend))
+        self.assertEqual(sections[0].type, 'summary')
+        self.assertNotIn('', [section.rank for section in sections])
+    
+    def test_resume_form_links_sections(self):
+        """Test the resume form links to its sections instead of loading them inline"""
+        url = reverse('admin:api_resume_change', args=[self.backend.pk])
+        response, before = self.get(url)
+        self.assertContains(response, f'?resume__id__exact={self.backend.pk}')
+        self.add_sections(self.frontend, 1)
+        Section.objects.filter(resume=self.frontend).update(resume=self.backend, rank='zz')
+        _, after = self.get(url)
+        self.assertEqual(len(before), len(after))
+        
+        response, _ = self.get(reverse('admin:api_section_changelist'), {'resume__id__exact': self.backend.pk})
+        self.assertEqual(len(response.context['cl'].result_list), 3)
+    
+    @override_settings(ADMIN_PERFORMANCE_MODE=False)
+    def test_default_mode_unchanged(self):
+        """Test substring search and section inlines without performance mode"""
+        response, _ = self.get(reverse('admin:api_resume_changelist'), {'q': 'Developer'})
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+        response, _ = self.get(reverse('admin:api_resume_change', args=[self.backend.pk]))
+        self.assertNotContains(response, 'resume__id__exact')
+
+class SeedScaleTests(BaseAPITestCase):
+    """Test the synthetic dataset generator"""
+    
+    def seed(self, prefix, seed=7):
+        call_command('seed_scale', users=6, chunk_size=4, processes=1, seed=seed, prefix=prefix, stdout=StringIO())
+        return list(
+            Section.objects.filter(resume__user__username__startswith=prefix)
+            .order_by('resume__user__username', 'resume_id', 'rank').values_list('type', 'content', 'order')
+        )
+    
+    def test_seed_creates_complete_resumes(self):
+        """Test every seeded resume has a style and ranked, ordered sections"""
+        self.seed('a')
+        users = User.objects.filter(username__startswith='a')
+        self.assertEqual(users.count(), 6)
+        self.assertTrue(self.client.login(username=users.first().username, password='testpassword123'))
+        resumes = Resume.objects.filter(user__in=users)
+        self.assertGreaterEqual(resumes.count(), 6)
+        self.assertEqual(Style.objects.filter(resume__in=resumes).count(), resumes.count())
+        for resume in resumes:
+            sections = list(resume.sections.values_list('type', 'order', 'rank'))
+            self.assertEqual(sections[0][0], 'contact')
+            self.assertEqual([order for _, order, _ in sections], list(range(1, len(sections) + 1)))
+            self.assertNotIn('', [rank for *_, rank in sections])
+        experience = Section.objects.filter(resume__in=resumes, type='experience').first()
+        self.assertTrue({'title', 'company', 'start_date', 'description'} <= set(experience.content['items'][0]))
+    
+    def test_seed_is_reproducible(self):
+        """Test the same seed gives the same content and another seed doesn't"""
+        self.assertEqual(self.seed('a'), self.seed('b'))
+        self.assertNotEqual(self.seed('c'), self.seed('d', seed=8))
+    
+    def test_existing_prefix_rejected(self):
+        """Test seeding twice with one prefix fails before writing anything"""
+        self.seed('a')
+        with self.assertRaises(CommandError):
+            self.seed('a')
+        self.assertEqual(User.objects.filter(username__startswith='a').count(), 6)
+
+class RequestProfilerTests(BaseAPITestCase):
+    """Test sampled request profiling and the profile report"""
+    
+    def setUp(self):
+        """Setup a user and an empty profile directory"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = directory.name
+        settings_override = override_settings(
+            REQUEST_PROFILER_ENABLED=True, REQUEST_PROFILER_SAMPLE_RATE=1.0, REQUEST_PROFILER_DIR=self.dir
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+    
+    def profiles(self):
+        return sorted(os.listdir(self.dir))
+    
+    def test_sampled_request_written_with_tags(self):
+        """Test a sampled request's profile is named after its route, method, status and duration"""
+        self.client.get(reverse('resume-list'))
+        self.client.get(reverse('resume-detail', kwargs={'pk': 999}))
+        tags = [parse_profile_filename(name) for name in self.profiles()]
+        self.assertEqual([(t['route'], t['method'], t['status']) for t in tags], [
+            ('resume-list', 'GET', 200), ('resume-detail', 'GET', 404),
+        ])
+        self.assertTrue(all(t['duration'] >= 0 for t in tags))
+    
+    @override_settings(REQUEST_PROFILER_SAMPLE_RATE=0)
+    def test_signed_header_forces_profile(self):
+        """Test only a validly signed X-Profile header profiles an unsampled request"""
+        self.client.get(reverse('resume-list'))
+        response = self.client.get(reverse('resume-list'), HTTP_X_PROFILE='forged:token')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(self.profiles(), [])
+        
+        response = self.client.get(reverse('resume-list'), HTTP_X_PROFILE=make_profile_token())
+        self.assertEqual(self.profiles(), [response['X-Profile-Id']])
+    
+    @override_settings(REQUEST_PROFILER_MAX_FILES=3)
+    def test_rotation_keeps_newest(self):
+        """Test the directory never holds more than REQUEST_PROFILER_MAX_FILES profiles"""
+        self.client.get(reverse('resume-detail', kwargs={'pk': 999}))
+        for _ in range(4):
+            self.client.get(reverse('resume-list'))
+        profiles = self.profiles()
+        self.assertEqual(len(profiles), 3)
+        self.assertTrue(all('resume-list' in name for name in profiles))
+    
+    def test_report_lists_hottest_functions(self):
+        """Test the report aggregates matching samples and ranks functions"""
+        for _ in range(3):
+            self.client.get(reverse('resume-list'))
+        self.client.get(reverse('resume-detail', kwargs={'pk': 999}))
+        out = StringIO()
+        call_command('profile_report', dir=self.dir, route='resume-list', limit=5, stdout=out)
+        report = out.getvalue()
+        self.assertIn('3 samples', report)
+        self.assertIn('GET resume-list', report)
+        self.assertNotIn('resume-detail', report)
+        self.assertEqual(len(report.split('function\n')[1].strip().splitlines()), 5)
+        
+        out = StringIO()
+        call_command('profile_report', token=True, stdout=out)
+        self.assertTrue(valid_profile_token(out.getvalue().strip()))
+
+class MetricsTests(BaseAPITestCase):
+    """Test per-route request metrics and the /metrics endpoint"""
+    
+    def setUp(self):
+        """Setup a user, a resume and an empty metrics directory"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.resume = Resume.objects.create(user=self.user, title='Test Resume')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = directory.name
+        settings_override = override_settings(METRICS_ENABLED=True, METRICS_DIR=self.dir, METRICS_TOKEN='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+    
+    def scrape(self, **extra):
+        response = self.client.get(reverse('metrics'), **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        samples = {}
+        for line in response.content.decode().splitlines():
+            if line and not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+        return samples
+    
+    def test_requests_recorded_per_route(self):
+        """Test counts, latency, SQL, serializer time and exception classes are exposed per route"""
+        for _ in range(2):
+            self.client.get(reverse('resume-list'))
+        self.client.get(reverse('resume-detail', kwargs={'pk': 999}))
+        samples = self.scrape()
+        
+        self.assertEqual(samples['http_requests_total{route="resume-list",method="GET",status="200"}'], 2)
+        self.assertEqual(samples['http_requests_total{route="resume-detail",method="GET",status="404"}'], 1)
+        self.assertEqual(samples['http_request_duration_seconds_count{route="resume-list",method="GET"}'], 2)
+        self.assertEqual(samples['http_request_duration_seconds_bucket{route="resume-list",method="GET",le="+Inf"}'], 2)
+        self.assertGreater(samples['http_request_duration_seconds_sum{route="resume-list",method="GET"}'], 0)
+        self.assertGreaterEqual(samples['http_request_db_queries_total{route="resume-list",method="GET"}'], 2)
+        self.assertGreater(samples['http_request_db_seconds_total{route="resume-list",method="GET"}'], 0)
+        self.assertGreater(samples['http_request_serializer_seconds_total{route="resume-list",method="GET"}'], 0)
+        self.assertEqual(
+            samples['http_exceptions_total{route="resume-detail",method="GET",exception="Http404"}'], 1
+        )
+    
+    def test_buckets_cumulative(self):
+        """Test histogram buckets count every request at or below their bound"""
+        self.client.get(reverse('resume-list'))
+        samples = self.scrape()
+        buckets = [
+            value for name, value in samples.items()
+            if name.startswith('http_request_duration_seconds_bucket{route="resume-list"')
+        ]
+        self.assertEqual(len(buckets), 12)
+        self.assertEqual(buckets, sorted(buckets))
+        self.assertEqual(buckets[-1], 1)
+    
+    def test_cache_lookups_counted(self):
+        """Test cache hits and misses are counted for the request running them"""
+        install_cache_counters()
+        metrics = RequestMetrics()
+        token = _request_metrics.set(metrics)
+        try:
+            cache.set('present', None)
+            cache.get('present')
+            cache.get('absent')
+            self.assertEqual(cache.get_many(['present', 'absent']), {'present': None})
+        finally:
+            _request_metrics.reset(token)
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (2, 2))
+    
+    def test_workers_aggregated(self):
+        """Test the endpoint sums every worker's file, including exited ones"""
+        self.client.get(reverse('resume-list'))
+        key = ('http_requests_total', 'resume-list', 'GET', '200')
+        pid = os.fork()
+        if pid == 0:
+            # A second worker process writing its own file
+            try:
+                local_file(self.dir).inc([(key, 5)])
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEqual(collect(self.dir)[key], 6)
+        
+        archive_worker(self.dir, pid)
+        self.assertNotIn(f'metrics_{pid}.db', os.listdir(self.dir))
+        self.assertEqual(collect(self.dir)[key], 6)
+        self.assertEqual(self.scrape()['http_requests_total{route="resume-list",method="GET",status="200"}'], 6)
+    
+    def test_without_flock(self):
+        """Test counters are collected and archived where fcntl isn't available"""
+        self.client.get(reverse('resume-list'))
+        key = ('http_requests_total', 'resume-list', 'GET', '200')
+        with mock.patch('api.metrics.fcntl', None):
+            archive_worker(self.dir, os.getpid())
+            self.assertEqual(collect(self.dir)[key], 1)
+        self.assertNotIn('.lock', os.listdir(self.dir))
+    
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_token_required(self):
+        """Test a configured token must be sent as a bearer token"""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.scrape(HTTP_AUTHORIZATION='Bearer scrape-secret')
+    
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        """Test the endpoint doesn't exist unless metrics are enabled"""
+        self.client.get(reverse('resume-list'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(os.listdir(self.dir), [])
+
+class HealthCheckTests(BaseAPITestCase):
+    """Test the liveness and readiness probes and worker warmup"""
+    
+    def setUp(self):
+        """Start every test with a worker that hasn't warmed up"""
+        for patcher in (
+            mock.patch.dict(health._state, {'ready': False, 'started': False, 'errors': {}}),
+            mock.patch.dict(health.timings, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch('api.skills.warm_skill_index')
+        self.warm_skill_index = patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_liveness_skips_host_validation(self):
+        """Test liveness answers probes sent to a pod IP that isn't an allowed host"""
+        response = self.client.get('/healthz', HTTP_HOST='10.0.0.5')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'status': 'ok'})
+        self.assertEqual(self.client.get('/api/resumes/', HTTP_HOST='10.0.0.5').status_code, 400)
+    
+    def test_readiness_waits_for_warmup(self):
+        """Test readiness fails and starts the warmup until the worker has warmed up"""
+        with mock.patch.object(health, 'start_warmup') as start_warmup:
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        start_warmup.assert_called_once()
+        
+        with CaptureQueriesContext(connection) as queries:
+            health.warmup()
+        self.assertTrue(any(query['sql'] == 'SELECT 1' for query in queries))
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual(body['status'], 'ready')
+        self.assertNotIn('errors', body)
+        self.assertEqual(list(body['timings']), ['urls', 'drf', 'serializers', 'databases', 'caches', 'warmup'])
+    
+    def test_failed_step_keeps_worker_unready(self):
+        """Test readiness stays 503 while a warmup step fails and passes once a retry succeeds"""
+        with mock.patch.object(health, 'STEPS', (('drf', mock.Mock(side_effect=ImportError('broken'))),)):
+            health.warmup()
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.json()['errors'], {'drf': 'ImportError: broken'})
+        
+        with mock.patch.object(health, 'STEPS', (('drf', mock.Mock()),)):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_skill_index_built_in_background(self):
+        """Test warmup only starts the skill index build instead of waiting for it"""
+        with mock.patch('api.skills.build_index') as build_index:
+            health.warmup()
+        self.warm_skill_index.assert_called_once()
+        build_index.assert_not_called()
+    
+    def test_warmup_runs_once(self):
+        """Test a second warmup is a no-op"""
+        health.warmup()
+        with mock.patch.object(health, 'warm_urls') as warm_urls:
+            health.warmup()
+        warm_urls.assert_not_called()
+    
+    def test_readiness_fails_without_database(self):
+        """Test readiness fails while a database can't be queried"""
+        health.warmup()
+        with mock.patch.object(connection, 'cursor', side_effect=OperationalError('connection refused')):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.json()['errors'], {'default': 'OperationalError: connection refused'})
+    
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_replica_outage_only_degrades(self):
+        """Test a replica that can't be queried is reported without failing readiness"""
+        with CaptureQueriesContext(connection) as queries:
+            health.warmup()
+        self.assertEqual(health._state['errors'], {})
+        self.assertEqual(sum(query['sql'] == 'SELECT 1' for query in queries), 1)
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual(body['status'], 'degraded')
+        self.assertEqual(list(body['degraded']), ['replica_1'])
+        self.assertNotIn('errors', body)
+    
+    def test_startup_timings_budget(self):
+        """Test startup_timings reports medians and fails over its limit"""
+        runs = iter([{'startup': 0.2, 'total': 0.5}, {'startup': 0.4, 'total': 0.9}, {'startup': 0.3, 'total': 0.6}])
+        out = StringIO()
+        with mock.patch('api.management.commands.startup_timings.run_once', side_effect=lambda: next(runs)):
+            call_command('startup_timings', repeat=3, stdout=out)
+        self.assertIn('startup           300.0     400.0', out.getvalue())
+        
+        with mock.patch('api.management.commands.startup_timings.run_once', return_value={'total': 2.0}):
+            with self.assertRaises(CommandError):
+                call_command('startup_timings', repeat=1, max_seconds=1.5, stdout=StringIO())
+
+class DocxExportTests(BaseAPITestCase):
+    """Test the streamed Word export"""
+    
+    def setUp(self):
+        """Setup a resume with a style and a few sections"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.resume = Resume.objects.create(user=self.user, title='Backend Resume')
+        Style.objects.create(resume=self.resume, primary_color='#1d4ed8', font_family='Georgia', font_size=11)
+        ranks = spread_keys(3)
+        Section.objects.create(resume=self.resume, type='contact', rank=ranks[0], order=1,
+                               content={'name': 'Ada Lovelace', 'email': 'ada@example.com'})
+        Section.objects.create(resume=self.resume, type='experience', rank=ranks[1], order=2, content={'items': [
+            {'title': 'Engineer', 'company': 'R&D <Labs>', 'start_date': '2020-01', 'end_date': 'Present',
+             'description': 'Built things\nShipped them'},
+        ]})
+        Section.objects.create(resume=self.resume, type='skills', rank=ranks[2], order=3, content={'items': ['Python', 'SQL']})
+        self.url = reverse('resume-export-docx', kwargs={'pk': self.resume.pk})
+    
+    def download(self, **extra):
+        response = self.client.get(self.url, **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+    
+    def parts(self, body):
+        package = zipfile.ZipFile(BytesIO(body))
+        self.assertIsNone(package.testzip())
+        return {name: package.read(name).decode() for name in package.namelist()}
+    
+    def test_document_built_from_sections_and_style(self):
+        """Test the package is valid and holds the sections in order and the resume's style"""
+        response, body = self.download()
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Type'], 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        )
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="Backend Resume.docx"')
+        parts = self.parts(body)
+        self.assertEqual(set(parts), {
+            '[Content_Types].xml', '_rels/.rels', 'word/_rels/document.xml.rels', 'word/styles.xml', 'word/document.xml'
+        })
+        namespace = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+        document = ElementTree.fromstring(parts['word/document.xml'])
+        paragraphs = [''.join(t.text or '' for t in p.iter(f"{{{namespace['w']}}}t"))
+                      for p in document.iterfind('.//w:p', namespace)]
+        self.assertEqual(paragraphs[0], 'Ada Lovelace')
+        self.assertIn('Engineer, R&D <Labs>', paragraphs)
+        self.assertIn('Built thingsShipped them', paragraphs)
+        self.assertEqual(paragraphs[-1], 'Python, SQL')
+        
+        styles = parts['word/styles.xml']
+        self.assertIn('w:ascii="Georgia"', styles)
+        self.assertIn('<w:sz w:val="22"/>', styles)
+        self.assertIn('w:val="1D4ED8"', styles)
+    
+    def test_unchanged_resume_not_rebuilt(self):
+        """Test a second download comes from the cache and an edit builds a new file"""
+        first, body = self.download()
+        with mock.patch('api.views.stream_docx') as build:
+            second, cached = self.download()
+        build.assert_not_called()
+        self.assertFalse(second.streaming)
+        self.assertEqual(cached, body)
+        self.assertEqual(second['ETag'], first['ETag'])
+        
+        Style.objects.filter(resume=self.resume).update(font_size=12)
+        third, rebuilt = self.download()
+        self.assertTrue(third.streaming)
+        self.assertNotEqual(third['ETag'], first['ETag'])
+        self.assertIn('<w:sz w:val="24"/>', self.parts(rebuilt)['word/styles.xml'])
+    
+    def test_not_modified(self):
+        """Test a matching If-None-Match gets a 304 without a body"""
+        response, _ = self.download()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+    
+    def test_negotiation_and_compression(self):
+        """Test clients may ask for the Word type and the zip isn't compressed again"""
+        response, _ = self.download(
+            HTTP_ACCEPT='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertNotIn('Content-Encoding', response)
+    
+    def test_other_users_resume(self):
+        """Test users can't export resumes they don't own"""
+        other = User.objects.create_user(username='other', password='testpassword123')
+        resume = Resume.objects.create(user=other, title='Other')
+        response = self.client.get(reverse('resume-export-docx', kwargs={'pk': resume.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_streams_under_asgi(self):
+        """Test the ASGI handler streams the package as it's zipped instead of buffering it whole"""
+        async def scenario():
+            response = await self.async_client.get(
+                self.url, headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+            )
+            self.assertTrue(response.is_async)
+            return b''.join([chunk async for chunk in response.streaming_content])
+        
+        body = async_to_sync(scenario)()
+        self.assertIn('Ada Lovelace', self.parts(body)['word/document.xml'])
+        self.assertEqual(self.download()[1], body)
+    
+    def test_streamed_in_chunks(self):
+        """Test large documents are handed out in pieces as they're zipped"""
+        inputs = {
+            'title': 'Long', 'style': {'color': '#000000', 'font': 'Inter', 'size': 10},
+            'sections': [['summary', {'text': os.urandom(2048).hex()}] for _ in range(50)],
+        }
+        chunks = list(stream_docx(inputs, chunk_size=16 * 1024))
+        self.assertGreater(len(chunks), 3)
+        self.assertIsNone(zipfile.ZipFile(BytesIO(b''.join(chunks))).testzip())
+
+JSON_RESUME = {
+    'basics': {
+        'name': 'Ada Lovelace', 'label': 'Analyst', 'email': 'ada@example.com', 'url': 'https://ada.dev',
+        'summary': 'Writes programs.', 'location': {'city': 'London', 'countryCode': 'GB'},
+        'profiles': [{'network': 'LinkedIn', 'url': 'https://linkedin.com/in/ada'}],
+    },
+    'work': [{'name': 'Analytical Engines', 'position': 'Programmer', 'startDate': '1842-01',
+              'summary': 'Notes on the engine.', 'highlights': ['First algorithm']}],
+    'education': [{'institution': 'Home', 'area': 'Mathematics', 'studyType': 'Tutoring', 'score': 4}],
+    'skills': [{'name': 'Mathematics'}, {'keywords': ['Poetry', 'Music']}],
+    'projects': [{'name': 'Note G', 'description': 'Bernoulli numbers', 'keywords': ['Engine']}],
+    'languages': [{'language': 'English', 'fluency': 'Native'}],
+}
+
+class JsonResumeTests(BaseAPITestCase):
+    """Test JSON Resume conversion, endpoints and bulk import/export"""
+    
+    def setUp(self):
+        """Setup an authenticated user"""
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('resume-json-resumes')
+    
+    def sections(self, resume_id):
+        return list(Section.objects.filter(resume_id=resume_id).values_list('type', 'content'))
+    
+    def test_import_maps_sections(self):
+        """Test a document becomes our section types in the editor's content shapes"""
+        response = self.client.post(self.url, JSON_RESUME, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['title'], 'Analyst')
+        self.assertIsNotNone(response.data['style'])
+        sections = self.sections(response.data['id'])
+        self.assertEqual([section_type for section_type, _ in sections],
+                         ['contact', 'summary', 'experience', 'education', 'skills', 'projects', 'custom'])
+        contact, _, experience, education, skills, projects, languages = [content for _, content in sections]
+        self.assertEqual(contact['location'], 'London, GB')
+        self.assertEqual(contact['linkedin'], 'https://linkedin.com/in/ada')
+        self.assertEqual(experience['items'][0], {
+            'title': 'Programmer', 'company': 'Analytical Engines', 'location': '', 'start_date': '1842-01',
+            'end_date': 'Present', 'description': 'Notes on the engine.\n• First algorithm',
+        })
+        self.assertEqual(education['items'][0]['gpa'], '4')
+        self.assertEqual(skills['items'], ['Mathematics', 'Poetry', 'Music'])
+        self.assertEqual(projects['items'][0]['technologies'], ['Engine'])
+        self.assertEqual(languages, {'title': 'Languages', 'content': 'English — Native', 'text': ''})
+    
+    def test_conversion_errors_name_the_field(self):
+        """Test documents of the wrong shape are rejected with the offending path"""
+        with self.assertRaisesMessage(ConversionError, 'work[0].highlights[1]: expected a string'):
+            from_json_resume({'work': [{'highlights': ['ok', {'nested': True}]}]})
+        response = self.client.post(self.url, {'basics': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], 'basics: expected an object')
+    
+    def test_round_trip(self):
+        """Test exporting an imported resume and importing it again gives the same sections"""
+        first = self.client.post(self.url, JSON_RESUME, format='json').data['id']
+        exported = self.client.get(reverse('resume-json-resume', kwargs={'pk': first})).json()
+        self.assertEqual(exported['basics']['name'], 'Ada Lovelace')
+        self.assertNotIn('endDate', exported['work'][0])
+        self.assertEqual(exported['meta']['customSections'], [{'title': 'Languages', 'content': 'English — Native'}])
+        
+        second = self.client.post(self.url, exported, format='json').data
+        self.assertEqual(second['title'], 'Analyst')
+        self.assertEqual(self.sections(second['id']), self.sections(first))
+    
+    def test_bulk_import_reports_errors_per_record(self):
+        """Test an NDJSON batch imports the good records and reports each bad one"""
+        lines = [json.dumps(JSON_RESUME), '{not json', '', json.dumps({'skills': 'Python'}), json.dumps({'basics': {'name': 'Bo'}})]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.generic(
+                'POST', self.url, '\n'.join(lines).encode(), content_type='application/x-ndjson'
+            )
+            results = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        errors = {result['line']: result['error'] for result in results if 'error' in result}
+        self.assertEqual(set(errors), {2, 4})
+        self.assertEqual(errors[4], 'skills: expected a list')
+        ids = [result['id'] for result in results if 'id' in result]
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(set(Resume.objects.filter(user=self.user).values_list('title', flat=True)),
+                         {'Analyst', 'Bo Resume'})
+        self.assertEqual(
+            set(ResumeChange.objects.filter(user=self.user, action='created').values_list('resume_id', flat=True)),
+            set(ids)
+        )
+    
+    def test_bulk_import_streams_under_asgi(self):
+        """Test the ASGI handler streams import results as they're written instead of buffering them"""
+        lines = [json.dumps(JSON_RESUME), json.dumps({'basics': {'name': 'Bo'}})]
+        
+        async def scenario():
+            response = await self.async_client.post(
+                self.url, '\n'.join(lines).encode(), content_type='application/x-ndjson',
+                headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'},
+            )
+            self.assertTrue(response.is_async)
+            return [json.loads(line) async for line in response.streaming_content]
+        
+        results = async_to_sync(scenario)()
+        self.assertEqual([result['line'] for result in results], [1, 2])
+        self.assertEqual(Resume.objects.filter(user=self.user).count(), 2)
+    
+    def test_bulk_export_streams_every_resume(self):
+        """Test GET streams one document per resume with constant queries per batch"""
+        for i in range(3):
+            self.client.post(self.url, {**JSON_RESUME, 'meta': {'title': f'Resume {i}'}}, format='json')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+            documents = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([document['meta']['title'] for document in documents], ['Resume 0', 'Resume 1', 'Resume 2'])
+        self.assertLessEqual(len(queries), 5)
+    
+    def test_bulk_export_streams_under_asgi(self):
+        """Test the ASGI handler streams the export a batch at a time instead of buffering it"""
+        self.client.post(self.url, JSON_RESUME, format='json')
+        
+        async def scenario():
+            response = await self.async_client.get(
+                self.url, headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+            )
+            self.assertTrue(response.is_async)
+            return [json.loads(line) async for line in response.streaming_content]
+        
+        documents = async_to_sync(scenario)()
+        self.assertEqual([document['basics']['name'] for document in documents], ['Ada Lovelace'])
+    
+    def test_command_round_trip(self):
+        """Test the command imports and exports NDJSON files and reports bad records"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        source, target = os.path.join(directory.name, 'in.ndjson'), os.path.join(directory.name, 'out.ndjson')
+        with open(source, 'w') as f:
+            f.write(json.dumps(JSON_RESUME) + '\n' + json.dumps([]) + '\n')
+        out, err = StringIO(), StringIO()
+        call_command('json_resume', 'import', user='testuser', file=source, stdout=out, stderr=err)
+        self.assertIn('Imported 1 resumes, 1 failed', out.getvalue())
+        self.assertIn('"line": 2', err.getvalue())
+        
+        call_command('json_resume', 'export', user='testuser', file=target, stdout=StringIO(), stderr=StringIO())
+        with open(target) as f:
+            self.assertEqual([json.loads(line)['basics']['name'] for line in f], ['Ada Lovelace'])
+        with self.assertRaises(CommandError):
+            call_command('json_resume', 'export', user='nobody', stdout=StringIO(), stderr=StringIO())
+
+
+class ResumeDocumentTests(BaseAPITestCase):
+    """Test the materialized resume documents"""
+    
+    def setUp(self):
+        """Enable documents and setup a resume created through the API"""
+        settings_override = override_settings(RESUME_DOCUMENTS_ENABLED=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='testuser', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.resume_id = self.client.post(reverse('resume-list'), {'title': 'Documented'}, format='json').data['id']
+        sections_url = reverse('resume-sections', args=[self.resume_id])
+        self.summary_id = self.client.post(
+            sections_url, {'type': 'summary', 'content': {'text': 'Django developer'}}, format='json'
+        ).data['id']
+        self.client.post(sections_url, {'type': 'skills', 'content': {'items': ['Python']}}, format='json')
+        self.detail_url = reverse('resume-detail', args=[self.resume_id])
+    
+    def serialized(self):
+        """The detail payload built from the tables"""
+        with override_settings(RESUME_DOCUMENTS_ENABLED=False):
+            return self.client.get(self.detail_url).json()
+    
+    def verify(self):
+        out = StringIO()
+        call_command('resume_documents', '--verify', stdout=out)
+        return out.getvalue()
+    
+    def test_writes_keep_the_document_current(self):
+        """Test section, style and resume writes each rebuild the document in their transaction"""
+        document = ResumeDocument.objects.get(pk=self.resume_id)
+        self.assertEqual(document.version, Resume.objects.get(pk=self.resume_id).version)
+        self.assertEqual([section['type'] for section in document.data['sections']], ['summary', 'skills'])
+        
+        self.client.patch(reverse('section-detail', args=[self.summary_id]), {'order': 1}, format='json')
+        self.client.patch(self.detail_url, {'title': 'Renamed'}, format='json')
+        style = Style.objects.get(resume_id=self.resume_id)
+        style.font_size = 12
+        style.save()
+        data = ResumeDocument.objects.get(pk=self.resume_id).data
+        self.assertEqual([(s['type'], s['order']) for s in data['sections']], [('skills', 0), ('summary', 1)])
+        self.assertEqual((data['title'], data['style']['font_size']), ('Renamed', 12))
+        self.assertEqual(data, self.serialized())
+        
+        self.client.delete(reverse('section-detail', args=[self.summary_id]))
+        self.assertEqual(len(ResumeDocument.objects.get(pk=self.resume_id).data['sections']), 1)
+        self.assertIn('All 1 documents are up to date', self.verify())
+    
+    def test_reads_are_one_query(self):
+        """Test detail and share reads fetch only the document row"""
+        expected = self.serialized()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.detail_url)
+        self.assertEqual(response.json(), expected)
+        self.assertEqual(len(queries), 1)
+        
+        share_slug = Resume.objects.get(pk=self.resume_id).share_slug
+        self.client.force_authenticate(user=None)
+        with mock.patch.object(view_counter, 'record') as record, CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('public-resume', args=[share_slug]))
+        self.assertEqual(len(queries), 1)
+        record.assert_called_once_with(self.resume_id)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertEqual(response.json(), {field: expected[field] for field in ('id', 'title', 'template_name', 'sections', 'style')})
+    
+    def test_reads_check_ownership_and_trash(self):
+        """Test another user's or a trashed resume isn't served from its document"""
+        other = User.objects.create_user(username='other', password='testpassword123')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(self.detail_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=self.user)
+        self.client.delete(self.detail_url)
+        self.assertEqual(self.client.get(self.detail_url).status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_bulk_writes_build_documents(self):
+        """Test duplicates and JSON Resume imports, which skip the write hooks, get documents too"""
+        copy_id = self.client.post(reverse('resume-duplicate', args=[self.resume_id]), format='json').data['id']
+        self.client.post(reverse('resume-json-resumes'), JSON_RESUME, format='json')
+        self.assertEqual(ResumeDocument.objects.count(), 3)
+        copy = ResumeDocument.objects.get(pk=copy_id).data
+        self.assertEqual([section['type'] for section in copy['sections']], ['summary', 'skills'])
+        self.assertIn('All 3 documents are up to date', self.verify())
+    
+    def test_collaborative_batch_rebuilds_once(self):
+        """Test a batch of section ops rebuilds the document once, after its last op"""
+        ops = [{'op': 'create', 'type': 'custom', 'content': {'title': 'Extra'}},
+               {'op': 'update', 'section_id': self.summary_id, 'content': {'text': 'Edited'}}]
+        with mock.patch('api.documents.refresh_documents', wraps=refresh_documents) as refresh:
+            version, _ = apply_section_ops(self.resume_id, self.user, ops)
+        refresh.assert_called_once()
+        document = ResumeDocument.objects.get(pk=self.resume_id)
+        self.assertEqual(document.version, version)
+        self.assertEqual(document.data, self.serialized())
+    
+    def test_archived_resume_is_served_without_restoring(self):
+        """Test the document of an archived resume is read as is and rebuilt from the archive"""
+        Resume.objects.filter(pk=self.resume_id).update(updated_at=timezone.now() - timedelta(days=400))
+        call_command('resume_documents', '--rebuild', stdout=StringIO())
+        expected = self.serialized()
+        call_command('archive_resumes', stdout=StringIO())
+        self.assertEqual(self.client.get(self.detail_url).json(), expected)
+        self.assertTrue(Resume.objects.get(pk=self.resume_id).is_archived)
+        
+        ResumeDocument.objects.all().delete()
+        call_command('resume_documents', '--rebuild', stdout=StringIO())
+        self.assertEqual(self.client.get(self.detail_url).json(), expected)
+        self.assertTrue(Resume.objects.get(pk=self.resume_id).is_archived)
+    
+    def test_verify_reports_and_rebuild_fixes(self):
+        """Test the command finds stale, missing and edited documents and a rebuild repairs them"""
+        other_id = self.client.post(reverse('resume-list'), {'title': 'Second'}, format='json').data['id']
+        third_id = self.client.post(reverse('resume-list'), {'title': 'Third'}, format='json').data['id']
+        # Writes that bypass the hooks
+        Resume.objects.filter(pk=self.resume_id).update(title='Changed', version=F('version') + 1)
+        ResumeDocument.objects.filter(pk=other_id).delete()
+        document = ResumeDocument.objects.get(pk=third_id)
+        document.data['title'] = 'Tampered'
+        document.save()
+        
+        # A stale document is never served
+        self.assertEqual(self.client.get(self.detail_url).json()['title'], 'Changed')
+        with self.assertRaisesMessage(CommandError, '3 of 3 documents need a rebuild'):
+            self.verify()
+        
+        out = StringIO()
+        call_command('resume_documents', '--rebuild', '--batch-size', '2', stdout=out)
+        self.assertIn('Rebuilt 3 documents', out.getvalue())
+        self.assertIn('All 3 documents are up to date', self.verify())
+    
+    def test_disabled_documents_are_not_written(self):
+        """Test nothing is stored while documents are off"""
+        with override_settings(RESUME_DOCUMENTS_ENABLED=False):
+            resume_id = self.client.post(reverse('resume-list'), {'title': 'Plain'}, format='json').data['id']
+        self.assertFalse(ResumeDocument.objects.filter(pk=resume_id).exists())
@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Parse a DRF style rate string such as '10/min' into (requests, seconds)"""
+    if rate is None:
+        return None, None
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class LocalTokenBucketStore:
+    """
+    In-process token buckets keyed by throttle key.
+
+    Each key holds (tokens, timestamp) and refills continuously, so a hit is a
+    dict lookup plus a little arithmetic. The least recently used buckets are
+    evicted once ``max_entries`` is reached to keep memory bounded.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, duration, now=None):
+        """Consume one token; return (allowed, seconds until the next token)"""
+        now = time.monotonic() if now is None else now
+        refill_rate = limit / duration
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (limit, now))
+            tokens = min(limit, tokens + (now - last) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        wait = 0 if allowed else (1 - tokens) / refill_rate
+        return allowed, wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheSlidingWindowStore:
+    """
+    Sliding-window counters kept in a shared Django cache.
+
+    The current and previous fixed windows are read in one ``get_many`` and the
+    previous count is weighted by how much of it still overlaps the sliding
+    window. Allowed hits use the cache's atomic ``incr``, so the counts are
+    shared across worker processes when the cache is Redis or memcached.
+    """
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    def hit(self, key, limit, duration, now=None):
+        """Record one hit; return (allowed, seconds until a hit would be allowed)"""
+        cache = caches[self.alias]
+        now = time.time() if now is None else now
+        window = int(now // duration)
+        elapsed = (now % duration) / duration
+        current_key, previous_key = f'{key}:{window}', f'{key}:{window - 1}'
+
+        counts = cache.get_many([current_key, previous_key])
+        current = counts.get(current_key, 0)
+        previous = counts.get(previous_key, 0)
+        estimated = previous * (1 - elapsed) + current
+
+        if estimated + 1 > limit:
+            if current + 1 > limit or not previous:
+                wait = duration * (1 - elapsed)
+            else:
+                wait = duration * max(0, 1 - (limit - current - 1) / previous - elapsed)
+            return False, wait
+
+        cache.add(current_key, 0, timeout=duration * 2)
+        try:
+            cache.incr(current_key)
+        except ValueError:
+            # The key expired between add and incr
+            cache.set(current_key, 1, timeout=duration * 2)
+        return True, 0
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+local_store = LocalTokenBucketStore()
+
+
+def get_store():
+    """Return the store selected by the THROTTLE_STORE setting"""
+    if getattr(settings, 'THROTTLE_STORE', 'local') == 'cache':
+        return CacheSlidingWindowStore(getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default'))
+    return local_store
+
+
+class BucketRateThrottle(BaseThrottle):
+    """
+    Base throttle backed by a token bucket or sliding-window store.
+
+    Subclasses set ``scope`` (looked up in DEFAULT_THROTTLE_RATES) and implement
+    ``get_key``. Returning None from ``get_key`` skips throttling.
+    """
+    scope = None
+
+    def __init__(self):
+        self.num_requests, self.duration = parse_rate(self.get_rate())
+        self._wait = None
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_key(self, request, view):
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def allow_request(self, request, view):
+        if self.num_requests is None:
+            return True
+
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+
+        allowed, self._wait = get_store().hit(
+            f'throttle:{self.scope}:{key}', self.num_requests, self.duration
+        )
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class IPRateThrottle(BucketRateThrottle):
+    """Throttle keyed by client IP"""
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UserRateThrottle(BucketRateThrottle):
+    """Throttle keyed by authenticated user, falling back to client IP"""
+
+    def get_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+
+class PublicResumeRateThrottle(IPRateThrottle):
+    scope = 'public_resume'
+
+
+class ShareSlugRateThrottle(BucketRateThrottle):
+    """Throttle keyed by share_slug so one shared resume can't be hammered"""
+    scope = 'public_resume_slug'
+
+    def get_key(self, request, view):
+        share_slug = view.kwargs.get('share_slug')
+        return str(share_slug) if share_slug else None
+
+
+class RegisterRateThrottle(IPRateThrottle):
+    scope = 'register'
+
+
+class LoginRateThrottle(IPRateThrottle):
+    scope = 'login'
+
+
+class LoginUsernameRateThrottle(BucketRateThrottle):
+    """Throttle keyed by the submitted username to slow credential stuffing"""
+    scope = 'login_username'
+
+    def get_key(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        return str(username).lower() if username else None
+
+
+class ChangePasswordRateThrottle(UserRateThrottle):
+    scope = 'change_password'
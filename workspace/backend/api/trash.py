@@ -0,0 +1,97 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .changes import muted
+from .jobs import enqueue, job
+from .models import Resume, ResumeChange
+
+logger = logging.getLogger(__name__)
+
+PURGE_JOB = 'resumes.purge_trash'
+
+
+def retention():
+    return timedelta(seconds=getattr(settings, 'TRASH_RETENTION', 30 * 86400))
+
+
+def announce(rows, user_id, action):
+    """Record one change per (resume id, version) row once the transaction commits"""
+    def insert():
+        ResumeChange.objects.bulk_create([
+            ResumeChange(user_id=user_id, resume_id=resume_id, kind=ResumeChange.KIND_RESUME,
+                         action=action, version=version)
+            for resume_id, version in rows
+        ])
+    if rows:
+        transaction.on_commit(insert)
+
+
+def trash_resumes(user, resume_ids):
+    """
+    Move the user's resumes to the trash with a single UPDATE.
+
+    They disappear from Resume.objects at once; a purge job hard-deletes
+    them once TRASH_RETENTION has passed unless they are restored first.
+    Returns the trashed ids.
+    """
+    with transaction.atomic():
+        rows = list(Resume.objects.filter(user=user, pk__in=resume_ids).values_list('pk', 'version'))
+        ids = [resume_id for resume_id, _ in rows]
+        if not ids:
+            return []
+        now = timezone.now()
+        Resume.objects.filter(pk__in=ids).update(deleted_at=now)
+        enqueue(PURGE_JOB, {'resume_ids': ids}, user=user, run_at=now + retention())
+        announce(rows, user.pk, ResumeChange.ACTION_DELETED)
+    return ids
+
+
+def trashed_resumes(user):
+    """The user's resumes that can still be restored"""
+    return Resume.all_objects.filter(
+        user=user, deleted_at__isnull=False, deleted_at__gt=timezone.now() - retention()
+    )
+
+
+def restore_from_trash(user, resume_ids):
+    """Bring resumes back from the trash if still within the window; returns the restored ids"""
+    with transaction.atomic():
+        rows = list(trashed_resumes(user).filter(pk__in=resume_ids).values_list('pk', 'version'))
+        ids = [resume_id for resume_id, _ in rows]
+        Resume.all_objects.filter(pk__in=ids).update(deleted_at=None)
+        announce(rows, user.pk, ResumeChange.ACTION_CREATED)
+    return ids
+
+
+def purge_trash(resume_ids=None, batch_size=None):
+    """
+    Hard-delete resumes that have been in the trash past TRASH_RETENTION.
+
+    Deletes in chunks of TRASH_PURGE_BATCH_SIZE, one transaction each, so
+    the cascade through sections never holds locks for long. Restricted to
+    ``resume_ids`` when given. Returns how many resumes were deleted.
+    """
+    batch_size = batch_size or getattr(settings, 'TRASH_PURGE_BATCH_SIZE', 100)
+    expired = Resume.all_objects.filter(deleted_at__lte=timezone.now() - retention())
+    if resume_ids is not None:
+        expired = expired.filter(pk__in=resume_ids)
+
+    purged = 0
+    while True:
+        ids = list(expired.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return purged
+        # Already announced when trashed
+        with transaction.atomic(), muted():
+            Resume.all_objects.filter(pk__in=ids).delete()
+        purged += len(ids)
+        logger.info(f"Purged {len(ids)} trashed resumes")
+
+
+@job(PURGE_JOB)
+def purge_trash_job(payload, job):
+    return {'purged': purge_trash(payload.get('resume_ids'))}
@@ -1,17 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     UserCreateView,
+    ThrottledTokenObtainPairView,
     UserDetailView,
     ChangePasswordView,
     ResumeViewSet,
     SectionViewSet,
     StyleViewSet,
-    PublicResumeView
+    PublicResumeView,
+    JobViewSet,
+    SkillSearchView,
+    ChangeStreamView
 )
 
 # Create a router and register our viewsets with it.
@@ -19,19 +20,13 @@ router = DefaultRouter()
 router.register(r'resumes', ResumeViewSet, basename='resume')
 router.register(r'sections', SectionViewSet, basename='section')
 router.register(r'styles', StyleViewSet, basename='style')
-
-# Debug router URLs
-import logging
-logger = logging.getLogger(__name__)
-logger.info("Generated API routes:")
-for route in router.urls:
-    logger.info(f"Route: {route.pattern}")  
+router.register(r'jobs', JobViewSet, basename='job')
 
 # URL patterns for our API
 urlpatterns = [
     # Authentication endpoints
     path('auth/register/', UserCreateView.as_view(), name='register'),
-    path('auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('auth/token/', ThrottledTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/user/', UserDetailView.as_view(), name='user-detail'),
     path('auth/change-password/', ChangePasswordView.as_view(), name='change-password'),
@@ -39,6 +34,12 @@ urlpatterns = [
     # Public resume endpoint
     path('public/resume/<uuid:share_slug>/', PublicResumeView.as_view(), name='public-resume'),
     
+    # Skills autocomplete
+    path('skills/', SkillSearchView.as_view(), name='skills-search'),
+    
+    # Server-sent change notifications for multi-tab sync
+    path('changes/stream/', ChangeStreamView.as_view(), name='change-stream'),
+    
     # Nested routes
     path('resumes/<int:resume_pk>/sections/', SectionViewSet.as_view({'get': 'list', 'post': 'create'}), name='resume-sections'),
     path('resumes/<int:resume_pk>/style/', StyleViewSet.as_view({'get': 'list', 'put': 'update', 'patch': 'partial_update'}), name='resume-style'),
@@ -0,0 +1,114 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Resume, ResumeViewCount, ResumeDailyViews
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounterBuffer:
+    """
+    Per-process buffer of public resume views.
+
+    ``record`` only bumps an in-memory counter, so a viral share link never
+    contends on a database row inside the request. ``flush`` swaps the buffer
+    out and writes every pending count in two batched statements per table:
+    an insert of missing rows and a single ``UPDATE ... views = views + n``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = Counter()
+        self._daily = Counter()
+        self._last_flush = time.monotonic()
+
+    def record(self, resume_id):
+        with self._lock:
+            self._totals[resume_id] += 1
+            if getattr(settings, 'VIEW_COUNTER_DAILY_ROLLUPS', True):
+                self._daily[(resume_id, timezone.localdate())] += 1
+
+    def pending(self, resume_id):
+        """Views recorded in this process but not yet flushed"""
+        with self._lock:
+            return self._totals.get(resume_id, 0)
+
+    def clear(self):
+        """Discard buffered counts without writing them"""
+        with self._lock:
+            self._totals.clear()
+            self._daily.clear()
+            self._last_flush = time.monotonic()
+
+    def maybe_flush(self, **kwargs):
+        """Flush if the configured interval has elapsed since the last flush"""
+        interval = getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 10)
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered counts; counts are put back if the write fails"""
+        with self._lock:
+            totals, self._totals = self._totals, Counter()
+            daily, self._daily = self._daily, Counter()
+            self._last_flush = time.monotonic()
+        if not totals and not daily:
+            return
+
+        try:
+            with transaction.atomic():
+                existing = set(Resume.objects.filter(pk__in=totals).values_list('pk', flat=True))
+                self._write_totals({pk: n for pk, n in totals.items() if pk in existing})
+                self._write_daily({key: n for key, n in daily.items() if key[0] in existing})
+        except Exception:
+            logger.exception("Failed to flush resume view counters, keeping them buffered")
+            with self._lock:
+                self._totals.update(totals)
+                self._daily.update(daily)
+
+    def _write_totals(self, totals):
+        if not totals:
+            return
+        ResumeViewCount.objects.bulk_create(
+            [ResumeViewCount(resume_id=pk) for pk in totals], ignore_conflicts=True
+        )
+        rows = []
+        for pk, count in totals.items():
+            row = ResumeViewCount(resume_id=pk)
+            row.views = F('views') + count
+            rows.append(row)
+        ResumeViewCount.objects.bulk_update(rows, ['views'])
+
+    def _write_daily(self, daily):
+        if not daily:
+            return
+        ResumeDailyViews.objects.bulk_create(
+            [ResumeDailyViews(resume_id=pk, date=day) for pk, day in daily], ignore_conflicts=True
+        )
+        ids = dict(
+            ((pk, day), row_id) for row_id, pk, day in ResumeDailyViews.objects.filter(
+                resume_id__in={pk for pk, _ in daily}, date__in={day for _, day in daily}
+            ).values_list('id', 'resume_id', 'date')
+        )
+        rows = []
+        for key, count in daily.items():
+            row = ResumeDailyViews(id=ids[key])
+            row.views = F('views') + count
+            rows.append(row)
+        ResumeDailyViews.objects.bulk_update(rows, ['views'])
+
+
+view_counter = ViewCounterBuffer()
+
+# Flush after responses are sent, and once more when the worker shuts down
+request_finished.connect(view_counter.maybe_flush, dispatch_uid='resume_view_counter_flush')
+atexit.register(view_counter.flush)
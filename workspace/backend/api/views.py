@@ -2,18 +2,56 @@ from rest_framework import viewsets, generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, parse_etags
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from django.utils import timezone
+from rest_framework_simplejwt.views import TokenObtainPairView
+from asgiref.sync import sync_to_async
+import json
 import uuid
+from datetime import timedelta
+from itertools import chain
 
 from django.contrib.auth import get_user_model
-from .models import Resume, Section, Style
+from .models import Resume, Section, Style, ResumeViewCount, ResumeDailyViews, Job
 from .serializers import (
     UserSerializer, 
     ResumeSerializer, 
     ResumeListSerializer,
     SectionSerializer, 
     StyleSerializer,
-    PublicResumeSerializer
+    PublicResumeSerializer,
+    JobSerializer,
+    TrashedResumeSerializer,
+    ResumeIdsSerializer,
+    SectionOrderSerializer,
+    DuplicateResumeSerializer
 )
+from .throttling import (
+    PublicResumeRateThrottle,
+    ShareSlugRateThrottle,
+    RegisterRateThrottle,
+    LoginRateThrottle,
+    LoginUsernameRateThrottle,
+    ChangePasswordRateThrottle
+)
+from .view_counters import view_counter
+from .skills import get_skill_index
+from .matching import match_resumes
+from .diff import diff_resumes
+from .changes import change_stream
+from .authentication import QueryParamJWTAuthentication
+from .archive import archived_resume_of, archived_sections, restore_resume
+from .trash import restore_from_trash, retention, trash_resumes, trashed_resumes
+from .fieldsets import apply_fieldset, parse_fieldset
+from .documents import deferred, refresh_document, stored_document
+from .json_resume import ConversionError, create_resumes, export_lines, from_json_resume, import_lines, resume_sections, to_json_resume
+from .docx_export import CONTENT_TYPE as DOCX_CONTENT_TYPE, caching_stream, content_hash, export_inputs, get_cached, stream_docx
+from .db_router import pin_to_primary
+from .ranking import place
 
 User = get_user_model()
 
@@ -22,6 +60,11 @@ class UserCreateView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [RegisterRateThrottle]
+
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    """Token login view throttled by client IP and submitted username"""
+    throttle_classes = [LoginRateThrottle, LoginUsernameRateThrottle]
 
 class UserDetailView(generics.RetrieveUpdateAPIView):
     """View for getting and updating user profile"""
@@ -42,6 +85,7 @@ class ChangePasswordView(generics.GenericAPIView):
     """View for changing user password"""
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [ChangePasswordRateThrottle]
     
     def post(self, request, *args, **kwargs):
         """Change password for the authenticated user"""
@@ -78,20 +122,125 @@ class ChangePasswordView(generics.GenericAPIView):
             status=status.HTTP_200_OK
         )
 
+class DocxRenderer(BaseRenderer):
+    """Lets clients ask for a Word document in Accept; error bodies are still sent as JSON"""
+    media_type = DOCX_CONTENT_TYPE
+    format = 'docx'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+class NDJSONRenderer(BaseRenderer):
+    """Lets clients ask for newline-delimited JSON in Accept; error bodies are still sent as JSON"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+def import_results(request, lines):
+    """Result lines of a streamed NDJSON import; the client is pinned to the primary once it's written"""
+    try:
+        for result in import_lines(request.user, lines):
+            yield json.dumps(result) + '\n'
+    finally:
+        # The routing middleware pinned the client before these writes were made
+        pin_to_primary(request)
+
+async def in_thread(iterator):
+    """Step a synchronous iterator in the request's sync thread, so ASGI streams it instead of buffering it whole"""
+    step, done = sync_to_async(next), object()
+    while (item := await step(iterator, done)) is not done:
+        yield item
+
 class ResumeViewSet(viewsets.ModelViewSet):
     """ViewSet for Resume model"""
     serializer_class = ResumeSerializer
+    # Resume columns a ?fields= selection can narrow down to
+    sparse_columns = ('title', 'template_name', 'share_slug', 'created_at', 'updated_at')
+    
+    def get_fieldset(self):
+        """Return the ?fields=/?include= selection for list and retrieve, or None"""
+        if self.action not in ('list', 'retrieve'):
+            return None
+        if not hasattr(self, '_fieldset'):
+            default = ResumeListSerializer.Meta.fields if self.action == 'list' else ResumeSerializer.Meta.fields
+            self._fieldset = parse_fieldset(self.request.query_params, ResumeSerializer.Meta.fields, default)
+        return self._fieldset
     
     def get_queryset(self):
         """Return resumes for current authenticated user only"""
-        return Resume.objects.filter(user=self.request.user)
+        queryset = Resume.objects.filter(user=self.request.user)
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            return apply_fieldset(queryset, fieldset, self.sparse_columns)
+        if self.action in ('retrieve', 'update', 'partial_update', 'duplicate', 'diff', 'export_docx'):
+            queryset = queryset.select_related('style')
+        if self.action in ('retrieve', 'diff'):
+            # DRF drops prefetched data after updates, so only reads prefetch
+            queryset = queryset.prefetch_related('sections')
+        return queryset
     
     def get_serializer_class(self):
         """Return appropriate serializer class"""
-        if self.action == 'list':
+        if self.action == 'list' and self.get_fieldset() is None:
             return ResumeListSerializer
         return ResumeSerializer
     
+    def get_serializer_context(self):
+        """Pass a sparse fieldset on to the serializer"""
+        context = super().get_serializer_context()
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            context['sparse_fields'] = fieldset.fields
+        return context
+    
+    def get_object(self):
+        """Return the resume, bringing its sections back from the archive if needed"""
+        resume = super().get_object()
+        if resume.is_archived:
+            restore_resume(resume)
+            # Reload so any prefetch filters apply to the restored sections
+            resume = super().get_object()
+        return resume
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Serve the stored document in one query when it's up to date"""
+        if self.get_fieldset() is None:
+            document = stored_document(pk=kwargs['pk'], resume__user=request.user)
+            if document is not None:
+                return Response(document[1])
+        return super().retrieve(request, *args, **kwargs)
+    
+    def perform_destroy(self, instance):
+        """Move the resume to the trash; the purge job deletes it later"""
+        trash_resumes(self.request.user, [instance.pk])
+    
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Move many resumes to the trash at once"""
+        serializer = ResumeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = trash_resumes(request.user, serializer.validated_data['ids'])
+        return Response({'deleted': ids, 'restore_until': timezone.now() + retention()})
+    
+    @action(detail=False, methods=['get'])
+    def trash(self, request):
+        """List resumes in the trash that can still be restored"""
+        queryset = trashed_resumes(request.user).order_by('-deleted_at')
+        page = self.paginate_queryset(queryset)
+        context = {**self.get_serializer_context(), 'retention': retention()}
+        serializer = TrashedResumeSerializer(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['post'])
+    def restore(self, request):
+        """Bring resumes back from the trash"""
+        serializer = ResumeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = restore_from_trash(request.user, serializer.validated_data['ids'])
+        return Response({'restored': ids})
+    
     @action(detail=True, methods=['post'])
     def share(self, request, pk=None):
         """Generate a share link for a resume"""
@@ -102,6 +251,228 @@ class ResumeViewSet(viewsets.ModelViewSet):
         
         share_url = f"/share/{resume.share_slug}"
         return Response({'share_url': share_url}, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['post'])
+    def duplicate(self, request, pk=None):
+        """Copy a resume with its style and sections in a single transaction"""
+        source = self.get_object()
+        serializer = DuplicateResumeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        title = serializer.validated_data.get('title') or f"{source.title} (Copy)"
+        sections = list(source.sections.all())
+        
+        with transaction.atomic(), deferred():
+            # share_slug is left to its default so the copy gets a fresh link
+            resume = Resume.objects.create(
+                user=request.user,
+                title=title,
+                template_name=source.template_name
+            )
+            style = getattr(source, 'style', None)
+            if style is not None:
+                Style.objects.create(
+                    resume=resume,
+                    primary_color=style.primary_color,
+                    font_family=style.font_family,
+                    font_size=style.font_size
+                )
+            else:
+                Style.objects.create(resume=resume)
+            copies = Section.objects.bulk_create([
+                Section(resume=resume, type=section.type, content=section.content, order=section.order, rank=section.rank)
+                for section in sections
+            ])
+            # The bulk insert skips the write hooks
+            refresh_document(resume.pk)
+        
+        # Serialize the rows we just created instead of reading them back
+        resume._prefetched_objects_cache = {'sections': copies}
+        serializer = ResumeSerializer(resume, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['post'], url_path='sections/reorder', url_name='reorder-sections')
+    def reorder_sections(self, request, pk=None):
+        """
+        Put all of the resume's sections in the given order in one transaction.
+        
+        Only sections that end up out of place are moved, one row each, and the
+        sections are returned in their new order.
+        """
+        serializer = SectionOrderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target = serializer.validated_data['section_ids']
+        resume = self.get_object()
+        
+        with transaction.atomic(), deferred():
+            sections = {
+                section.pk: section
+                for section in Section.objects.select_for_update().filter(resume=resume).order_by('rank', 'order', 'id')
+            }
+            if sorted(target) != sorted(sections):
+                return Response(
+                    {'section_ids': ["Must list each of the resume's sections exactly once."]},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            current = list(sections)
+            for index, section_id in enumerate(target):
+                if current[index] != section_id:
+                    place(sections[section_id], index + 1)
+                    current.remove(section_id)
+                    current.insert(index, section_id)
+        
+        ordered = [sections[section_id] for section_id in target]
+        for position, section in enumerate(ordered, 1):
+            section.position = position
+        return Response(SectionSerializer(ordered, many=True).data)
+    
+    @action(detail=False, methods=['post'])
+    def match(self, request):
+        """Rank the user's resumes against a job description"""
+        job_description = request.data.get('job_description')
+        if not isinstance(job_description, str) or not job_description.strip():
+            return Response(
+                {'detail': 'job_description is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(job_description) > 50000:
+            return Response(
+                {'detail': 'job_description must be at most 50000 characters.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = max(1, min(int(request.data.get('limit', 10)), 100))
+        except (TypeError, ValueError):
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        resumes = {
+            resume_id: (title, version)
+            for resume_id, title, version in self.get_queryset().values_list('id', 'title', 'version')
+        }
+        sections = Section.objects.filter(
+            resume__user=request.user, resume__deleted_at__isnull=True
+        ).exclude(type='contact').values_list(
+            'id', 'resume_id', 'content'
+        )
+        # Archived resumes are scored straight from their archive rows instead of being restored
+        sections = chain(
+            sections.iterator(chunk_size=2000),
+            archived_sections(self.get_queryset(), exclude_types=('contact',))
+        )
+        results = match_resumes(job_description, sections, resumes, limit=limit)
+        return Response({'results': results})
+    
+    @action(detail=True, methods=['get'], url_path=r'diff/(?P<other_pk>[0-9]+)')
+    def diff(self, request, pk=None, other_pk=None):
+        """Return the structural changes from this resume to another one"""
+        try:
+            pk, other_pk = int(pk), int(other_pk)
+        except ValueError:
+            return Response({'detail': 'Resume not found.'}, status=status.HTTP_404_NOT_FOUND)
+        resumes = {resume.pk: resume for resume in self.get_queryset().filter(pk__in=[pk, other_pk])}
+        source, target = resumes.get(pk), resumes.get(other_pk)
+        if source is None or target is None:
+            return Response({'detail': 'Resume not found.'}, status=status.HTTP_404_NOT_FOUND)
+        restore_resume(source)
+        restore_resume(target)
+        
+        context = self.get_serializer_context()
+        changes = diff_resumes(
+            ResumeSerializer(source, context=context).data,
+            ResumeSerializer(target, context=context).data
+        )
+        return Response({'from': source.pk, 'to': target.pk, 'changes': changes})
+    
+    @action(detail=True, methods=['get'], url_path=r'export\.docx', url_name='export-docx',
+            renderer_classes=[JSONRenderer, DocxRenderer])
+    def export_docx(self, request, pk=None):
+        """
+        Download the resume as a Word document built from its sections and style.
+        
+        The file is streamed as it's zipped and cached under the hash of its
+        inputs, so an unchanged resume is served from the cache (or a 304).
+        """
+        resume = self.get_object()
+        inputs = export_inputs(resume)
+        digest = content_hash(inputs)
+        etag = f'"{digest}"'
+        
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in etags or '*' in etags:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cached = get_cached(digest)
+            if cached is not None:
+                response = HttpResponse(cached, content_type=DOCX_CONTENT_TYPE)
+            else:
+                chunks = caching_stream(stream_docx(inputs), digest)
+                if isinstance(request._request, ASGIRequest):
+                    chunks = in_thread(chunks)
+                response = StreamingHttpResponse(chunks, content_type=DOCX_CONTENT_TYPE)
+            response['Content-Disposition'] = content_disposition_header(True, f'{resume.title or "resume"}.docx')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    @action(detail=True, methods=['get'], url_path='json-resume', url_name='json-resume')
+    def json_resume(self, request, pk=None):
+        """Export the resume as a JSON Resume document"""
+        resume = self.get_object()
+        sections = resume_sections([resume])[resume.pk]
+        return Response(to_json_resume(resume.title, sections, resume.updated_at))
+    
+    @action(detail=False, methods=['get', 'post'], url_path='json-resume', url_name='json-resumes',
+            renderer_classes=[JSONRenderer, NDJSONRenderer])
+    def json_resumes(self, request):
+        """
+        Convert between resumes and JSON Resume documents.
+        
+        GET streams every resume as NDJSON. POST imports one document, or with
+        Content-Type application/x-ndjson one document per line, streaming
+        back a result line per record: its new id or why it was rejected.
+        """
+        if request.method == 'GET':
+            lines = export_lines(self.get_queryset())
+            if isinstance(request._request, ASGIRequest):
+                lines = in_thread(lines)
+            response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+            response['Content-Disposition'] = content_disposition_header(True, 'resumes.ndjson')
+            return response
+        
+        if request.content_type.startswith('application/x-ndjson'):
+            # Read lazily so a large upload is converted and written a batch at a time
+            results = import_results(request, request.stream or ())
+            if isinstance(request._request, ASGIRequest):
+                results = in_thread(results)
+            return StreamingHttpResponse(results, content_type='application/x-ndjson')
+        
+        try:
+            document = from_json_resume(request.data, request.query_params.get('title'))
+        except ConversionError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        resume = create_resumes(request.user, [document])[0]
+        resume = self.get_queryset().select_related('style').prefetch_related('sections').get(pk=resume.pk)
+        serializer = ResumeSerializer(resume, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['get'], url_path='views')
+    def view_stats(self, request, pk=None):
+        """Return how often the shared resume was viewed, in total and per day"""
+        resume = self.get_object()
+        try:
+            days = max(1, min(int(request.query_params.get('days', 30)), 365))
+        except ValueError:
+            return Response({'detail': 'days must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        total = ResumeViewCount.objects.filter(resume=resume).values_list('views', flat=True).first() or 0
+        since = timezone.localdate() - timedelta(days=days - 1)
+        daily = ResumeDailyViews.objects.filter(resume=resume, date__gte=since).values('date', 'views')
+        
+        return Response({
+            'resume_id': resume.id,
+            # Include views this worker has buffered but not flushed yet
+            'views': total + view_counter.pending(resume.pk),
+            'daily': list(daily),
+        })
 
 class SectionViewSet(viewsets.ModelViewSet):
     """ViewSet for Section model"""
@@ -111,8 +482,28 @@ class SectionViewSet(viewsets.ModelViewSet):
         """Return sections for current authenticated user only"""
         resume_id = self.kwargs.get('resume_pk')
         if resume_id:
-            return Section.objects.filter(resume_id=resume_id, resume__user=self.request.user)
-        return Section.objects.filter(resume__user=self.request.user)
+            queryset = Section.objects.filter(
+                resume_id=resume_id, resume__user=self.request.user, resume__deleted_at__isnull=True
+            )
+        else:
+            queryset = Section.objects.filter(
+                resume__user=self.request.user, resume__deleted_at__isnull=True
+            ).select_related('resume')
+        if self.action in ('list', 'retrieve', 'update', 'partial_update'):
+            # Responses report each section's position in its resume
+            queryset = queryset.with_positions()
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        """List sections; an empty nested list may mean the resume is archived, so restore and retry"""
+        response = super().list(request, *args, **kwargs)
+        resume_id = self.kwargs.get('resume_pk')
+        if resume_id and response.data['count'] == 0:
+            resume = Resume.objects.filter(pk=resume_id, user=request.user, is_archived=True).first()
+            if resume is not None:
+                restore_resume(resume)
+                response = super().list(request, *args, **kwargs)
+        return response
         
     def get_object(self):
         """Get section object with better error handling"""
@@ -122,7 +513,15 @@ class SectionViewSet(viewsets.ModelViewSet):
         logger.info(f"Looking up section with pk={self.kwargs.get('pk')}")
         
         # Try to get the object
-        return super().get_object()
+        try:
+            return super().get_object()
+        except Http404:
+            # Sections of an archived resume only exist in its archive until it's restored
+            resume = archived_resume_of(Resume.objects.filter(user=self.request.user), self.kwargs.get('pk'))
+            if resume is None:
+                raise
+            restore_resume(resume)
+            return super().get_object()
     
     def create(self, request, *args, **kwargs):
         """Create a new section with detailed error reporting and auto-fill defaults"""
@@ -131,6 +530,7 @@ class SectionViewSet(viewsets.ModelViewSet):
         
         resume_id = self.kwargs.get('resume_pk')
         resume = get_object_or_404(Resume, pk=resume_id, user=self.request.user)
+        restore_resume(resume)
         
         # Copy request data to add missing fields
         data = request.data.copy()
@@ -143,14 +543,8 @@ class SectionViewSet(viewsets.ModelViewSet):
         if 'content' in data:
             logger.info(f"🔍 Content Value: {data.get('content')}")
         
-        # Get the highest order value for existing sections to place new section at the end
-        highest_order = Section.objects.filter(resume=resume).order_by('-order').values_list('order', flat=True).first()
-        order = 1 if highest_order is None else highest_order + 1
+        # Without an 'order' the serializer ranks the new section after the last one
         
-        # If order is not provided in the request data, add it
-        if 'order' not in data:
-            data['order'] = order
-            
         # Log the incoming data for debugging
         import logging
         logger = logging.getLogger(__name__)
@@ -259,7 +653,7 @@ class SectionViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Section not found"}, status=status.HTTP_404_NOT_FOUND)
         
         # Ensure the user owns the resume this section belongs to
-        if instance.resume.user != request.user:
+        if instance.resume.user_id != request.user.pk:
             return Response({"detail": "You do not have permission to update this section"}, 
                           status=status.HTTP_403_FORBIDDEN)
             
@@ -298,12 +692,137 @@ class StyleViewSet(viewsets.ModelViewSet):
         """Return style for current authenticated user only"""
         resume_id = self.kwargs.get('resume_pk')
         if resume_id:
-            return Style.objects.filter(resume_id=resume_id, resume__user=self.request.user)
-        return Style.objects.filter(resume__user=self.request.user)
+            return Style.objects.filter(resume_id=resume_id, resume__user=self.request.user, resume__deleted_at__isnull=True)
+        return Style.objects.filter(resume__user=self.request.user, resume__deleted_at__isnull=True)
 
 class PublicResumeView(generics.RetrieveAPIView):
     """View for publicly shared resumes"""
-    queryset = Resume.objects.all()
+    queryset = Resume.objects.select_related('style').prefetch_related('sections')
     serializer_class = PublicResumeSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [PublicResumeRateThrottle, ShareSlugRateThrottle]
     lookup_field = 'share_slug'
+    
+    def get_fieldset(self):
+        """Return the ?fields=/?include= selection, or None"""
+        fields = PublicResumeSerializer.Meta.fields
+        return parse_fieldset(self.request.query_params, fields, fields)
+    
+    def get_queryset(self):
+        """Narrow the query to a requested fieldset"""
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return super().get_queryset()
+        return apply_fieldset(Resume.objects.all(), fieldset, ('title', 'template_name'))
+    
+    def get_serializer_context(self):
+        """Pass a sparse fieldset on to the serializer"""
+        context = super().get_serializer_context()
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            context['sparse_fields'] = fieldset.fields
+        return context
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Count the view and tag the payload with an ETag.
+        
+        Caches must revalidate every time, so a revoked link stops being
+        served at once and every view is counted, while an unchanged
+        resume is answered with a bodyless 304.
+        """
+        document = None
+        if self.get_fieldset() is None:
+            document = stored_document(resume__share_slug=kwargs[self.lookup_field])
+        if document is not None:
+            # The stored document is the owner's payload, which has more fields
+            resume_id, stored = document
+            data = {field: stored[field] for field in PublicResumeSerializer.Meta.fields if field in stored}
+        else:
+            instance = self.get_object()
+            if instance.is_archived:
+                restore_resume(instance)
+                instance = self.get_object()
+            resume_id, data = instance.pk, self.get_serializer(instance).data
+        view_counter.record(resume_id)
+        etag = f'"{content_hash(data)}"'
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in etags or '*' in etags:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class SkillSearchView(generics.GenericAPIView):
+    """Autocomplete skills from the in-memory skills index"""
+    
+    def get(self, request, *args, **kwargs):
+        """Return skills matching ?q= by prefix or typo, optionally within ?category="""
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), 50))
+        except ValueError:
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        results = get_skill_index().search(
+            request.query_params.get('q', ''),
+            category=request.query_params.get('category') or None,
+            limit=limit
+        )
+        return Response({
+            'results': [
+                {'name': r['name'], 'category': r['category'], 'popularity': r['popularity']}
+                for r in results
+            ]
+        })
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets clients negotiate text/event-stream; error bodies are still sent as JSON"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+class ChangeStreamView(generics.GenericAPIView):
+    """Server-sent stream of change notifications for the current user's resumes"""
+    authentication_classes = [QueryParamJWTAuthentication]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+    
+    def get(self, request, *args, **kwargs):
+        """Stream changes after the Last-Event-ID header (or ?last_event_id=), else from now"""
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            return Response({'detail': 'Last-Event-ID must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not isinstance(request._request, ASGIRequest):
+            # A WSGI worker would be held for the whole stream and buffer it
+            return Response(
+                {'detail': 'The change feed is only served by the ASGI application.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        
+        response = StreamingHttpResponse(
+            change_stream(request.user.pk, last_event_id),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Keep nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Poll the status of the current user's background jobs"""
+    serializer_class = JobSerializer
+    
+    def get_queryset(self):
+        """Return jobs for current authenticated user only"""
+        queryset = Job.objects.filter(user=self.request.user)
+        job_status = self.request.query_params.get('status')
+        if job_status:
+            queryset = queryset.filter(status=job_status)
+        return queryset
@@ -35,6 +35,8 @@ ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', '').split(',')
 # Application definition
 
 INSTALLED_APPS = [
+    # First so runserver serves config.asgi, WebSockets included
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -45,14 +47,21 @@ INSTALLED_APPS = [
 
     'rest_framework',
     'corsheaders',
+    'channels',
     
     # Local apps
     'api',
 ]
 
 MIDDLEWARE = [
+    'api.health.HealthCheckMiddleware',  # Answers probes before host validation, see HEALTH_*_PATH
+    'api.metrics.MetricsMiddleware',  # Opt-in, see METRICS_ENABLED; first so it times everything
     'django.middleware.security.SecurityMiddleware',
+    'api.db_router.ReplicaRoutingMiddleware',  # No-op unless DB_REPLICAS is set
+    'api.query_profiler.QueryProfilerMiddleware',  # Opt-in, see QUERY_PROFILER_ENABLED
+    'api.request_profiler.RequestProfilerMiddleware',  # Opt-in, see REQUEST_PROFILER_ENABLED
     'whitenoise.middleware.WhiteNoiseMiddleware',  # WhiteNoise for static files
+    'api.middleware.CompressionMiddleware',  # Negotiated br/zstd/gzip for API responses
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware should be placed before CommonMiddleware
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +89,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 
 # Database
@@ -96,6 +106,21 @@ DATABASES = {
     }
 }
 
+# Read replicas (see api.db_router). DB_REPLICAS is a comma-separated list of replica
+# hosts, or of database files when using SQLite; everything else matches the primary.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(r.strip() for r in os.environ.get('DB_REPLICAS', '').split(',') if r.strip()):
+    alias = f'replica_{index + 1}'
+    replica_key = 'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'HOST'
+    DATABASES[alias] = {**DATABASES['default'], replica_key: replica, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+# After a client writes, its reads stay on the primary for this many seconds
+DB_REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))
+DB_REPLICA_STICKY_CACHE_ALIAS = 'default'
+# A replica that fails to connect is skipped for this many seconds
+DB_REPLICA_RETRY_SECONDS = int(os.environ.get('DB_REPLICA_RETRY_SECONDS', 30))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -115,6 +140,26 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# PASSWORD_HASHER picks the hasher for new passwords: 'pbkdf2' (default), 'scrypt'
+# (memory-hard, stdlib) or 'argon2' (memory-hard, needs argon2-cffi). The others stay
+# listed so existing hashes still verify and are rehashed on the next login.
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'api.hashing.PooledPBKDF2PasswordHasher',
+    'scrypt': 'api.hashing.PooledScryptPasswordHasher',
+    'argon2': 'api.hashing.PooledArgon2PasswordHasher',
+}
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Size of the thread pool password hashing runs in, which bounds how many hashes run at once;
+# the request thread still waits for its result (0 hashes inline in the request thread)
+PASSWORD_HASHING_POOL_SIZE = int(os.environ.get('PASSWORD_HASHING_POOL_SIZE', 0))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -142,6 +187,14 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 if not DEBUG:
     STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Response compression (see api.middleware.CompressionMiddleware)
+# Encodings are tried in this order; br and zstd are skipped when their packages are missing
+COMPRESSION_ENCODINGS = [e.strip() for e in os.environ.get('COMPRESSION_ENCODINGS', 'br,zstd,gzip').split(',') if e.strip()]
+COMPRESSION_MIN_LENGTH = int(os.environ.get('COMPRESSION_MIN_LENGTH', 200))
+COMPRESSION_STREAM_THRESHOLD = int(os.environ.get('COMPRESSION_STREAM_THRESHOLD', 1024 * 1024))
+COMPRESSION_CACHE_ALIAS = 'default'
+COMPRESSION_CACHE_TIMEOUT = int(os.environ.get('COMPRESSION_CACHE_TIMEOUT', 300))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -158,10 +211,155 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'api.exceptions.custom_exception_handler',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Rates for the token-bucket throttles in api.throttling
+    'DEFAULT_THROTTLE_RATES': {
+        'public_resume': os.environ.get('THROTTLE_PUBLIC_RESUME', '120/min'),
+        'public_resume_slug': os.environ.get('THROTTLE_PUBLIC_RESUME_SLUG', '600/min'),
+        'register': os.environ.get('THROTTLE_REGISTER', '10/hour'),
+        'login': os.environ.get('THROTTLE_LOGIN', '30/min'),
+        'login_username': os.environ.get('THROTTLE_LOGIN_USERNAME', '10/min'),
+        'change_password': os.environ.get('THROTTLE_CHANGE_PASSWORD', '5/min'),
+    },
     # Enable detailed errors in development
     'NON_FIELD_ERRORS_KEY': 'error',
 }
 
+# Throttle store: 'local' keeps token buckets in process memory, 'cache' uses
+# sliding-window counters in the shared Django cache (Redis/memcached in production)
+THROTTLE_STORE = os.environ.get('THROTTLE_STORE', 'local')
+THROTTLE_CACHE_ALIAS = 'default'
+
+# Shared resume view counters (see api.view_counters)
+# Buffered counts are flushed after a response once this many seconds have passed
+VIEW_COUNTER_FLUSH_INTERVAL = float(os.environ.get('VIEW_COUNTER_FLUSH_INTERVAL', 10))
+VIEW_COUNTER_DAILY_ROLLUPS = os.environ.get('VIEW_COUNTER_DAILY_ROLLUPS', 'True') == 'True'
+
+# Per-endpoint SQL profiling (see api.query_profiler)
+QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED', 'False') == 'True'
+# Add X-Query-* timing headers to responses, for local profiling only
+QUERY_PROFILER_HEADERS = os.environ.get('QUERY_PROFILER_HEADERS', 'False') == 'True'
+# Budgets per URL name; keys: queries, duplicates, db_ms, serializer_ms.
+# Detail budgets cover updates, which also bump Resume.version for the change feed
+# (the feed's own insert runs on commit and isn't counted in tests). Placing a section
+# reads its siblings' ranks and saves in a savepoint so a rank collision can be retried.
+# A section's position is numbered from its siblings' ids in one more query.
+QUERY_BUDGETS = {
+    'resume-list': {'queries': 2, 'duplicates': 0},
+    'resume-detail': {'queries': 4, 'duplicates': 0},
+    'resume-duplicate': {'queries': 7, 'duplicates': 0},
+    'resume-sections': {'queries': 6, 'duplicates': 0},
+    'section-detail': {'queries': 4, 'duplicates': 0},
+    'public-resume': {'queries': 3, 'duplicates': 0},
+}
+
+# Sampled cProfile of whole requests (see api.request_profiler and `manage.py profile_report`).
+# Requests with a signed X-Profile header (`manage.py profile_report --token`) are always profiled.
+REQUEST_PROFILER_ENABLED = os.environ.get('REQUEST_PROFILER_ENABLED', 'False') == 'True'
+REQUEST_PROFILER_SAMPLE_RATE = float(os.environ.get('REQUEST_PROFILER_SAMPLE_RATE', 0.01))
+# Defaults to a directory under the system temp dir; only the newest MAX_FILES profiles are kept
+REQUEST_PROFILER_DIR = os.environ.get('REQUEST_PROFILER_DIR', '')
+REQUEST_PROFILER_MAX_FILES = int(os.environ.get('REQUEST_PROFILER_MAX_FILES', 200))
+REQUEST_PROFILER_TOKEN_MAX_AGE = int(os.environ.get('REQUEST_PROFILER_TOKEN_MAX_AGE', 3600))
+
+# Probe endpoints (see api.health). Readiness fails until the worker has warmed up:
+# gunicorn warms workers before they serve, other servers on the first readiness probe.
+HEALTH_LIVENESS_PATH = os.environ.get('HEALTH_LIVENESS_PATH', '/healthz')
+HEALTH_READINESS_PATH = os.environ.get('HEALTH_READINESS_PATH', '/readyz')
+
+# Per-route request metrics in Prometheus text format at /metrics (see api.metrics).
+# Every worker writes its own memory mapped file in METRICS_DIR and the endpoint sums them,
+# so the directory must be shared by all workers of one server; gunicorn clears it on start.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'False') == 'True'
+# Defaults to a directory under the system temp dir
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+# When set, scrapes must send 'Authorization: Bearer <token>'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+# Latency histogram bucket bounds in seconds
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Admin changelists for large tables (see api.admin): estimated counts instead of COUNT(*),
+# prefix searches that can use indexes, and sections linked instead of inlined
+ADMIN_PERFORMANCE_MODE = os.environ.get('ADMIN_PERFORMANCE_MODE', 'False') == 'True'
+# Filtered changelists count at most this many rows
+ADMIN_COUNT_LIMIT = int(os.environ.get('ADMIN_COUNT_LIMIT', 10000))
+
+# Background job queue (see api.jobs and `manage.py run_workers`)
+JOB_WORKER_PROCESSES = int(os.environ.get('JOB_WORKER_PROCESSES', 1))
+JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 2))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+# Retry delay is JOB_RETRY_BACKOFF * 2 ** (attempt - 1) seconds, capped, with jitter
+JOB_RETRY_BACKOFF = float(os.environ.get('JOB_RETRY_BACKOFF', 5))
+JOB_RETRY_BACKOFF_MAX = float(os.environ.get('JOB_RETRY_BACKOFF_MAX', 3600))
+# Workers refresh a running job's heartbeat this often, in seconds
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get('JOB_HEARTBEAT_INTERVAL', 30))
+# Running jobs without a heartbeat for this long are assumed orphaned by a dead worker and
+# requeued, or failed once out of attempts; keep it well above JOB_HEARTBEAT_INTERVAL
+JOB_STALE_TIMEOUT = int(os.environ.get('JOB_STALE_TIMEOUT', 900))
+
+# Skills autocomplete index is rebuilt in the background from the catalog and stored sections after this many seconds
+SKILLS_INDEX_TTL = int(os.environ.get('SKILLS_INDEX_TTL', 600))
+# Stored skills outside the catalog are only suggested once this many resumes list them
+SKILLS_MIN_RESUMES = int(os.environ.get('SKILLS_MIN_RESUMES', 5))
+
+# Job description matching keeps at most this many distinct job description terms
+MATCH_MAX_QUERY_TERMS = int(os.environ.get('MATCH_MAX_QUERY_TERMS', 200))
+
+# Channel layer for WebSocket broadcasts (see api.consumers). The in-memory layer only
+# reaches sessions in the same process; set CHANNEL_REDIS_URL to share across workers.
+if os.environ.get('CHANNEL_REDIS_URL'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [os.environ['CHANNEL_REDIS_URL']]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+COLLAB_AUTH_TIMEOUT = int(os.environ.get('COLLAB_AUTH_TIMEOUT', 10))
+COLLAB_MAX_OPS_PER_BATCH = int(os.environ.get('COLLAB_MAX_OPS_PER_BATCH', 100))
+
+# Cold storage for idle resumes (see api.archive and `manage.py archive_resumes`)
+ARCHIVE_IDLE_DAYS = int(os.environ.get('ARCHIVE_IDLE_DAYS', 180))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 100))
+ARCHIVE_COMPRESSION_LEVEL = int(os.environ.get('ARCHIVE_COMPRESSION_LEVEL', 6))
+
+# Word export (see api.docx_export): built files are cached by the hash of their inputs.
+# Larger files are streamed without being cached.
+DOCX_CACHE_ALIAS = 'default'
+DOCX_CACHE_TIMEOUT = int(os.environ.get('DOCX_CACHE_TIMEOUT', 86400))
+DOCX_CACHE_MAX_BYTES = int(os.environ.get('DOCX_CACHE_MAX_BYTES', 5 * 1024 * 1024))
+
+# Materialized resume documents (see api.documents and `manage.py resume_documents`): the
+# serialized detail payload is rebuilt on every write so detail and share reads fetch one row.
+# Run `manage.py resume_documents --rebuild` after turning it on.
+RESUME_DOCUMENTS_ENABLED = os.environ.get('RESUME_DOCUMENTS_ENABLED', 'False') == 'True'
+RESUME_DOCUMENTS_BATCH_SIZE = int(os.environ.get('RESUME_DOCUMENTS_BATCH_SIZE', 200))
+
+# JSON Resume import/export (see api.json_resume and `manage.py json_resume`).
+# Bulk imports are written this many documents per transaction, at most MAX_RECORDS per request.
+JSON_RESUME_BATCH_SIZE = int(os.environ.get('JSON_RESUME_BATCH_SIZE', 500))
+JSON_RESUME_MAX_RECORDS = int(os.environ.get('JSON_RESUME_MAX_RECORDS', 10000))
+
+# Trash for deleted resumes (see api.trash): restorable for TRASH_RETENTION seconds,
+# then hard-deleted by the job workers in batches
+TRASH_RETENTION = int(os.environ.get('TRASH_RETENTION', 30 * 86400))
+TRASH_PURGE_BATCH_SIZE = int(os.environ.get('TRASH_PURGE_BATCH_SIZE', 100))
+
+# Section ordering keys (see api.ranking): a background job respaces a resume's
+# ranks once an insert produces one longer than this many characters
+SECTION_RANK_REBALANCE_LENGTH = int(os.environ.get('SECTION_RANK_REBALANCE_LENGTH', 12))
+
+# Server-sent change feed (see api.changes), served only by config.asgi. Streams poll
+# asynchronously and end after CHANGE_FEED_MAX_DURATION seconds so the browser reconnects.
+CHANGE_FEED_POLL_INTERVAL = float(os.environ.get('CHANGE_FEED_POLL_INTERVAL', 1.0))
+CHANGE_FEED_HEARTBEAT = int(os.environ.get('CHANGE_FEED_HEARTBEAT', 15))
+CHANGE_FEED_MAX_DURATION = int(os.environ.get('CHANGE_FEED_MAX_DURATION', 300))
+CHANGE_FEED_BATCH_SIZE = int(os.environ.get('CHANGE_FEED_BATCH_SIZE', 100))
+CHANGE_FEED_RETRY_MS = int(os.environ.get('CHANGE_FEED_RETRY_MS', 3000))
+# Notifications older than this are pruned by the job workers
+CHANGE_FEED_RETENTION = int(os.environ.get('CHANGE_FEED_RETENTION', 86400))
+
 # CORS settings
 # Get CORS origins from environment variable, filter out empty strings
 cors_origins = os.environ.get('CORS_ALLOWED_ORIGINS', '').split(',')
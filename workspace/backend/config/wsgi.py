@@ -8,9 +8,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
 
 import os
+import time
 
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
+_started = time.perf_counter()
 application = get_wsgi_application()
+
+from api.health import record_timing  # noqa: E402
+record_timing('startup', time.perf_counter() - _started)
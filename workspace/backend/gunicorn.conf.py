@@ -0,0 +1,32 @@
+# Gunicorn loads this file automatically from the working directory
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+# Serve config.asgi: WebSockets and the change feed need an ASGI server, and an async
+# worker keeps heartbeating the arbiter while long-lived streams are open
+worker_class = 'uvicorn_worker.UvicornWorker'
+
+
+def on_starting(server):
+    """Start every server with empty request metrics"""
+    from api.metrics import metrics_dir, reset
+    reset(metrics_dir())
+
+
+def post_worker_init(worker):
+    """Warm up before the worker accepts requests, so /readyz only passes once it's fast"""
+    from api.health import warmup
+    warmup()
+
+
+def worker_exit(server, worker):
+    """Flush buffered per-worker state before a worker exits"""
+    from api.view_counters import view_counter
+    view_counter.flush()
+
+
+def child_exit(server, worker):
+    """Fold an exited worker's request metrics into the shared archive"""
+    from api.metrics import archive_worker, metrics_dir
+    archive_worker(metrics_dir(), worker.pid)
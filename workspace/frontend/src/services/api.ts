@@ -236,14 +236,10 @@ export const resumeAPI = {
   reorderSections: async (resumeId: number, sectionIds: number[]) => {
     console.log('API reorderSections called:', { resumeId, sectionIds });
     try {
-      // Since there's no specific endpoint for reordering, update each section individually
-      const updates = sectionIds.map((sectionId, index) => {
-        return api.patch(`sections/${sectionId}/`, { order: index });
-      });
-      
-      const results = await Promise.all(updates);
-      console.log('API reorderSections success response:', results.map(r => r.data));
-      return { success: true, sections: results.map(r => r.data) };
+      // One request moves every section, so the new order is applied atomically
+      const response = await api.post(`resumes/${resumeId}/sections/reorder/`, { section_ids: sectionIds });
+      console.log('API reorderSections success response:', response.data);
+      return { success: true, sections: response.data };
     } catch (error: any) {
       console.error('API reorderSections error:', error);
       // Create a more readable error message